@@ -0,0 +1,60 @@
+"""
+VoiceAgent hot paths: mic frame handoff to Deepgram, function calls end to end
+(with the function itself stubbed out), and session state saves.
+"""
+
+import json
+
+from common.audio_frames import pack_frame
+
+FRAMES_PER_ROUND = 50  # One second of 20ms mic frames
+MIC_FRAME = pack_frame(0, 0, b"\x10\x00" * 320)
+
+
+def test_audio_sender_handoff(benchmark, agent, fake_socket, loop):
+    """Frames already in the ring buffer, through _audio_sender, to the socket."""
+    benchmark.group = "agent"
+
+    def handoff():
+        agent.is_running = True  # The previous round's socket stopped the agent
+        for _ in range(FRAMES_PER_ROUND):
+            agent.receive_audio_frame(MIC_FRAME)
+        ws = fake_socket(agent, stop_after=FRAMES_PER_ROUND)
+        loop.run_until_complete(agent._audio_sender(ws))
+        return ws
+
+    ws = benchmark(handoff)
+    assert ws.sent == FRAMES_PER_ROUND
+    agent.is_running = True
+
+
+def test_handle_function_call(benchmark, agent, client_module, fake_socket, loop, monkeypatch):
+    """Parse, validate, run (stubbed), serialize, send and record a get_customer call."""
+    benchmark.group = "agent"
+    monkeypatch.setitem(client_module.FUNCTION_MAP, "get_customer", lambda params: {
+        "CustomerOid": "9493B230-DDA6-4EE0-816E-4DEEE9CE012C",
+        "printCustomerName": params["company_name"],
+        "success": True,
+    })
+    request = {
+        "type": "FunctionCallRequest",
+        "functions": [{
+            "id": "call-1",
+            "name": "get_customer",
+            "arguments": json.dumps({"company_name": "Epic Construction"}),
+            "client_side": True,
+        }],
+    }
+    ws = fake_socket()
+    benchmark(lambda: loop.run_until_complete(agent._handle_function_call(ws, request)))
+    assert json.loads(ws.last)["type"] == "FunctionCallResponse"
+
+
+def test_save_state(benchmark, agent):
+    """Session state with a full conversation log."""
+    benchmark.group = "agent"
+    for n in range(agent.conversation.max_messages):
+        agent.conversation.add_text("user" if n % 2 else "assistant", f"Message number {n} about the patio job")
+    benchmark(agent.save_state)
+    with open(agent.state_file) as f:
+        assert json.load(f)["session_id"] == "bench_session"
@@ -0,0 +1,80 @@
+"""
+Mock data generation and the lookup functions in business_logic, at the
+configured MOCK_DATA_SIZE and at ten times that.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from common import business_logic
+
+SCALES = [1, 10]
+_datasets = {}
+
+
+def scaled_sizes(scale):
+    return {name: count * scale for name, count in business_logic.MOCK_DATA_SIZE.items()}
+
+
+@pytest.fixture(params=SCALES, ids=lambda scale: f"x{scale}")
+def mock_data(request, monkeypatch):
+    """MOCK_DATA at the given scale (generated once per scale)."""
+    scale = request.param
+    if scale not in _datasets:
+        monkeypatch.setattr(business_logic, "MOCK_DATA_SIZE", scaled_sizes(scale))
+        _datasets[scale] = business_logic.generate_mock_data()
+    monkeypatch.setattr(business_logic, "MOCK_DATA", _datasets[scale])
+    return _datasets[scale]
+
+
+@pytest.mark.parametrize("scale", SCALES, ids=lambda scale: f"x{scale}")
+def test_generate_mock_data(benchmark, scale, monkeypatch):
+    benchmark.group = "generate_mock_data"
+    monkeypatch.setattr(business_logic, "MOCK_DATA_SIZE", scaled_sizes(scale))
+    data = benchmark.pedantic(business_logic.generate_mock_data, rounds=5, iterations=1)
+    assert len(data["customers"]) == business_logic.MOCK_DATA_SIZE["customers"]
+
+
+def test_get_customer_by_phone(benchmark, mock_data, loop):
+    """Worst case: the last customer, so the whole list is scanned."""
+    benchmark.group = "lookups"
+    phone = mock_data["customers"][-1]["phone"]
+    customer = benchmark(lambda: loop.run_until_complete(business_logic.get_customer(phone=phone)))
+    assert customer["phone"] == phone
+
+
+def test_get_customer_orders(benchmark, mock_data, loop):
+    benchmark.group = "lookups"
+    customer_id = mock_data["customers"][-1]["id"]
+    result = benchmark(lambda: loop.run_until_complete(business_logic.get_customer_orders(customer_id)))
+    assert result["customer_id"] == customer_id
+
+
+def test_get_customer_appointments(benchmark, mock_data, loop):
+    benchmark.group = "lookups"
+    customer_id = mock_data["customers"][-1]["id"]
+    result = benchmark(lambda: loop.run_until_complete(business_logic.get_customer_appointments(customer_id)))
+    assert result["customer_id"] == customer_id
+
+
+def test_mock_customer_and_location_lookups(benchmark):
+    benchmark.group = "lookups"
+
+    def lookups():
+        business_logic.get_customer_mock("Globex Corporation")
+        return business_logic.get_location_mock("mock-globex-001", "research campus in Middleton")
+
+    assert benchmark(lookups)["ParentLocationOid"] == "mock-loc-003"
+
+
+@pytest.mark.parametrize("days", [7, 90, 365])
+def test_get_available_appointment_slots(benchmark, mock_data, loop, days):
+    benchmark.group = "appointment slots"
+    start = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    end = start + timedelta(days=days)
+    result = benchmark.pedantic(
+        lambda: loop.run_until_complete(business_logic.get_available_appointment_slots(start.isoformat(), end.isoformat())),
+        rounds=3, iterations=1,
+    )
+    assert result["available_slots"]
@@ -0,0 +1,22 @@
+"""Cost of CustomFormatter.format, which runs for every log line the server writes."""
+
+import logging
+
+import pytest
+
+from common.log_formatter import CustomFormatter
+
+MESSAGES = {
+    "agent_json": 'Deepgram -> Server: {"type": "ConversationText", "role": "assistant", "content": "What is the job address?"}',
+    "function_call": "Calling function get_customer with arguments: {'company_name': 'Epic Construction'}",
+    "plain": "Audio sender loop finished.",
+}
+
+
+@pytest.mark.parametrize("kind", sorted(MESSAGES))
+def test_custom_formatter(benchmark, kind):
+    benchmark.group = "log formatter"
+    formatter = CustomFormatter()
+    record = logging.LogRecord("client", logging.INFO, __file__, 1, MESSAGES[kind], None, None)
+    formatted = benchmark(formatter.format, record)
+    assert MESSAGES[kind] in formatted
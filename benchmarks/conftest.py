@@ -0,0 +1,67 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def workdir(tmp_path_factory):
+    """Run in a scratch directory: mock data, sessions and quotes are written relative to the cwd."""
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("bench"))
+    yield
+    os.chdir(previous)
+
+
+@pytest.fixture(scope="session")
+def loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(scope="session")
+def client_module(workdir):
+    """client.py, imported without its shutdown signal handlers (they call os._exit)."""
+    handlers = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+    import client
+    for sig, handler in handlers.items():
+        signal.signal(sig, handler)
+    # Logging cost is measured on its own in bench_logging.py
+    client.logger.setLevel(logging.WARNING)
+    return client
+
+
+class FakeDeepgramSocket:
+    """Stands in for the Deepgram WebSocket; counts sends and can stop the agent after a number of them."""
+
+    def __init__(self, agent=None, stop_after=None):
+        self.agent = agent
+        self.stop_after = stop_after
+        self.sent = 0
+        self.last = None
+
+    async def send(self, message):
+        self.sent += 1
+        self.last = message
+        if self.stop_after is not None and self.sent >= self.stop_after:
+            self.agent.is_running = False
+
+
+@pytest.fixture
+def fake_socket():
+    return FakeDeepgramSocket
+
+
+@pytest.fixture(scope="session")
+def agent(client_module):
+    agent = client_module.VoiceAgent(sid="bench", session_id="bench_session")
+    agent.is_running = True
+    agent.is_connected = True
+    return agent
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Load test: how many concurrent calls one client.py process sustains.
+
+Starts the mock Voice Agent and mock Backendless servers, launches client.py
+pointed at them (VOICE_AGENT_URL / BACKENDLESS_API_URL), runs a swarm of
+callers, and samples the server's CPU and memory from /proc while it runs.
+Prints a JSON report and saves it under benchmarks/results/.
+
+    python -m benchmarks.load_test --callers 1,10,25 --turns 3
+    python -m benchmarks.load_test --url http://127.0.0.1:5000 --server-pid 1234  # an already running server
+
+Linux only (CPU and memory come from /proc).
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.mock_backendless import MockBackendless
+from benchmarks.mock_deepgram import MockVoiceAgent
+from benchmarks.swarm import load_pcm, run_swarm
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+def process_usage(pid):
+    """(cpu seconds, rss bytes, thread count) for pid, read from /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    cpu_seconds = (int(fields[11]) + int(fields[12])) / CLOCK_TICKS  # utime + stime
+    threads = int(fields[17])
+    with open(f"/proc/{pid}/status") as f:
+        rss_kb = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+    return cpu_seconds, rss_kb * 1024, threads
+
+
+class UsageSampler:
+    """Samples a process every interval seconds while the swarm runs."""
+
+    def __init__(self, pid, interval=0.5):
+        self.pid = pid
+        self.interval = interval
+        self.samples = []  # (monotonic time, cpu seconds, rss bytes, threads)
+
+    async def run(self):
+        while True:
+            self.samples.append((time.monotonic(), *process_usage(self.pid)))
+            await asyncio.sleep(self.interval)
+
+    def summary(self, callers, baseline_rss):
+        if len(self.samples) < 2:
+            return {}
+        (t0, cpu0, _, _), (t1, cpu1, _, _) = self.samples[0], self.samples[-1]
+        cpu_percent = 100.0 * (cpu1 - cpu0) / (t1 - t0)
+        peak_rss = max(sample[2] for sample in self.samples)
+        return {
+            "cpu_percent": round(cpu_percent, 1),
+            "cpu_percent_per_call": round(cpu_percent / callers, 2),
+            "peak_rss_mb": round(peak_rss / 2 ** 20, 1),
+            "rss_mb_per_call": round((peak_rss - baseline_rss) / 2 ** 20 / callers, 2),
+            "peak_threads": max(sample[3] for sample in self.samples),
+        }
+
+
+def wait_for_http(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).close()
+            return
+        except OSError:
+            time.sleep(0.25)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_server(deepgram_port, backendless_port, log_path):
+    env = dict(
+        os.environ,
+        VOICE_AGENT_URL=f"ws://127.0.0.1:{deepgram_port}",
+        BACKENDLESS_API_URL=f"http://127.0.0.1:{backendless_port}",
+        DEEPGRAM_API_KEY=os.environ.get("DEEPGRAM_API_KEY") or "benchmark-key-not-used",
+    )
+    log = open(log_path, "w")
+    return subprocess.Popen([sys.executable, "client.py"], cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+async def measure(url, pid, callers, args, frames):
+    baseline_rss = process_usage(pid)[1]
+    sampler = UsageSampler(pid)
+    sampling = asyncio.create_task(sampler.run())
+    try:
+        summary = await run_swarm(url, callers, args.turns, frames, args.ramp_seconds, args.transport)
+    finally:
+        sampling.cancel()
+    summary["server"] = sampler.summary(callers, baseline_rss)
+    return summary
+
+
+async def main(args):
+    callers_list = [int(n) for n in args.callers.split(",")]
+    frames = load_pcm(args.pcm, args.utterance_seconds)
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+
+    agent = await MockVoiceAgent(port=args.deepgram_port, think_ms=args.think_ms,
+                                 tts_seconds=args.tts_seconds, function_every=args.function_every).start()
+    backend = await MockBackendless(port=args.backendless_port, latency_ms=args.backendless_latency_ms).start()
+    server = None
+    url, pid = args.url, args.server_pid
+    try:
+        if url is None:
+            server = start_server(args.deepgram_port, args.backendless_port, os.path.join(RESULTS_DIR, "server.log"))
+            url, pid = "http://127.0.0.1:5000", server.pid
+        await asyncio.get_running_loop().run_in_executor(None, wait_for_http, url)
+
+        runs = []
+        for callers in callers_list:
+            print(f"Running {callers} concurrent caller(s)...", file=sys.stderr)
+            runs.append(await measure(url, pid, callers, args, frames))
+            await asyncio.sleep(2)  # Let agent threads wind down between runs
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+        await agent.stop()
+        await backend.stop()
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "settings": {k: v for k, v in vars(args).items() if k not in ("url", "server_pid")},
+        "mock_voice_agent": agent.stats(),
+        "mock_backendless": backend.stats(),
+        "runs": runs,
+    }
+    path = os.path.join(RESULTS_DIR, f"load_test_{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Saved to {path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--callers", default="1,10", help="Comma-separated concurrency levels to run in turn")
+    parser.add_argument("--turns", type=int, default=3, help="Turns per caller")
+    parser.add_argument("--utterance-seconds", type=float, default=2.0, help="Length of the synthetic utterance")
+    parser.add_argument("--pcm", help="16 kHz mono WAV or raw s16le file to use as each utterance")
+    parser.add_argument("--ramp-seconds", type=float, default=2.0)
+    parser.add_argument("--transport", choices=["websocket", "socketio"], default="websocket")
+    parser.add_argument("--think-ms", type=int, default=300)
+    parser.add_argument("--tts-seconds", type=float, default=1.0)
+    parser.add_argument("--function-every", type=int, default=2)
+    parser.add_argument("--backendless-latency-ms", type=float, default=150)
+    parser.add_argument("--deepgram-port", type=int, default=8765)
+    parser.add_argument("--backendless-port", type=int, default=8766)
+    parser.add_argument("--url", help="Use an already running server instead of starting client.py")
+    parser.add_argument("--server-pid", type=int, help="PID of that server, for CPU and memory sampling")
+    args = parser.parse_args()
+    if args.url and not args.server_pid:
+        parser.error("--url needs --server-pid")
+    asyncio.run(main(args))
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Backendless REST data API, for load tests.
+
+Serves GET /{app_id}/{api_key}/data/{table} lookups (always one matching row) and
+POST /{app_id}/{api_key}/data/Requests quote creation, each after a configurable
+latency. error_rate makes that share of calls return 503, for exercising the
+circuit breakers.
+
+    python -m benchmarks.mock_backendless --port 8766 --latency-ms 150
+    BACKENDLESS_API_URL=http://127.0.0.1:8766 python client.py
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import uuid
+
+from aiohttp import web
+
+ROWS = {
+    "Customers": {"objectId": "9493B230-DDA6-4EE0-816E-4DEEE9CE012C", "Company": "Epic Construction"},
+    "Locations": {
+        "objectId": "mock-loc-001",
+        "AddressOnlyString": "123 Main Street",
+        "FullAddressString": "123 Main Street, Madison, WI 53703",
+        "ParentAccountName": "Epic Construction",
+        "CustomerOid": "9493B230-DDA6-4EE0-816E-4DEEE9CE012C",
+    },
+}
+
+
+class MockBackendless:
+    def __init__(self, host="127.0.0.1", port=8766, latency_ms=150, jitter_ms=50, error_rate=0.0):
+        self.host = host
+        self.port = port
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._request_numbers = itertools.count(100000)
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{app_id}/{api_key}/data/{table}", self._lookup)
+        app.router.add_post("/{app_id}/{api_key}/data/{table}", self._create)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def stats(self):
+        return {"requests": self.requests, "errors": self.errors}
+
+    async def _delay(self):
+        """Sleep for the configured latency; True if this call should fail."""
+        self.requests += 1
+        await asyncio.sleep(max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return True
+        return False
+
+    async def _lookup(self, request):
+        if await self._delay():
+            return web.json_response({"code": 503, "message": "Mock outage"}, status=503)
+        row = ROWS.get(request.match_info["table"])
+        return web.json_response([row] if row else [])
+
+    async def _create(self, request):
+        if await self._delay():
+            return web.json_response({"code": 503, "message": "Mock outage"}, status=503)
+        quote = await request.json()
+        quote.update(objectId=str(uuid.uuid4()), InternalRequestNumber=f"IRN-{next(self._request_numbers)}")
+        return web.json_response(quote)
+
+
+async def _main(args):
+    backend = await MockBackendless(args.host, args.port, args.latency_ms, args.jitter_ms, args.error_rate).start()
+    print(f"Mock Backendless listening on http://{args.host}:{args.port}")
+    try:
+        await asyncio.Future()
+    finally:
+        await backend.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency-ms", type=float, default=150, help="Mean response time")
+    parser.add_argument("--jitter-ms", type=float, default=50, help="Uniform +/- spread around the mean")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with 503")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Deepgram Voice Agent WebSocket, for load tests.
+
+Speaks enough of the protocol for client.py: Welcome, Settings/SettingsApplied,
+binary mic audio in, FunctionCallRequest/FunctionCallResponse, ConversationText,
+binary TTS audio out and AgentAudioDone. A user turn ends when the server forwards
+the end-of-speech signal (an empty binary message). Every function_every-th turn
+asks for a get_customer call first, so Backendless latency shows up in the
+measured turn latency.
+
+    python -m benchmarks.mock_deepgram --port 8765
+    VOICE_AGENT_URL=ws://127.0.0.1:8765 python client.py
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import struct
+import uuid
+
+import websockets
+
+TTS_CHUNK_MS = 50  # Deepgram streams TTS in small binary messages
+
+
+def tts_chunk(sample_rate, chunk_ms=TTS_CHUNK_MS, frequency=220.0):
+    """One chunk of a quiet PCM16 tone, reused for every TTS message."""
+    count = sample_rate * chunk_ms // 1000
+    samples = (int(3000 * math.sin(2 * math.pi * frequency * i / sample_rate)) for i in range(count))
+    return struct.pack(f"<{count}h", *samples)
+
+
+class MockVoiceAgent:
+    """
+    One server; each connection is an independent conversation. think_ms is the
+    simulated LLM delay before the reply, tts_seconds the length of each spoken reply.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765, think_ms=300, tts_seconds=1.0,
+                 function_every=2, realtime=True):
+        self.host = host
+        self.port = port
+        self.think_ms = think_ms
+        self.tts_seconds = tts_seconds
+        self.function_every = function_every
+        self.realtime = realtime
+        self.connections = 0
+        self.turns = 0
+        self.function_calls = 0
+        self.audio_bytes_in = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await websockets.serve(self._handle, self.host, self.port, max_size=None)
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def stats(self):
+        return {"connections": self.connections, "turns": self.turns,
+                "function_calls": self.function_calls, "audio_bytes_in": self.audio_bytes_in}
+
+    async def _handle(self, ws, path=None):
+        self.connections += 1
+        await ws.send(json.dumps({"type": "Welcome", "request_id": str(uuid.uuid4())}))
+        sample_rate = 24000
+        heard = 0
+        pending_calls = {}
+        turn_numbers = itertools.count(1)
+        turns = set()  # Replies run as tasks so function call responses can still be read
+        try:
+            async for message in ws:
+                if isinstance(message, bytes):
+                    if message:
+                        heard += len(message)
+                        self.audio_bytes_in += len(message)
+                    elif heard:
+                        heard = 0
+                        turn = asyncio.create_task(self._user_turn(ws, next(turn_numbers), sample_rate, pending_calls))
+                        turns.add(turn)
+                        turn.add_done_callback(turns.discard)
+                    continue
+
+                msg = json.loads(message)
+                if msg.get("type") == "Settings":
+                    sample_rate = msg.get("audio", {}).get("output", {}).get("sample_rate", sample_rate)
+                    await ws.send(json.dumps({"type": "SettingsApplied"}))
+                elif msg.get("type") == "FunctionCallResponse":
+                    waiter = pending_calls.pop(msg.get("id"), None)
+                    if waiter and not waiter.done():
+                        waiter.set_result(msg)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        finally:
+            for turn in list(turns):
+                turn.cancel()
+
+    async def _user_turn(self, ws, number, sample_rate, pending_calls):
+        try:
+            await self._reply(ws, number, sample_rate, pending_calls)
+        except (websockets.exceptions.ConnectionClosed, asyncio.TimeoutError):
+            pass
+
+    async def _reply(self, ws, number, sample_rate, pending_calls):
+        self.turns += 1
+        await ws.send(json.dumps({"type": "ConversationText", "role": "user",
+                                  "content": f"Benchmark utterance {number}"}))
+        if self.function_every and number % self.function_every == 0:
+            call_id = str(uuid.uuid4())
+            waiter = asyncio.get_running_loop().create_future()
+            pending_calls[call_id] = waiter
+            self.function_calls += 1
+            await ws.send(json.dumps({
+                "type": "FunctionCallRequest",
+                "functions": [{
+                    "id": call_id,
+                    "name": "get_customer",
+                    "arguments": json.dumps({"company_name": "Epic Construction"}),
+                    "client_side": True,
+                }],
+            }))
+            await asyncio.wait_for(waiter, timeout=30)
+
+        await asyncio.sleep(self.think_ms / 1000)
+        await ws.send(json.dumps({"type": "ConversationText", "role": "assistant",
+                                  "content": f"Benchmark reply {number}"}))
+        await ws.send(json.dumps({"type": "AgentStartedSpeaking"}))
+        chunk = tts_chunk(sample_rate)
+        for _ in range(max(1, int(self.tts_seconds * 1000 / TTS_CHUNK_MS))):
+            await ws.send(chunk)
+            if self.realtime:
+                await asyncio.sleep(TTS_CHUNK_MS / 1000)
+        await ws.send(json.dumps({"type": "AgentAudioDone"}))
+
+
+async def _main(args):
+    agent = await MockVoiceAgent(args.host, args.port, args.think_ms, args.tts_seconds,
+                                 args.function_every, not args.burst).start()
+    print(f"Mock Voice Agent listening on ws://{args.host}:{args.port}")
+    try:
+        await asyncio.Future()
+    finally:
+        await agent.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--think-ms", type=int, default=300, help="Simulated LLM delay before each reply")
+    parser.add_argument("--tts-seconds", type=float, default=1.0, help="Length of each spoken reply")
+    parser.add_argument("--function-every", type=int, default=2, help="Every Nth turn makes a get_customer call (0 = never)")
+    parser.add_argument("--burst", action="store_true", help="Send TTS audio as fast as possible instead of in real time")
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
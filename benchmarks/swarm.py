@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Swarm of simulated callers for load tests. Each caller connects to client.py over
+Socket.IO, starts a voice agent, and then for every turn streams one utterance of
+PCM in real time, sends end-of-speech and waits for the agent's reply.
+
+Turn latency is measured from end-of-speech to the first agent_audio packet.
+Mic audio goes over the raw /audio-ws WebSocket, as in the browser, unless
+transport="socketio" is given.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import struct
+import sys
+import os
+import time
+import wave
+
+import socketio
+import websockets
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.audio_frames import pack_frame
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * 2 * FRAME_MS // 1000
+
+
+def load_pcm(path=None, seconds=2.0):
+    """
+    Mic audio for one utterance, as 20ms PCM16 frames. path may be a 16 kHz mono
+    WAV file or raw s16le PCM; without one, a synthetic voiced signal is used.
+    """
+    if path:
+        if path.endswith(".wav"):
+            with wave.open(path, "rb") as wav:
+                if wav.getframerate() != SAMPLE_RATE or wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                    raise ValueError(f"{path} must be 16 kHz mono 16-bit PCM")
+                pcm = wav.readframes(wav.getnframes())
+        else:
+            with open(path, "rb") as f:
+                pcm = f.read()
+    else:
+        count = int(SAMPLE_RATE * seconds)
+        # A 150 Hz buzz with harmonics is loud and "noisy" enough to pass the VAD
+        pcm = struct.pack(f"<{count}h", *(
+            int(4000 * (math.sin(2 * math.pi * 150 * i / SAMPLE_RATE) + 0.5 * math.sin(2 * math.pi * 1350 * i / SAMPLE_RATE)))
+            for i in range(count)
+        ))
+    return [pcm[i:i + FRAME_BYTES] for i in range(0, len(pcm) - FRAME_BYTES + 1, FRAME_BYTES)]
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class Caller:
+    def __init__(self, number, server_url, frames, turns, transport="websocket", timeout=30):
+        self.number = number
+        self.server_url = server_url.rstrip("/")
+        self.frames = frames
+        self.turns = turns
+        self.transport = transport
+        self.timeout = timeout
+        self.latencies = []  # Seconds from end-of-speech to first agent audio, per turn
+        self.errors = []
+        self.sio = socketio.AsyncClient(reconnection=False)
+        self._session = None
+        self._welcome = asyncio.Event()
+        self._first_audio = asyncio.Event()
+        self._turn_done = asyncio.Event()
+        self._audio_ws = None
+        self._seq = 0
+
+        self.sio.on("session_started", self._on_session_started)
+        self.sio.on("agent_response", self._on_agent_response)
+        self.sio.on("agent_audio", self._on_agent_audio)
+
+    async def _on_session_started(self, data):
+        self._session = data
+
+    async def _on_agent_response(self, data):
+        msg = json.loads(data) if isinstance(data, str) else data
+        if msg.get("type") == "Welcome":
+            self._welcome.set()
+        elif msg.get("type") == "AgentAudioDone":
+            self._turn_done.set()
+
+    async def _on_agent_audio(self, packet):
+        self._first_audio.set()
+
+    async def _send_frame(self, payload=b""):
+        frame = pack_frame(self._seq, time.monotonic() * 1000, payload)
+        self._seq += 1
+        if self._audio_ws is not None:
+            await self._audio_ws.send(frame)
+        else:
+            await self.sio.emit("user_audio", frame)
+
+    async def run(self):
+        try:
+            await self.sio.connect(self.server_url, transports=["websocket"])
+            await self.sio.emit("start_voice_agent", {
+                "industry": "tech_support",
+                "voiceModel": "aura-2-thalia-en",
+                "session_id": f"bench_{os.getpid()}_{self.number}_{int(time.time())}",
+                "codecs": ["pcm16"],
+            })
+            await asyncio.wait_for(self._welcome.wait(), self.timeout)
+            if self.transport == "websocket" and self._session and self._session.get("audio_token"):
+                ws_url = self.server_url.replace("http", "ws", 1)
+                self._audio_ws = await websockets.connect(f"{ws_url}/audio-ws?token={self._session['audio_token']}")
+
+            for _ in range(self.turns):
+                self._first_audio.clear()
+                self._turn_done.clear()
+                for frame in self.frames:
+                    await self._send_frame(frame)
+                    await asyncio.sleep(FRAME_MS / 1000)
+                speech_end = time.perf_counter()
+                await self._send_frame()  # End-of-speech
+                await asyncio.wait_for(self._first_audio.wait(), self.timeout)
+                self.latencies.append(time.perf_counter() - speech_end)
+                await asyncio.wait_for(self._turn_done.wait(), self.timeout)
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+        finally:
+            if self._audio_ws is not None:
+                await self._audio_ws.close()
+            if self.sio.connected:
+                await self.sio.emit("stop_voice_agent")
+                await self.sio.disconnect()
+
+
+async def run_swarm(server_url, callers=10, turns=3, frames=None, ramp_seconds=1.0, transport="websocket"):
+    """Run callers concurrently (started ramp_seconds apart in total); returns a summary dict."""
+    frames = frames or load_pcm()
+    swarm = [Caller(n, server_url, frames, turns, transport) for n in range(callers)]
+
+    async def staggered(caller):
+        await asyncio.sleep(ramp_seconds * caller.number / max(1, callers))
+        await caller.run()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(staggered(caller) for caller in swarm))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for caller in swarm for latency in caller.latencies]
+    errors = [error for caller in swarm for error in caller.errors]
+    return {
+        "callers": callers,
+        "turns_completed": len(latencies),
+        "turns_expected": callers * turns,
+        "elapsed_seconds": round(elapsed, 2),
+        "throughput_turns_per_second": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "turn_latency_ms": {
+            name: round(percentile(latencies, fraction) * 1000, 1) if latencies else None
+            for name, fraction in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99))
+        },
+        "errors": errors,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="client.py server")
+    parser.add_argument("--callers", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--pcm", help="16 kHz mono WAV or raw s16le file to stream as each utterance")
+    parser.add_argument("--ramp-seconds", type=float, default=1.0)
+    parser.add_argument("--transport", choices=["websocket", "socketio"], default="websocket")
+    args = parser.parse_args()
+    summary = asyncio.run(run_swarm(args.url, args.callers, args.turns, load_pcm(args.pcm),
+                                    args.ramp_seconds, args.transport))
+    print(json.dumps(summary, indent=2))
@@ -1,11 +1,9 @@
-from flask import Flask, render_template, jsonify, send_from_directory
+from flask import Flask, Response, render_template, jsonify, send_from_directory, request
 from flask_socketio import SocketIO
 import asyncio
 import websockets
 import os
 import json
-import queue
-import requests
 import random
 import time
 from dotenv import load_dotenv
@@ -16,11 +14,32 @@ try:
     HAS_GEVENT = True
 except ImportError:
     HAS_GEVENT = False
-from common.agent_functions import FUNCTION_MAP
-from common.agent_templates import AgentTemplates
+from common.agent_functions import FUNCTION_MAP, FUNCTION_VALIDATORS
+from common.validation import format_errors
+from common import json_codec
+from common.agent_templates import AgentTemplates, VOICE_AGENT_URL
+from common.audio_buffer import AudioRingBuffer
+from common.audio_frames import FrameSequencer, unpack_frame
+from common.config import AUDIO_BACKPRESSURE, VAD_SETTINGS, MODEL_CATALOGUE, CONNECTION_POOL, CONVERSATION_LOG, AGENT_EVENTS, CONNECTION_STATUS, PROFILING, WATCHDOG, DRAIN, HEALTH
+from common.event_filter import EventFilter
+from common.status_notifier import ConnectionStatusNotifier
+from common.conversation_log import ConversationLog
+from common.agent_pool import AgentConnectionPool
+from common.model_catalogue import ModelCatalogue
+from common.resilience import breaker_metrics
+from common.profiler import SamplingProfiler, SlowCallbackRecorder, set_slow_callback_threshold
+from common.watchdog import Watchdog
+from common.drain import Drain
+from common.session_auth import new_session_id, new_resume_token, hash_token, is_valid_session_id, verify_resume_token
+from common.health import DeepgramKeyCheck, readiness
+from common.business_logic import lookup_flight, quote_pipeline
+from common.vad import VoiceActivityDetector
+from common.tts_relay import TTSRelay
+from common.audio_codec import get_codec
 import logging
 from common.log_formatter import CustomFormatter
 import threading
+import secrets
 import signal # Import the signal module
 import time # Import the time module
 
@@ -51,6 +70,10 @@ console_handler = logging.StreamHandler()
 console_handler.setFormatter(CustomFormatter())
 logger.addHandler(console_handler)
 logger.propagate = False
+# asyncio reports slow callbacks (see PROFILING) through its own logger
+asyncio_logger = logging.getLogger("asyncio")
+asyncio_logger.addHandler(console_handler)
+asyncio_logger.propagate = False
 
 
 # --- Graceful Shutdown Handler ---
@@ -98,30 +121,85 @@ def _safe_sleep(seconds):
     except Exception as e:
         logger.debug(f"Sleep interrupted (normal during shutdown): {e}")
 
-def _graceful_shutdown_handler(signum, frame):
-    """Signal handler for graceful shutdown."""
-    logger.info("Shutdown signal received. Cleaning up...")
-
-    # Stop voice agent gracefully
-    global voice_agent, _agent_thread
-    if voice_agent:
-        voice_agent.stop()
-    if _agent_thread and _agent_thread.is_alive():
-        _agent_thread.join(timeout=5)
+def _stop_all_agents(timeout=5):
+    """Stop every agent and wait for its thread; state is saved as each run() exits."""
+    agents = list(voice_agents.values())
+    for agent in agents:
+        agent.stop()
+    for thread in list(_agent_threads.values()):
+        if thread.is_alive():
+            thread.join(timeout=timeout)
+    for agent in agents:
+        if agent.is_running:  # Thread didn't finish in time; keep what we have
+            agent.save_state()
+
+def _drain_and_exit():
+    """Let active calls finish (up to DRAIN's deadline), flush state and quotes, then exit."""
+    if not drain.wait(log=logger.info):
+        logger.warning(f"Drain deadline reached; stopping {len(voice_agents)} remaining call(s).")
+    _stop_all_agents()
+
+    # Function calls submit quotes from executor threads; let them land (or be saved locally)
+    flush_deadline = time.monotonic() + DRAIN["quote_flush_seconds"]
+    while quote_pipeline.in_flight() and time.monotonic() < flush_deadline:
+        _safe_sleep(0.2)
+    if quote_pipeline.in_flight():
+        logger.warning(f"Exiting with {quote_pipeline.in_flight()} quote submission(s) still in flight.")
+    if agent_pool:
+        agent_pool.stop()
 
     _shutdown_event.set()
 
     # Clean up old sessions before shutdown
     cleanup_old_sessions()
+    logger.info("Drain complete. Exiting.")
 
     # Immediate exit without sleep to avoid gevent blocking
     os._exit(0)
 
+def _graceful_shutdown_handler(signum, frame):
+    """Signal handler: the first signal starts a drain, a second one exits at once."""
+    if not drain.begin():
+        logger.warning("Second shutdown signal received; exiting without waiting for calls.")
+        _stop_all_agents(timeout=1)
+        _shutdown_event.set()
+        os._exit(0)
+    logger.info(f"Shutdown signal received. Refusing new calls and draining {len(voice_agents)} active call(s) "
+                f"for up to {DRAIN['deadline_seconds']}s (signal again to exit now)...")
+    socketio.start_background_task(_drain_and_exit)
+
+drain = Drain(
+    lambda: len(voice_agents) + len(_agents_starting),
+    quote_pipeline.in_flight,
+    _safe_sleep,
+    deadline_seconds=DRAIN["deadline_seconds"],
+    poll_seconds=DRAIN["poll_seconds"],
+)
+
 # Register signal handlers for graceful termination
 signal.signal(signal.SIGINT, _graceful_shutdown_handler)
 signal.signal(signal.SIGTERM, _graceful_shutdown_handler)
 
 
+# Deepgram TTS model list, fetched in the background so page loads never wait on it
+model_catalogue = ModelCatalogue(
+    lambda: os.environ.get("DEEPGRAM_API_KEY"),
+    ttl_seconds=MODEL_CATALOGUE["ttl_seconds"],
+    snapshot_path=MODEL_CATALOGUE["snapshot_path"],
+    timeout=MODEL_CATALOGUE["timeout"],
+    retry_seconds=MODEL_CATALOGUE["retry_seconds"],
+)
+model_catalogue.get()  # Load the snapshot and start a refresh if it is stale
+
+# Cached Deepgram API key validity for /readyz; checked in the background, never on the request path
+deepgram_key = DeepgramKeyCheck(
+    lambda: os.environ.get("DEEPGRAM_API_KEY"),
+    ttl_seconds=HEALTH["key_check_ttl_seconds"],
+    timeout=HEALTH["key_check_timeout"],
+)
+_process_started = time.time()
+
+
 # --- Flask Routes ---
 @app.route('/')
 def index():
@@ -131,63 +209,159 @@ def index():
 def serve_audio_processor():
     return send_from_directory('static', 'audio-processor.js', mimetype='application/javascript')
 
+@app.route('/playback-processor.js')
+def serve_playback_processor():
+    return send_from_directory('static', 'playback-processor.js', mimetype='application/javascript')
+
 @app.route("/industries")
 def get_industries():
     return AgentTemplates.get_available_industries()
 
 @app.route("/tts-models")
 def get_tts_models():
+    # Served from cache; a stale list triggers a background refresh instead of blocking the page
+    models, info = model_catalogue.get()
+    return jsonify({"models": models, "catalogue": info})
+
+@app.route("/metrics")
+def get_metrics():
+    """Runtime metrics as JSON: active sessions, connection pool and Backendless calls."""
+    return jsonify({
+        "active_agents": len(voice_agents),
+        "connection_pool": agent_pool.stats() if agent_pool else None,
+        "breakers": breaker_metrics(),
+        "single_flight": lookup_flight.stats(),
+        "quotes": quote_pipeline.stats(),
+        "validation": FUNCTION_VALIDATORS.metrics(),
+        "watchdog": watchdog.metrics(),
+        "drain": drain.status(),
+    })
+
+@app.route("/healthz")
+def healthz():
+    """Liveness: the process is up and serving requests."""
+    return jsonify({"status": "ok", "uptime_seconds": round(time.time() - _process_started, 1)})
+
+@app.route("/readyz")
+def readyz():
+    """
+    Readiness for load balancers: 503 while draining, at capacity, with a lagging
+    event loop or a rejected Deepgram key, so new calls go to another instance.
+    """
+    ready, checks = readiness(
+        active_sessions=len(voice_agents) + len(_agents_starting),
+        max_sessions=HEALTH["max_sessions"],
+        loop_lag_ms=watchdog.max_loop_lag_ms(),
+        max_loop_lag_ms=HEALTH["max_loop_lag_ms"],
+        breakers=breaker_metrics(),
+        key_status=deepgram_key.status(),
+        draining=drain.draining,
+        fail_on_open_breaker=HEALTH["fail_on_open_breaker"],
+    )
+    return jsonify(dict(drain.status(), ready=ready, checks=checks)), 200 if ready else 503
+
+_profile_lock = threading.Lock()  # One profile at a time
+
+def _admin_authorized():
+    """True if the request carries ADMIN_TOKEN (X-Admin-Token or Authorization: Bearer)."""
+    expected = os.environ.get("ADMIN_TOKEN")
+    supplied = request.headers.get("X-Admin-Token") or request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+    return bool(expected) and secrets.compare_digest(expected, supplied)
+
+@app.route("/admin/profile")
+def admin_profile():
+    """
+    Sample every thread's stack for ?seconds=N (default 10) and return them as a
+    collapsed-stack file for flamegraph.pl or speedscope (?format=json for a summary).
+    While it runs, agent event loops log callbacks that block longer than
+    ?slow_callback_ms. Disabled unless ADMIN_TOKEN is set.
+    """
+    if not os.environ.get("ADMIN_TOKEN"):
+        return jsonify({"error": "Not found"}), 404
+    if not _admin_authorized():
+        return jsonify({"error": "Unauthorized"}), 401
     try:
-        dg_api_key = os.environ.get("DEEPGRAM_API_KEY")
-        if not dg_api_key:
-            return jsonify({"error": "DEEPGRAM_API_KEY not set"}), 500
-        response = requests.get(
-            "https://api.deepgram.com/v1/models",
-            headers={"Authorization": f"Token {dg_api_key}"},
-            timeout=5,
-        )
-        response.raise_for_status()
-        data = response.json()
-        formatted_models = [
-            {
-                "name": model.get("canonical_name", model.get("name")),
-                "display_name": model.get("name"),
-                "language": model.get("languages", ["en"])[0],
-            }
-            for model in data.get("tts", [])
-            if model.get("architecture") == "aura-2"
-        ]
-        return jsonify({"models": formatted_models})
+        seconds = min(float(request.args.get("seconds", 10)), PROFILING["max_seconds"])
+        interval_ms = float(request.args.get("interval_ms", PROFILING["interval_ms"]))
+        slow_callback_ms = float(request.args.get("slow_callback_ms", PROFILING["profile_slow_callback_ms"]))
+    except ValueError:
+        return jsonify({"error": "seconds, interval_ms and slow_callback_ms must be numbers"}), 400
+    if seconds <= 0 or interval_ms <= 0:
+        return jsonify({"error": "seconds and interval_ms must be positive"}), 400
+    interval_ms = max(interval_ms, PROFILING["min_interval_ms"])
+    if not _profile_lock.acquire(blocking=False):
+        return jsonify({"error": "A profile is already running"}), 409
+
+    profiler = SamplingProfiler(interval_ms=interval_ms)
+    recorder = SlowCallbackRecorder()
+    loops = {id(agent.loop): agent.loop for agent in list(voice_agents.values()) if agent.loop}.values()
+    try:
+        asyncio_logger.addHandler(recorder)
+        for loop in loops:
+            set_slow_callback_threshold(loop, slow_callback_ms)
+        logger.info(f"Profiling for {seconds}s ({interval_ms}ms interval, {len(loops)} agent loop(s))")
+        profiler.start(seconds)
+        while not profiler.done:
+            _safe_sleep(0.1)
+    finally:
+        for loop in loops:
+            set_slow_callback_threshold(loop, PROFILING["slow_callback_ms"])
+        asyncio_logger.removeHandler(recorder)
+        _profile_lock.release()
+
+    if request.args.get("format") == "json":
+        return jsonify(dict(profiler.summary(), slow_callbacks=recorder.records))
+    return Response(profiler.collapsed(), mimetype="text/plain",
+                    headers={"Content-Disposition": "attachment; filename=profile.collapsed"})
+
+def _read_session_state(session_id):
+    """Saved state for session_id, or None if the ID is malformed or nothing was saved."""
+    if not is_valid_session_id(session_id):
+        return None
+    state_file = os.path.join("sessions", session_id, "state.json")
+    if not os.path.exists(state_file):
+        return None
+    with open(state_file, 'r') as f:
+        return json.load(f)
+
+def _can_resume(session_id, resume_token):
+    """A session's history is only replayed to the browser holding the resume token issued with it."""
+    try:
+        return verify_resume_token(_read_session_state(session_id), resume_token)
     except Exception as e:
-        logger.error(f"Error fetching TTS models: {e}")
-        return jsonify({"error": str(e)}), 500
+        logger.warning(f"Error reading session {session_id}: {e}")
+        return False
 
-@app.route("/sessions")
+@app.route("/sessions", methods=["POST"])
 def get_sessions():
-    """Get list of available sessions for recovery"""
+    """
+    List the caller's own sessions for recovery. The browser posts the resume
+    tokens it holds ({"sessions": {session_id: resume_token}}); other sessions
+    are never listed.
+    """
     try:
-        sessions_dir = "sessions"
-        if not os.path.exists(sessions_dir):
-            return jsonify({"sessions": []})
+        tokens = (request.get_json(silent=True) or {}).get("sessions") or {}
+        if not isinstance(tokens, dict):
+            return jsonify({"error": "sessions must be an object of session_id: resume_token"}), 400
 
         sessions = []
-        for session_dir in os.listdir(sessions_dir):
-            state_file = os.path.join(sessions_dir, session_dir, "state.json")
-            if os.path.exists(state_file):
-                try:
-                    with open(state_file, 'r') as f:
-                        state = json.load(f)
-                    sessions.append({
-                        "session_id": state.get("session_id"),
-                        "industry": state.get("industry", "unknown"),
-                        "voiceModel": state.get("voiceModel", "unknown"),
-                        "message_count": state.get("message_count", 0),
-                        "start_time": state.get("start_time"),
-                        "last_updated": state.get("timestamp"),
-                        "is_connected": state.get("is_connected", False)
-                    })
-                except Exception as e:
-                    logger.warning(f"Error reading session {session_dir}: {e}")
+        for session_id, resume_token in tokens.items():
+            try:
+                state = _read_session_state(session_id)
+            except Exception as e:
+                logger.warning(f"Error reading session {session_id}: {e}")
+                continue
+            if not verify_resume_token(state, resume_token):
+                continue
+            sessions.append({
+                "session_id": state.get("session_id"),
+                "industry": state.get("industry", "unknown"),
+                "voiceModel": state.get("voiceModel", "unknown"),
+                "message_count": state.get("message_count", 0),
+                "start_time": state.get("start_time"),
+                "last_updated": state.get("timestamp"),
+                "is_connected": state.get("is_connected", False)
+            })
 
         # Sort by last updated, most recent first
         sessions.sort(key=lambda x: x.get("last_updated", 0), reverse=True)
@@ -196,29 +370,114 @@ def get_sessions():
         logger.error(f"Error listing sessions: {e}")
         return jsonify({"error": str(e)}), 500
 
+# --- Deepgram Connections ---
+DEEPGRAM_CONNECT_OPTIONS = {
+    "open_timeout": 20,
+    "close_timeout": 20,
+    "ping_interval": 10,
+    "ping_timeout": 30
+}
+
+# Optional warm pool of pre-opened agent sockets; pooled agents share its event loop
+agent_pool = None
+if CONNECTION_POOL["enabled"]:
+    agent_pool = AgentConnectionPool(
+        VOICE_AGENT_URL,
+        lambda: os.environ.get("DEEPGRAM_API_KEY"),
+        min_idle=CONNECTION_POOL["min_idle"],
+        max_idle=CONNECTION_POOL["max_idle"],
+        rate_window_seconds=CONNECTION_POOL["rate_window_seconds"],
+        max_age_seconds=CONNECTION_POOL["max_age_seconds"],
+        health_check_interval=CONNECTION_POOL["health_check_interval"],
+        connect_kwargs=DEEPGRAM_CONNECT_OPTIONS,
+    )
+    agent_pool.start()
+
 
 # --- Voice Agent Class ---
 class VoiceAgent:
-    def __init__(self, industry="tech_support", voiceModel="aura-2-thalia-en", voiceName="", session_id=None):
+    def __init__(self, industry="tech_support", voiceModel="aura-2-thalia-en", voiceName="", session_id=None, sid=None, codecs=None, event_types=None, resume_token=None):
+        self.sid = sid  # Socket.IO sid of the browser that owns this agent
         self.industry = industry
         self.voiceModel = voiceModel
         self.voiceName = voiceName
-        self.session_id = session_id or f"session_{int(time.time())}"
+        self.session_id = session_id or new_session_id()
+        # Only the browser holding this token can resume the session (see _can_resume)
+        self.resume_token = resume_token or new_resume_token()
         self.dg_client = None
-        self.audio_queue = queue.Queue(maxsize=1000)  # Prevent memory issues
         self.is_running = False
-        self.is_connected = False
+        self._is_connected = False
+        self._last_connection_error = None
+        self.message_count = 0
+        # Pushes connection_status to the browser when is_connected or the last error changes
+        self.status_notifier = ConnectionStatusNotifier(
+            lambda status: socketio.emit("connection_status", status, to=self.sid),
+            self.connection_status,
+            heartbeat_seconds=CONNECTION_STATUS["heartbeat_seconds"],
+        )
         self.connection_attempts = 0
         self.max_connection_attempts = 5
         self.reconnect_delay = 1.0  # Start with 1 second delay
         self.max_reconnect_delay = 30.0  # Max 30 seconds
-        self.last_connection_error = None
-        self.message_count = 0
         self.start_time = time.time()
 
         # FIX: pass keyword args to avoid parameter order mismatch
         self.agent_templates = AgentTemplates(industry=industry, voiceModel=voiceModel, voiceName=voiceName)
 
+        # Compressed browser <-> server audio, negotiated from the codecs the browser supports
+        self.transport = self.agent_templates.negotiate_transport(codecs)
+        self.mic_codec = get_codec(self.transport["mic_codec"], self.agent_templates.user_audio_sample_rate, direction="mic")
+        # Mic frames arrive with a (seq, timestamp) header, over /audio-ws or Socket.IO user_audio
+        self.audio_token = secrets.token_urlsafe(16)  # Lets the browser attach its raw audio WebSocket
+        self.frame_sequencer = FrameSequencer()
+
+        # Bounded, non-blocking buffer for inbound mic audio (sized in ms, not items)
+        self.audio_buffer = AudioRingBuffer(
+            self.agent_templates.user_audio_bytes_per_sec,
+            max_ms=AUDIO_BACKPRESSURE["max_buffer_ms"],
+            policy=AUDIO_BACKPRESSURE["policy"],
+            resume_ratio=AUDIO_BACKPRESSURE["resume_ratio"],
+            silence_rms=AUDIO_BACKPRESSURE["silence_rms"],
+            on_pause_change=self._on_audio_pause_change,
+        )
+
+        # Forwards only the agent events (and fields) this browser uses
+        self.event_filter = EventFilter.for_session(
+            lambda text: socketio.emit("agent_response", text, to=self.sid),
+            lambda text: socketio.emit("agent_response_batch", text, to=self.sid),
+            AGENT_EVENTS,
+            event_types,
+        )
+
+        # Batches TTS frames into ~100ms packets for the owning browser only
+        self.tts_relay = TTSRelay(
+            lambda packet: socketio.emit("agent_audio", packet, to=self.sid),
+            self.agent_templates.agent_audio_bytes_per_sec,
+            codec=get_codec(self.transport["agent_codec"], self.agent_templates.agent_audio_sample_rate),
+        )
+
+        self.playback_stats = None  # Latest jitter-buffer stats reported by the browser
+        self.loop = None  # Event loop running this agent, once run() starts
+
+        # What has been said so far, replayed to Deepgram on reconnect or resume
+        self.conversation = ConversationLog(
+            max_messages=CONVERSATION_LOG["max_messages"],
+            max_chars=CONVERSATION_LOG["max_chars"],
+            max_entry_chars=CONVERSATION_LOG["max_entry_chars"],
+        )
+
+        # Optional VAD stage that skips forwarding silence upstream
+        self.vad = None
+        if VAD_SETTINGS["enabled"]:
+            self.vad = VoiceActivityDetector(
+                self.agent_templates.user_audio_bytes_per_sec,
+                energy_threshold=VAD_SETTINGS["energy_threshold"],
+                zcr_threshold=VAD_SETTINGS["zcr_threshold"],
+                hangover_ms=VAD_SETTINGS["hangover_ms"],
+                preroll_ms=VAD_SETTINGS["preroll_ms"],
+                keepalive_ms=VAD_SETTINGS["keepalive_ms"],
+            )
+
         # Create session directory for persistence
         self.session_dir = os.path.join("sessions", self.session_id)
         os.makedirs(self.session_dir, exist_ok=True)
@@ -227,11 +486,39 @@ class VoiceAgent:
         # Load previous state if available
         self.load_state()
 
+    @property
+    def is_connected(self):
+        return self._is_connected
+
+    @is_connected.setter
+    def is_connected(self, value):
+        self._is_connected = value
+        self.status_notifier.update()
+
+    @property
+    def last_connection_error(self):
+        return self._last_connection_error
+
+    @last_connection_error.setter
+    def last_connection_error(self, value):
+        self._last_connection_error = value
+        self.status_notifier.update()
+
+    def connection_status(self):
+        """Status payload for connection_status events"""
+        return {
+            "connected": self._is_connected,
+            "session_id": self.session_id,
+            "message_count": self.message_count,
+            "last_error": str(self._last_connection_error) if self._last_connection_error else None
+        }
+
     def save_state(self):
         """Save current session state to disk"""
         try:
             state = {
                 "session_id": self.session_id,
+                "resume_token_hash": hash_token(self.resume_token),
                 "industry": self.industry,
                 "voiceModel": self.voiceModel,
                 "voiceName": self.voiceName,
@@ -240,6 +527,14 @@ class VoiceAgent:
                 "connection_attempts": self.connection_attempts,
                 "last_connection_error": str(self.last_connection_error) if self.last_connection_error else None,
                 "is_connected": self.is_connected,
+                "dropped_audio_frames": self.audio_buffer.dropped_frames,
+                "uplink_stats": self.frame_sequencer.stats(),
+                "transport": self.transport,
+                "vad_stats": self.vad.stats() if self.vad else None,
+                "playback_stats": self.playback_stats,
+                "event_stats": self.event_filter.stats(),
+                "status_stats": self.status_notifier.stats(),
+                "conversation": self.conversation.to_state(),
                 "timestamp": time.time()
             }
             with open(self.state_file, 'w') as f:
@@ -258,44 +553,67 @@ class VoiceAgent:
                 self.message_count = state.get("message_count", 0)
                 self.connection_attempts = state.get("connection_attempts", 0)
                 if state.get("last_connection_error"):
-                    self.last_connection_error = Exception(state["last_connection_error"])
+                    # Restored quietly; only changes from here on are pushed to the browser
+                    self._last_connection_error = Exception(state["last_connection_error"])
+                self.conversation.load_state(state.get("conversation"))
 
-                logger.info(f"Restored session state for {self.session_id}")
+                logger.info(f"Restored session state for {self.session_id} ({len(self.conversation)} conversation entries)")
         except Exception as e:
             logger.warning(f"Failed to load session state: {e}")
 
+    def receive_audio_frame(self, frame):
+        """Queue one framed mic packet; the audio is passed on as a view, not copied."""
+        try:
+            seq, _, payload = unpack_frame(frame)
+        except (TypeError, ValueError) as e:
+            logger.warning(f"Ignoring malformed audio frame: {e}")
+            return
+        if self.frame_sequencer.accept(seq):
+            self.send_audio(payload)
+
     def send_audio(self, audio_chunk):
+        # Never blocks: overflow is handled by the buffer's backpressure policy
         if self.is_running and self.is_connected:
-            try:
-                self.audio_queue.put(audio_chunk, timeout=0.1)  # Non-blocking with timeout
-            except queue.Full:
-                logger.warning("Audio queue full, dropping audio chunk")
+            if len(audio_chunk):
+                audio_chunk = self.mic_codec.decode(audio_chunk)
+            if not self.audio_buffer.put(audio_chunk):
+                logger.warning("Audio chunk larger than the audio buffer, dropping it")
         elif not self.is_connected:
             logger.debug("Not connected, audio chunk ignored")
 
+    def _on_audio_pause_change(self, paused):
+        """Ask the browser to pause or resume mic uploads (pause backpressure policy)."""
+        logger.info(f"Audio buffer {'full, pausing' if paused else 'drained, resuming'} browser uploads "
+                    f"({self.audio_buffer.buffered_ms:.0f} ms buffered)")
+        socketio.emit("audio_backpressure", {
+            "paused": paused,
+            "headroom_ms": None if paused else int(self.audio_buffer.resume_headroom_ms),
+            "session_id": self.session_id,
+        }, to=self.sid)
+
     async def _audio_sender(self, ws):
         try:
             while self.is_running and not _shutdown_event.is_set():
-                try:
-                    audio_chunk = self.audio_queue.get_nowait()
-                    if audio_chunk is not None:
+                audio_chunk = self.audio_buffer.get()
+                if audio_chunk is not None:
+                    # The VAD stage may hold back silence or release buffered pre-roll
+                    outgoing = self.vad.process(audio_chunk) if self.vad else (audio_chunk,)
+                    for chunk in outgoing:
                         try:
-                            # Coerce to bytes for the Deepgram WS client
-                            if isinstance(audio_chunk, (bytes, bytearray, memoryview)):
-                                data_bytes = bytes(audio_chunk)
-                            elif isinstance(audio_chunk, list):
-                                data_bytes = bytes(audio_chunk)
-                            else:
-                                data_bytes = bytes(audio_chunk)
-
-                            await ws.send(data_bytes)
+                            # Chunks are bytes-like (often memoryviews into the received
+                            # frame); websockets sends them as binary frames without copying
+                            await ws.send(chunk)
 
                             # Log when sending empty buffer (end-of-speech signal)
-                            if len(data_bytes) == 0:
+                            if len(chunk) == 0:
                                 logger.info("Sent end-of-speech signal to Deepgram")
+                                if self.vad:
+                                    stats = self.vad.stats()
+                                    logger.info(f"VAD forwarded {stats['frames_forwarded']}/{stats['frames_in']} frames, "
+                                                f"saved {stats['bytes_saved']} bytes this session")
                         except Exception as send_err:
                             logger.error(f"Failed to send audio chunk to Deepgram: {send_err}")
-                except queue.Empty:
+                else:
                     await asyncio.sleep(0.01)
         except asyncio.CancelledError:
             logger.info("Audio sender task cancelled.")
@@ -311,23 +629,31 @@ class VoiceAgent:
                     break
                 try:
                     if isinstance(message, str):
-                        msg_json = json.loads(message)
-                        socketio.emit("agent_response", msg_json)
-                        logger.info(f"Server -> Browser: {json.dumps(msg_json)}")
+                        # Log the raw text; it is only parsed once, for routing here
+                        msg_json = json_codec.loads(message)
+                        logger.info(f"Deepgram -> Server: {message}")
+                        msg_type = msg_json.get("type")
+                        if msg_type == "AgentAudioDone":
+                            # The tail packet must reach the browser before the end of the turn
+                            self.tts_relay.end_turn()
+                        self.event_filter.handle(msg_type, msg_json, message)
 
                         # Track messages for state management
                         self.message_count += 1
 
+                        if msg_type == "UserStartedSpeaking":
+                            # Barge-in: don't deliver the rest of the interrupted reply
+                            self.tts_relay.reset()
+                        elif msg_type == "ConversationText":
+                            self.conversation.add_text(msg_json.get("role"), msg_json.get("content"))
+
                         if msg_json.get("type") == 'FunctionCallRequest':
-                            # Clear any lingering audio chunks from the queue. This is crucial to prevent
-                            # a race condition where an old "end-of-speech" signal gets sent after
-                            # the function call response, confusing the Deepgram API.
-                            while not self.audio_queue.empty():
-                                try:
-                                    self.audio_queue.get_nowait()
-                                except queue.Empty:
-                                    break
-                            logger.info("Audio queue cleared for function call.")
+                            # Drop any queued "end-of-speech" signals. This is crucial to prevent
+                            # a race condition where an old end-of-speech signal gets sent after
+                            # the function call response, confusing the Deepgram API. Real audio
+                            # stays queued so the user's next words are not lost.
+                            dropped = self.audio_buffer.drop_end_of_speech()
+                            logger.info(f"Dropped {dropped} queued end-of-speech signal(s) for function call.")
                             await self._handle_function_call(ws, msg_json)
 
                         # Save state periodically (every 10 messages)
@@ -335,7 +661,7 @@ class VoiceAgent:
                             self.save_state()
 
                     elif isinstance(message, bytes):
-                        socketio.emit('agent_audio', message)
+                        self.tts_relay.push(message)
                 except Exception as e:
                     logger.error(f"Error processing received message: {e}")
                     self.last_connection_error = e
@@ -356,7 +682,7 @@ class VoiceAgent:
             self.save_state()
 
     async def _handle_function_call(self, ws, function_call_msg):
-        logger.info(f"Received function call request: {json.dumps(function_call_msg, indent=2)}")
+        logger.info(f"Received function call request: {json_codec.dumps(function_call_msg)}")
         functions = function_call_msg.get('functions', [])
         
         if not functions:
@@ -373,28 +699,37 @@ class VoiceAgent:
             
             if function_name in FUNCTION_MAP:
                 try:
-                    arguments = json.loads(arguments_str)
+                    arguments = json_codec.loads(arguments_str)
                     logger.info(f"Parsed arguments: {arguments}")
-                    
-                    # Pass arguments as a single params dict, matching function signatures
-                    logger.info(f"Calling function {function_name} with arguments: {arguments}")
-                    result = FUNCTION_MAP[function_name](arguments)
-                    logger.info(f"Function {function_name} returned: {result}")
+
+                    # Reject malformed calls before any backend I/O
+                    errors = FUNCTION_VALIDATORS.validate(function_name, arguments)
+                    if errors:
+                        logger.warning(f"Rejected {function_name} call: {format_errors(errors)}")
+                        result = {"error": format_errors(errors), "success": False, "validation_errors": errors}
+                    else:
+                        # Pass arguments as a single params dict, matching function signatures
+                        logger.info(f"Calling function {function_name} with arguments: {arguments}")
+                        # Run in a worker thread so a slow backend call doesn't stall the event loop
+                        result = await asyncio.get_running_loop().run_in_executor(
+                            None, FUNCTION_MAP[function_name], arguments
+                        )
+                        logger.info(f"Function {function_name} returned: {result}")
                     
                     # Format response to match Deepgram's expected structure
                     response = {
                         "type": "FunctionCallResponse",
                         "id": function_id,
                         "name": function_name,
-                        "content": json.dumps(result)
+                        "content": json_codec.dumps(result)
                     }
-                except json.JSONDecodeError as e:
+                except json_codec.JSONDecodeError as e:
                     logger.error(f"Error parsing arguments for {function_name}: {e}")
                     response = {
                         "type": "FunctionCallResponse",
                         "id": function_id,
                         "name": function_name,
-                        "content": json.dumps({"error": f"Invalid arguments format: {str(e)}", "success": False})
+                        "content": json_codec.dumps({"error": f"Invalid arguments format: {str(e)}", "success": False})
                     }
                 except Exception as e:
                     logger.error(f"Error executing function {function_name}: {e}")
@@ -403,7 +738,7 @@ class VoiceAgent:
                         "type": "FunctionCallResponse",
                         "id": function_id,
                         "name": function_name,
-                        "content": json.dumps({"error": str(e), "success": False})
+                        "content": json_codec.dumps({"error": str(e), "success": False})
                     }
             else:
                 logger.error(f"Function {function_name} not found in FUNCTION_MAP: {list(FUNCTION_MAP.keys())}")
@@ -411,11 +746,15 @@ class VoiceAgent:
                     "type": "FunctionCallResponse",
                     "id": function_id,
                     "name": function_name,
-                    "content": json.dumps({"error": f"Function {function_name} not found.", "success": False})
+                    "content": json_codec.dumps({"error": f"Function {function_name} not found.", "success": False})
                 }
             
-            logger.info(f"Sending function response: {json.dumps(response, indent=2)}")
-            await ws.send(json.dumps(response))
+            # Serialize once and reuse the text for the log line
+            response_text = json_codec.dumps(response)
+            logger.info(f"Sending function response: {response_text}")
+            await ws.send(response_text)
+            self.conversation.add_function_call(function_id, function_name, arguments_str, response["content"])
+            self.save_state()  # Function results are what a resumed session most needs
 
     async def _connect_with_retry(self):
         """Connect to Deepgram with exponential backoff retry logic"""
@@ -436,15 +775,16 @@ class VoiceAgent:
         while self.is_running and not _shutdown_event.is_set() and self.connection_attempts < self.max_connection_attempts:
             try:
                 logger.info(f"Connecting to Deepgram... (attempt {self.connection_attempts + 1}/{self.max_connection_attempts})")
-                self.dg_client = await websockets.connect(
-                    self.agent_templates.voice_agent_url,
-                    extra_headers={"Authorization": f"Token {api_key}"},
-                    open_timeout=20,
-                    close_timeout=20,
-                    ping_interval=10,
-                    ping_timeout=30
-                )
+                # Prefer a pre-opened socket from the warm pool when there is one
+                self.dg_client = await agent_pool.claim() if agent_pool else None
+                if self.dg_client is None:
+                    self.dg_client = await websockets.connect(
+                        self.agent_templates.voice_agent_url,
+                        extra_headers={"Authorization": f"Token {api_key}"},
+                        **DEEPGRAM_CONNECT_OPTIONS
+                    )
                 logger.info("Successfully connected to Deepgram.")
+                deepgram_key.report(True)
                 self.is_connected = True
                 self.connection_attempts = 0  # Reset on successful connection
                 self.reconnect_delay = 1.0  # Reset delay
@@ -459,6 +799,7 @@ class VoiceAgent:
                 self.save_state()
 
                 if e.status_code == 401:
+                    deepgram_key.report(False, "HTTP 401 from Deepgram")
                     logger.error("❌ Deepgram authentication failed (HTTP 401)")
                     logger.error("Please check your DEEPGRAM_API_KEY environment variable")
                     logger.error("1. Make sure you've set the correct API key")
@@ -503,6 +844,9 @@ class VoiceAgent:
         return None
 
     async def run(self):
+        self.loop = asyncio.get_running_loop()
+        if PROFILING["slow_callback_ms"]:
+            set_slow_callback_threshold(self.loop, PROFILING["slow_callback_ms"])
         try:
             self.is_running = True
             self.save_state()
@@ -515,8 +859,8 @@ class VoiceAgent:
                     break
 
                 try:
-                    # Send initial settings
-                    await client.send(json.dumps(self.agent_templates.settings))
+                    # Send settings, with the conversation so far when resuming or reconnecting
+                    await client.send(self.agent_templates.settings_json_with_context(self.conversation.messages()))
 
                     # Start sender and receiver tasks
                     sender_task = asyncio.create_task(self._audio_sender(client))
@@ -577,6 +921,8 @@ class VoiceAgent:
                             await client.close()
                         except Exception as e:
                             logger.warning(f"Error closing connection: {e}")
+                    # Mic audio queued for the dead socket is stale; this also lifts a pause
+                    self.audio_buffer.clear()
 
         except Exception as e:
             logger.error(f"Fatal error in agent run: {e}")
@@ -585,6 +931,7 @@ class VoiceAgent:
         finally:
             self.is_running = False
             self.is_connected = False
+            self.event_filter.flush()
             self.save_state()
             logger.info("Agent run loop finished and connection closed.")
 
@@ -595,19 +942,61 @@ class VoiceAgent:
 
 
 # --- SocketIO Event Handlers ---
-voice_agent = None
+# One agent per browser session, keyed by Socket.IO sid
+voice_agents = {}
 # Guard to prevent concurrent starts
 _start_lock = threading.Lock()
-_agent_starting = False
-_agent_thread = None # Keep track of the agent thread
+_agents_starting = set()
+_agent_threads = {} # Keep track of the agent threads
+_background_tasks_started = False
+
+
+def _watched_loops():
+    """Event loops the watchdog probes: the pool's shared loop, or one per agent."""
+    loops = {}
+    for agent in list(voice_agents.values()):
+        if agent.loop is not None:
+            loops["agent-pool" if agent_pool else agent.session_id] = agent.loop
+    return loops
+
+
+def _thread_counts():
+    return {
+        "threads": threading.active_count(),
+        "agent_threads": sum(1 for thread in list(_agent_threads.values()) if thread.is_alive()),
+        "agents_starting": len(_agents_starting),
+    }
+
+
+watchdog = Watchdog(
+    _watched_loops,
+    _thread_counts,
+    interval_seconds=WATCHDOG["interval_seconds"],
+    lag_warn_ms=WATCHDOG["lag_warn_ms"],
+    alert_every_seconds=WATCHDOG["alert_every_seconds"],
+)
+
+
+def _status_heartbeat_loop():
+    """Send due connection_status heartbeats for every session (one task for the whole server)."""
+    while not _shutdown_event.is_set():
+        socketio.sleep(CONNECTION_STATUS["tick_seconds"])
+        for agent in list(voice_agents.values()):
+            try:
+                agent.status_notifier.heartbeat()
+            except Exception as e:
+                logger.warning(f"Connection status heartbeat failed: {e}")
 
 
 def run_agent_in_background(agent: VoiceAgent) -> None:
     """Run the agent's async loop in a dedicated OS thread with its own event loop."""
-    global _agent_starting, voice_agent
     loop = None
     try:
         logger.info(f"Starting new background thread for agent: {threading.current_thread().name}")
+        if agent_pool:
+            # Pooled sockets belong to the pool's loop, so the agent runs there too
+            agent_pool.run(agent.run()).result()
+            return
         loop = asyncio.new_event_loop()
         asyncio.set_event_loop(loop)
         loop.run_until_complete(agent.run())
@@ -618,100 +1007,175 @@ def run_agent_in_background(agent: VoiceAgent) -> None:
             loop.close()
         logger.info(f"Background thread finished for agent: {threading.current_thread().name}")
         with _start_lock:
-            _agent_starting = False
-            if voice_agent is agent: # Only clear if it's the same instance
-                voice_agent = None
+            _agents_starting.discard(agent.sid)
+            if voice_agents.get(agent.sid) is agent: # Only clear if it's the same instance
+                del voice_agents[agent.sid]
+                _agent_threads.pop(agent.sid, None)
+
+
+def _stop_agent(sid, timeout):
+    """Stop the agent owned by sid (if any) and wait for its thread to finish."""
+    with _start_lock:
+        agent = voice_agents.pop(sid, None)
+        thread = _agent_threads.pop(sid, None)
+    if agent:
+        agent.stop() # Gracefully stop the agent's loops
+    if thread and thread.is_alive():
+        logger.info("Waiting for agent thread to finish.")
+        thread.join(timeout=timeout) # Wait for thread to finish
+        if thread.is_alive():
+            logger.warning("Agent thread did not finish in time.")
 
 
 @socketio.on('start_voice_agent')
 def handle_start_voice_agent(data):
-    global voice_agent, _agent_starting, _agent_thread
+    global _background_tasks_started
+    sid = request.sid
+    if drain.draining:
+        logger.info("Refusing new call: server is draining for a restart.")
+        socketio.emit("connection_status", {
+            "connected": False,
+            "session_id": None,
+            "message_count": 0,
+            "last_error": "Server is restarting; please try again in a moment",
+            "event": "draining"
+        }, to=sid)
+        return
     with _start_lock:
-        if _agent_starting:
+        if sid in _agents_starting:
             logger.info("Voice agent start already in progress; ignoring duplicate start request.")
             return
-        if voice_agent is not None:
+        if sid in voice_agents:
             logger.info("Voice agent instance already exists; ignoring start request.")
             return
-        _agent_starting = True
+        _agents_starting.add(sid)
+        start_background_tasks = not _background_tasks_started
+        _background_tasks_started = True
+    if start_background_tasks:
+        socketio.start_background_task(_status_heartbeat_loop)
+        socketio.start_background_task(watchdog.run, socketio.sleep, _shutdown_event.is_set)
 
     logger.info(f"Starting voice agent with data: {data}")
     industry = data.get("industry", "tech_support")
     # Default if missing or empty string
     voiceModel = data.get("voiceModel") or "aura-2-thalia-en"
     voiceName = data.get("voiceName", "")
-    session_id = data.get("session_id")  # Optional session ID for recovery
-
-    voice_agent = VoiceAgent(industry, voiceModel, voiceName, session_id)
+    session_id = data.get("session_id")  # Optional session ID for recovery...
+    resume_token = data.get("resume_token")  # ...which needs the token issued with it
+    if session_id and not _can_resume(session_id, resume_token):
+        logger.warning(f"Refusing to resume session {session_id!r} without its resume token; starting a new session")
+        session_id = resume_token = None
+    codecs = data.get("codecs")  # Transport codecs the browser can encode/decode
+    event_types = data.get("events")  # Optional: agent event types this browser wants
+
+    agent = VoiceAgent(industry, voiceModel, voiceName, session_id, sid=sid, codecs=codecs, event_types=event_types,
+                       resume_token=resume_token)
     # Start the agent in a new OS thread so asyncio loop doesn't conflict with eventlet
-    _agent_thread = threading.Thread(target=run_agent_in_background, args=(voice_agent,), daemon=True)
-    _agent_thread.start()
+    thread = threading.Thread(target=run_agent_in_background, args=(agent,), daemon=True)
+    with _start_lock:
+        voice_agents[sid] = agent
+        _agent_threads[sid] = thread
+        _agents_starting.discard(sid)
+    thread.start()
 
     # Send session info back to client
     socketio.emit("session_started", {
-        "session_id": voice_agent.session_id,
-        "industry": voice_agent.industry,
-        "voiceModel": voice_agent.voiceModel,
-        "voiceName": voice_agent.voiceName,
-        "message_count": voice_agent.message_count,
-        "start_time": voice_agent.start_time
-    })
+        "session_id": agent.session_id,
+        "industry": agent.industry,
+        "voiceModel": agent.voiceModel,
+        "voiceName": agent.voiceName,
+        "message_count": agent.message_count,
+        "start_time": agent.start_time,
+        "transport": agent.transport,
+        "audio_token": agent.audio_token,
+        "resume_token": agent.resume_token
+    }, to=sid)
 
 
 @socketio.on('user_audio')
 def handle_user_audio(audio_data):
+    """Fallback mic transport for browsers that could not open /audio-ws."""
+    voice_agent = voice_agents.get(request.sid)
     if voice_agent:
-        voice_agent.send_audio(audio_data)
-        # Emit status update if connection state changed
-        if hasattr(voice_agent, 'is_connected') and voice_agent.is_connected:
-            socketio.emit("connection_status", {
-                "connected": voice_agent.is_connected,
-                "session_id": voice_agent.session_id,
-                "message_count": voice_agent.message_count
-            })
+        voice_agent.receive_audio_frame(audio_data)
+
+@app.route('/audio-ws', websocket=True)  # Werkzeug only routes upgrade requests to websocket rules
+def audio_websocket():
+    """
+    Raw WebSocket for mic frames, one binary message per frame. Avoids Socket.IO
+    packet encoding on the hottest path. Needs a gevent-websocket server (gunicorn
+    GeventWebSocketWorker or socketio.run under gevent); otherwise the browser
+    keeps using user_audio.
+    """
+    ws = request.environ.get("wsgi.websocket")
+    if ws is None:
+        return jsonify({"error": "WebSocket upgrade required"}), 400
+    token = request.args.get("token", "")
+    agent = next((a for a in list(voice_agents.values())
+                  if token and secrets.compare_digest(a.audio_token, token)), None)
+    if agent is None:
+        ws.close()
+        return ""
+
+    logger.info(f"Raw audio WebSocket attached for session {agent.session_id}")
+    try:
+        while not ws.closed and voice_agents.get(agent.sid) is agent:
+            message = ws.receive()
+            if message is None:
+                break
+            agent.receive_audio_frame(message)
+    except Exception as e:
+        logger.warning(f"Audio WebSocket for session {agent.session_id} closed: {e}")
+    finally:
+        if not ws.closed:
+            ws.close()
+    return ""
+
+@socketio.on('playback_stats')
+def handle_playback_stats(stats):
+    voice_agent = voice_agents.get(request.sid)
+    if voice_agent and isinstance(stats, dict):
+        previous = voice_agent.playback_stats.get("underruns", 0) if voice_agent.playback_stats else 0
+        voice_agent.playback_stats = stats
+        if stats.get("underruns", 0) > previous:
+            logger.warning(f"Browser playback underrun for session {voice_agent.session_id}: {stats}")
 
 @socketio.on('get_connection_status')
 def handle_get_connection_status():
+    voice_agent = voice_agents.get(request.sid)
     if voice_agent:
-        socketio.emit("connection_status", {
-            "connected": getattr(voice_agent, 'is_connected', False),
-            "session_id": getattr(voice_agent, 'session_id', None),
-            "message_count": getattr(voice_agent, 'message_count', 0),
-            "last_error": str(getattr(voice_agent, 'last_connection_error', None)) if getattr(voice_agent, 'last_connection_error', None) else None
-        })
+        socketio.emit("connection_status", dict(
+            voice_agent.connection_status(),
+            vad_stats=voice_agent.vad.stats() if voice_agent.vad else None,
+            event="request"
+        ), to=request.sid)
     else:
         socketio.emit("connection_status", {
             "connected": False,
             "session_id": None,
             "message_count": 0,
-            "last_error": "No voice agent running"
-        })
+            "last_error": "No voice agent running",
+            "event": "request"
+        }, to=request.sid)
+
+@socketio.on('subscribe_connection_status')
+def handle_subscribe_connection_status(data=None):
+    """Turn connection_status pushes on/off for this session: {"enabled": bool, "heartbeat_seconds": n}"""
+    voice_agent = voice_agents.get(request.sid)
+    if voice_agent:
+        data = data or {}
+        voice_agent.status_notifier.subscribe(bool(data.get("enabled", True)), data.get("heartbeat_seconds"))
 
 @socketio.on('stop_voice_agent')
 def handle_stop_voice_agent():
-    global voice_agent, _agent_thread
     logger.info("Received stop_voice_agent event.")
-    if voice_agent:
-        voice_agent.stop() # Gracefully stop the agent's loops
-        voice_agent = None
-    if _agent_thread and _agent_thread.is_alive():
-        logger.info("Waiting for agent thread to finish.")
-        _agent_thread.join(timeout=5) # Wait for thread to finish
-        if _agent_thread.is_alive():
-            logger.warning("Agent thread did not finish in time.")
-    _agent_thread = None
+    _stop_agent(request.sid, timeout=5)
 
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    global voice_agent, _agent_thread
     logger.info("Client disconnected.")
-    if voice_agent:
-        voice_agent.stop()
-    if _agent_thread and _agent_thread.is_alive():
-        _agent_thread.join(timeout=2)
-    voice_agent = None
-    _agent_thread = None
+    _stop_agent(request.sid, timeout=2)
 
 
 # --- Main Execution ---
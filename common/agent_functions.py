@@ -4,8 +4,9 @@ import requests
 from .business_logic import (
     get_customer_backendless,
     get_location_backendless,
-    post_quote_backendless
+    submit_quote
 )
+from .validation import FunctionValidators, format_errors
 
 def get_customer(params):
     """Look up a customer by company name from Backendless."""
@@ -28,18 +29,15 @@ def get_location(params):
 
 def post_quote(params):
     """Post a structured quote request to Backendless."""
-    quote_data = params.get("quote_data")
-    if not quote_data:
-        return {"error": "quote_data is required."}
+    # Validate against the post_quote schema in FUNCTION_DEFINITIONS
+    errors = FUNCTION_VALIDATORS.validate("post_quote", params)
+    if errors:
+        return {"error": format_errors(errors), "success": False, "validation_errors": errors}
+    return _post_validated_quote(params)
 
-    # Validate required fields within the quote_data object
-    required_fields = [
-        "print_customer_name", "customer_oid", "print_account",
-        "print_address_string", "scheduled_date", "requestor", "job_name"
-    ]
-    missing_fields = [field for field in required_fields if field not in quote_data]
-    if missing_fields:
-        return {"error": f"Missing required fields in quote_data: {', '.join(missing_fields)}"}
+def _post_validated_quote(params):
+    """post_quote for params that have already passed FUNCTION_VALIDATORS."""
+    quote_data = params["quote_data"]
 
     # Structure the payload for the backendless API
     payload = {
@@ -55,7 +53,8 @@ def post_quote(params):
         "prelim_quote": quote_data.get("prelim_quote", "Quote details to be determined")
     }
 
-    result = post_quote_backendless(payload)
+    # Identical quotes submitted again (LLM retries, reconnects) return the original result
+    result = submit_quote(payload)
     return result
 
 # Function definitions that will be sent to the Voice Agent API
@@ -155,9 +154,13 @@ FUNCTION_DEFINITIONS = [
     }
 ]
 
-# Map function names to their implementations
+# Argument validators compiled once from the schemas above
+FUNCTION_VALIDATORS = FunctionValidators(FUNCTION_DEFINITIONS)
+
+# Map function names to their implementations. The agent validates every call
+# against FUNCTION_VALIDATORS before dispatching, so entries don't re-check.
 FUNCTION_MAP = {
     "get_customer": get_customer,
     "get_location": get_location,
-    "post_quote": post_quote,
+    "post_quote": _post_validated_quote,
 }
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+import websockets
+
+logger = logging.getLogger(__name__)
+
+
+class AgentConnectionPool:
+    """
+    Keeps a few pre-opened Deepgram agent WebSockets so a new session skips the
+    TCP/TLS/WebSocket handshake.
+
+    WebSockets are bound to the event loop that opened them, so the pool runs its
+    own loop in a background thread and agents that want pooled sockets must run on
+    it (see run()). The number of idle sockets follows the recent call rate: enough
+    to cover the calls expected within one socket lifetime, clamped to
+    [min_idle, max_idle]. Idle sockets are pinged every health_check_interval and
+    replaced once they are older than max_age_seconds or stop answering.
+    """
+
+    def __init__(self, url, api_key_getter, min_idle=0, max_idle=4, rate_window_seconds=300,
+                 max_age_seconds=60, health_check_interval=10, connect_kwargs=None):
+        self.url = url
+        self.api_key_getter = api_key_getter  # callable() -> API key or None
+        self.min_idle = min_idle
+        self.max_idle = max_idle
+        self.rate_window = rate_window_seconds
+        self.max_age = max_age_seconds
+        self.health_check_interval = health_check_interval
+        self.connect_kwargs = connect_kwargs or {}
+        self.loop = None
+        self.claims = 0
+        self.hits = 0
+        self.opened = 0
+        self.recycled = 0
+        self._idle = deque()  # (websocket, opened_at monotonic time)
+        self._claim_times = deque()
+        self._claim_lock = threading.Lock()  # claim() appends on the pool loop; stats() may run anywhere
+        self._thread = None
+        self._maintainer = None
+        self._wake = None
+
+    # --- Lifecycle (any thread) ---
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run_loop():
+            asyncio.set_event_loop(self.loop)
+            self._wake = asyncio.Event()
+            self._maintainer = self.loop.create_task(self._maintain())
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run_loop, name="agent-connection-pool", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self, timeout=5):
+        if not self.loop or self.loop.is_closed():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self.loop).result(timeout)
+        except Exception as e:
+            logger.warning(f"Agent connection pool did not shut down cleanly: {e}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+
+    def run(self, coro):
+        """Schedules coro on the pool's loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def target_size(self):
+        now = time.monotonic()
+        with self._claim_lock:
+            while self._claim_times and now - self._claim_times[0] > self.rate_window:
+                self._claim_times.popleft()
+            recent = len(self._claim_times)
+        expected = math.ceil(recent / self.rate_window * self.max_age)
+        return max(self.min_idle, min(self.max_idle, expected))
+
+    def stats(self):
+        return {
+            "idle": len(self._idle),
+            "target": self.target_size(),
+            "claims": self.claims,
+            "hits": self.hits,
+            "opened": self.opened,
+            "recycled": self.recycled,
+        }
+
+    # --- Pool loop only ---
+
+    async def claim(self):
+        """Takes an open idle socket, or returns None so the caller connects itself."""
+        self.claims += 1
+        with self._claim_lock:
+            self._claim_times.append(time.monotonic())
+        try:
+            while self._idle:
+                ws, opened_at = self._idle.popleft()
+                if ws.open and time.monotonic() - opened_at < self.max_age:
+                    self.hits += 1
+                    return ws
+                await self._discard(ws)
+            return None
+        finally:
+            self._wake.set()  # Top the pool back up
+
+    async def _maintain(self):
+        while True:
+            try:
+                await self._prune()
+                while len(self._idle) < self.target_size():
+                    ws = await self._open()
+                    if ws is None:
+                        break
+                    self._idle.append((ws, time.monotonic()))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Agent connection pool maintenance failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.health_check_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _prune(self):
+        """Drops idle sockets that are too old, too many, or fail a ping."""
+        now = time.monotonic()
+        target = self.target_size()
+        healthy = deque()
+        for ws, opened_at in self._idle:
+            if len(healthy) >= target or not ws.open or now - opened_at >= self.max_age:
+                await self._discard(ws)
+                continue
+            try:
+                pong = await ws.ping()
+                await asyncio.wait_for(pong, timeout=5)
+                healthy.append((ws, opened_at))
+            except Exception:
+                await self._discard(ws)
+        self._idle = healthy
+
+    async def _open(self):
+        api_key = self.api_key_getter()
+        if not api_key:
+            return None
+        try:
+            ws = await websockets.connect(
+                self.url, extra_headers={"Authorization": f"Token {api_key}"}, **self.connect_kwargs
+            )
+            self.opened += 1
+            return ws
+        except Exception as e:
+            logger.warning(f"Failed to pre-open Deepgram connection: {e}")
+            return None
+
+    async def _discard(self, ws):
+        self.recycled += 1
+        try:
+            await ws.close()
+        except Exception:
+            pass
+
+    async def _shutdown(self):
+        self._maintainer.cancel()
+        try:
+            await self._maintainer
+        except asyncio.CancelledError:
+            pass
+        while self._idle:
+            ws, _ = self._idle.popleft()
+            await self._discard(ws)
@@ -1,5 +1,10 @@
 from common.agent_functions import FUNCTION_DEFINITIONS
+from common.audio_codec import available_codecs
 from datetime import datetime
+from functools import lru_cache
+import copy
+import os
+from common import json_codec
 
 
 # Template for the prompt that will be formatted with current date
@@ -23,7 +28,6 @@ Never make up or assume customer or location data. Always use the actual results
 
 VOICE = "aura-2-cora-en"
 
-# this gets updated by the agent template
 FIRST_MESSAGE = "Hello, I can help you create a service quote. What is the customer's company name?"
 
 # audio settings
@@ -37,7 +41,8 @@ USER_AUDIO_BYTES_PER_SEC = 2 * USER_AUDIO_SAMPLE_RATE
 AGENT_AUDIO_SAMPLE_RATE = 24000
 AGENT_AUDIO_BYTES_PER_SEC = 2 * AGENT_AUDIO_SAMPLE_RATE
 
-VOICE_AGENT_URL = "wss://agent.deepgram.com/v1/agent/converse"
+# Overridable so load tests can point the server at a local stand-in (see benchmarks/)
+VOICE_AGENT_URL = os.getenv("VOICE_AGENT_URL", "wss://agent.deepgram.com/v1/agent/converse")
 
 AUDIO_SETTINGS = {
     "input": {
@@ -51,6 +56,13 @@ AUDIO_SETTINGS = {
     },
 }
 
+# Codecs for the browser <-> server leg only (Deepgram always gets linear16).
+# Listed in server preference order; the first one the browser also supports wins.
+TRANSPORT_SETTINGS = {
+    "agent_codecs": ["opus", "mulaw", "alaw", "pcm16"],  # agent TTS -> browser
+    "mic_codecs": ["mulaw", "alaw", "pcm16"],  # browser mic -> server
+}
+
 LISTEN_SETTINGS = {
     "provider": {
         "type": "deepgram",
@@ -89,6 +101,8 @@ AGENT_SETTINGS = {
     "greeting": FIRST_MESSAGE,
 }
 
+# Base Settings message. Treat it as read-only: per-session copies are built by
+# build_settings_json() so concurrent sessions never share mutable state.
 SETTINGS = {
     "type": "Settings",
     "experimental": False,
@@ -131,6 +145,27 @@ SETTINGS = {
 }
 
 
+@lru_cache(maxsize=64)
+def render_prompt(prompt_template, current_date):
+    """Formats the prompt template for a given date string."""
+    return prompt_template.format(current_date=current_date)
+
+
+@lru_cache(maxsize=128)
+def build_settings_json(voice_model, industry, current_date, prompt_template=PROMPT_TEMPLATE):
+    """
+    Returns the serialized Settings message for one (voice model, industry, date).
+    Sessions with the same key share the same immutable string, so starting or
+    reconnecting an agent doesn't re-copy or re-serialize the settings.
+    """
+    settings = copy.deepcopy(SETTINGS)
+    agent = settings["agent"]
+    agent["speak"]["provider"]["model"] = voice_model
+    agent["think"]["prompt"] = render_prompt(prompt_template, current_date)
+    agent["greeting"] = FIRST_MESSAGE
+    return json_codec.dumps(settings)
+
+
 class AgentTemplates:
     PROMPT_TEMPLATE = PROMPT_TEMPLATE
 
@@ -138,24 +173,55 @@ class AgentTemplates:
         self.industry = industry
         self.voiceModel = voiceModel
         self.voiceName = voiceName if voiceName else self.get_voice_name_from_model(voiceModel)
-        
-        self.prompt = self.PROMPT_TEMPLATE.format(
-            current_date=datetime.now().strftime("%A, %B %d, %Y")
-        )
+        self.current_date = datetime.now().strftime("%A, %B %d, %Y")
+        self.prompt = render_prompt(self.PROMPT_TEMPLATE, self.current_date)
 
         self.voice_agent_url = VOICE_AGENT_URL
-        self.settings = SETTINGS
         self.user_audio_sample_rate = USER_AUDIO_SAMPLE_RATE
         self.user_audio_secs_per_chunk = USER_AUDIO_SECS_PER_CHUNK
         self.user_audio_samples_per_chunk = USER_AUDIO_SAMPLES_PER_CHUNK
+        self.user_audio_bytes_per_sec = USER_AUDIO_BYTES_PER_SEC
         self.agent_audio_sample_rate = AGENT_AUDIO_SAMPLE_RATE
         self.agent_audio_bytes_per_sec = AGENT_AUDIO_BYTES_PER_SEC
+        # Raw PCM16 until the browser negotiates something smaller
+        self.agent_transport_codec = "pcm16"
+        self.mic_transport_codec = "pcm16"
 
-        # Set up the settings with the configured voice model and prompt
+        # Pre-serialized Settings for this voice model and prompt (shared, never mutated)
         # Use a more basic voice model that should work reliably
-        self.settings["agent"]["speak"]["provider"]["model"] = self.voiceModel or "aura-asteria-en"
-        self.settings["agent"]["think"]["prompt"] = self.prompt
-        self.settings["agent"]["greeting"] = FIRST_MESSAGE
+        self.settings_json = build_settings_json(
+            self.voiceModel or "aura-asteria-en", self.industry, self.current_date, self.PROMPT_TEMPLATE
+        )
+
+    def settings_json_with_context(self, messages):
+        """
+        Settings for a resumed conversation: the cached message plus the earlier
+        history, without the greeting so the agent picks up where it left off.
+        """
+        if not messages:
+            return self.settings_json
+        settings = self.settings
+        settings["agent"]["context"] = {"messages": messages}
+        settings["agent"].pop("greeting", None)
+        return json_codec.dumps(settings)
+
+    @property
+    def settings(self):
+        """A private, mutable copy of this session's Settings message."""
+        return json_codec.loads(self.settings_json)
+
+    def negotiate_transport(self, client_codecs):
+        """
+        Pick the transport codecs for this session from the codecs the browser advertised.
+        Browsers that advertise nothing keep raw PCM16 in both directions.
+        """
+        client_codecs = set(client_codecs or [])
+        for direction, preference in (("agent", TRANSPORT_SETTINGS["agent_codecs"]),
+                                      ("mic", TRANSPORT_SETTINGS["mic_codecs"])):
+            supported = available_codecs(direction)
+            chosen = next((c for c in preference if c in supported and c in client_codecs), "pcm16")
+            setattr(self, f"{direction}_transport_codec", chosen)
+        return {"agent_codec": self.agent_transport_codec, "mic_codec": self.mic_transport_codec}
 
     @staticmethod
     def get_available_industries():
@@ -0,0 +1,141 @@
+import threading
+from collections import deque
+
+from common.audio_utils import pcm16_rms
+
+
+class AudioRingBuffer:
+    """
+    Bounded buffer for inbound microphone audio, sized in milliseconds of audio.
+
+    put() never blocks: when the buffer is full the configured policy decides
+    what gets evicted. Empty chunks are end-of-speech markers and are never
+    evicted by the overflow policies.
+
+    Policies:
+      - drop_oldest: evict the oldest queued audio to make room.
+      - drop_silence_first: evict the oldest silent frame, then the oldest frame.
+      - pause: evict like drop_oldest, but also ask the browser to pause uploads
+        until the buffer drains below resume_ratio.
+    """
+
+    POLICIES = ("drop_oldest", "drop_silence_first", "pause")
+    PAUSE_RATIO = 0.9  # pause policy: signal the browser once the buffer is this full
+
+    def __init__(self, bytes_per_sec, max_ms=2000, policy="drop_oldest",
+                 resume_ratio=0.5, silence_rms=300, on_pause_change=None):
+        if policy not in self.POLICIES:
+            raise ValueError(f"Unknown audio backpressure policy '{policy}', expected one of {self.POLICIES}")
+        self.bytes_per_sec = bytes_per_sec
+        self.max_ms = max_ms
+        self.max_bytes = int(bytes_per_sec * max_ms / 1000)
+        self.policy = policy
+        self.resume_bytes = int(self.max_bytes * resume_ratio)
+        self.silence_rms = silence_rms
+        self.on_pause_change = on_pause_change
+
+        self._frames = deque()  # (chunk, is_silence)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.paused = False
+        self.dropped_frames = 0
+        self.dropped_bytes = 0
+
+    def __len__(self):
+        return len(self._frames)
+
+    @property
+    def buffered_ms(self):
+        return self._bytes * 1000.0 / self.bytes_per_sec
+
+    @property
+    def resume_headroom_ms(self):
+        """Audio the buffer takes after a resume before it would pause again."""
+        return (self.max_bytes * self.PAUSE_RATIO - self.resume_bytes) * 1000.0 / self.bytes_per_sec
+
+    def put(self, chunk):
+        """Queue a chunk. Returns False if the chunk itself had to be dropped."""
+        size = len(chunk)
+        if size > self.max_bytes:
+            self._count_drop(size)
+            return False
+
+        is_silence = False
+        if size and self.policy == "drop_silence_first":
+            is_silence = pcm16_rms(chunk) < self.silence_rms
+
+        pause_changed = False
+        with self._lock:
+            while self._bytes + size > self.max_bytes:
+                if not self._evict_one():
+                    break
+            self._frames.append((chunk, is_silence))
+            self._bytes += size
+            if self.policy == "pause" and not self.paused and self._bytes >= self.max_bytes * self.PAUSE_RATIO:
+                self.paused = True
+                pause_changed = True
+
+        if pause_changed:
+            self._notify_pause(True)
+        return True
+
+    def get(self):
+        """Pop the next chunk, or None if the buffer is empty."""
+        pause_changed = False
+        with self._lock:
+            if not self._frames:
+                return None
+            chunk, _ = self._frames.popleft()
+            self._bytes -= len(chunk)
+            if self.paused and self._bytes <= self.resume_bytes:
+                self.paused = False
+                pause_changed = True
+
+        if pause_changed:
+            self._notify_pause(False)
+        return chunk
+
+    def drop_end_of_speech(self):
+        """Remove queued end-of-speech markers, keeping any real audio. Returns the number removed."""
+        with self._lock:
+            kept = deque(frame for frame in self._frames if len(frame[0]) > 0)
+            removed = len(self._frames) - len(kept)
+            self._frames = kept
+        return removed
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+            self._bytes = 0
+            was_paused, self.paused = self.paused, False
+        if was_paused:
+            self._notify_pause(False)
+
+    def _evict_one(self):
+        """Evict a single frame according to the policy. Caller holds the lock."""
+        victim = None
+        if self.policy == "drop_silence_first":
+            for index, (chunk, is_silence) in enumerate(self._frames):
+                if is_silence:
+                    victim = index
+                    break
+        if victim is None:
+            victim = next((i for i, (chunk, _) in enumerate(self._frames) if len(chunk) > 0), None)
+        if victim is None:
+            return False
+
+        chunk, _ = self._frames[victim]
+        del self._frames[victim]
+        self._bytes -= len(chunk)
+        self.dropped_frames += 1
+        self.dropped_bytes += len(chunk)
+        return True
+
+    def _count_drop(self, size):
+        with self._lock:
+            self.dropped_frames += 1
+            self.dropped_bytes += size
+
+    def _notify_pause(self, paused):
+        if self.on_pause_change:
+            self.on_pause_change(paused)
@@ -0,0 +1,199 @@
+# Transport codecs for audio travelling between the server and the browser.
+# Deepgram always sees linear16; these codecs only shrink the Socket.IO leg.
+# G.711 mu-law / A-law halve PCM16 bandwidth using lookup tables (vectorized
+# with numpy when installed). Opus is offered for agent -> browser audio when
+# opuslib and the native libopus are available.
+from array import array
+from functools import lru_cache
+
+from common.audio_utils import HAS_NUMPY
+
+if HAS_NUMPY:
+    import numpy as np
+
+# Opus is optional: it needs both the opuslib package and the native libopus
+try:
+    import opuslib
+    HAS_OPUS = True
+except Exception:
+    HAS_OPUS = False
+
+
+# --- G.711 (after the Sun Microsystems reference implementation) ---
+_ULAW_BIAS = 0x84
+_ULAW_CLIP = 8159
+_SEG_UEND = (0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF)
+_SEG_AEND = (0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF)
+
+
+def _segment(value, table):
+    for seg, end in enumerate(table):
+        if value <= end:
+            return seg
+    return len(table)
+
+
+def linear_to_ulaw(sample):
+    sample >>= 2
+    if sample < 0:
+        sample = -sample
+        mask = 0x7F
+    else:
+        mask = 0xFF
+    sample = min(sample, _ULAW_CLIP) + (_ULAW_BIAS >> 2)
+    seg = _segment(sample, _SEG_UEND)
+    if seg >= 8:
+        return 0x7F ^ mask
+    return ((seg << 4) | ((sample >> (seg + 1)) & 0x0F)) ^ mask
+
+
+def ulaw_to_linear(value):
+    value = ~value & 0xFF
+    sample = (((value & 0x0F) << 3) + _ULAW_BIAS) << ((value & 0x70) >> 4)
+    return (_ULAW_BIAS - sample) if value & 0x80 else (sample - _ULAW_BIAS)
+
+
+def linear_to_alaw(sample):
+    sample >>= 3
+    if sample >= 0:
+        mask = 0xD5
+    else:
+        mask = 0x55
+        sample = -sample - 1
+    seg = _segment(sample, _SEG_AEND)
+    if seg >= 8:
+        return 0x7F ^ mask
+    value = seg << 4
+    value |= ((sample >> 1) if seg < 2 else (sample >> seg)) & 0x0F
+    return value ^ mask
+
+
+def alaw_to_linear(value):
+    value ^= 0x55
+    sample = (value & 0x0F) << 4
+    seg = (value & 0x70) >> 4
+    if seg == 0:
+        sample += 8
+    elif seg == 1:
+        sample += 0x108
+    else:
+        sample = (sample + 0x108) << (seg - 1)
+    return sample if value & 0x80 else -sample
+
+
+@lru_cache(maxsize=None)
+def _g711_tables(law):
+    """(encode, decode) tables: encode is indexed by the uint16 view of a PCM16 sample."""
+    to_law, from_law = (linear_to_ulaw, ulaw_to_linear) if law == "mulaw" else (linear_to_alaw, alaw_to_linear)
+    encode = bytes(to_law(u - 0x10000 if u & 0x8000 else u) for u in range(0x10000))
+    decode = array("h", (from_law(v) for v in range(256)))
+    if HAS_NUMPY:
+        return np.frombuffer(encode, dtype=np.uint8), np.array(decode, dtype="<i2")
+    return encode, decode
+
+
+class PCM16Codec:
+    """Identity codec: raw little-endian PCM16."""
+    name = "pcm16"
+
+    def encode(self, pcm):
+        return pcm
+
+    def decode(self, payload):
+        return payload
+
+    def flush(self):
+        return None
+
+    def reset(self):
+        pass
+
+
+class G711Codec:
+    """Stateless mu-law / A-law codec: one byte per PCM16 sample."""
+
+    def __init__(self, law):
+        if law not in ("mulaw", "alaw"):
+            raise ValueError(f"Unknown G.711 law '{law}'")
+        self.name = law
+        self._encode_table, self._decode_table = _g711_tables(law)
+
+    def encode(self, pcm):
+        usable = len(pcm) & ~1
+        if HAS_NUMPY:
+            samples = np.frombuffer(pcm, dtype="<u2", count=usable // 2)
+            return self._encode_table[samples].tobytes()
+        samples = array("H")
+        samples.frombytes(bytes(pcm[:usable]))
+        return bytes(map(self._encode_table.__getitem__, samples))
+
+    def decode(self, payload):
+        if HAS_NUMPY:
+            return self._decode_table[np.frombuffer(payload, dtype=np.uint8)].tobytes()
+        return array("h", map(self._decode_table.__getitem__, bytes(payload))).tobytes()
+
+    def flush(self):
+        return None
+
+    def reset(self):
+        pass
+
+
+class OpusEncoderCodec:
+    """
+    Streaming Opus encoder for agent audio (server -> browser only).
+
+    encode() returns a list of 20ms Opus packets; samples that do not fill a
+    whole frame are carried over to the next call, and flush() pads the tail.
+    It has no decode(): get_codec() never returns it for the mic direction.
+    """
+    name = "opus"
+
+    def __init__(self, sample_rate, frame_ms=20):
+        if not HAS_OPUS:
+            raise RuntimeError("Opus transport requested but opuslib/libopus is not available")
+        self._encoder = opuslib.Encoder(sample_rate, 1, opuslib.APPLICATION_AUDIO)
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.frame_bytes = self.frame_samples * 2
+        self._pending = bytearray()
+
+    def encode(self, pcm):
+        self._pending += pcm
+        packets = []
+        while len(self._pending) >= self.frame_bytes:
+            frame = bytes(self._pending[:self.frame_bytes])
+            del self._pending[:self.frame_bytes]
+            packets.append(self._encoder.encode(frame, self.frame_samples))
+        return packets
+
+    def flush(self):
+        if not self._pending:
+            return None
+        tail = bytes(self._pending) + b"\x00" * (self.frame_bytes - len(self._pending))
+        self._pending.clear()
+        return [self._encoder.encode(tail, self.frame_samples)]
+
+    def reset(self):
+        self._pending.clear()
+
+
+def available_codecs(direction="agent"):
+    """Codec names this server can speak for the given direction ('agent' or 'mic')."""
+    codecs = ["mulaw", "alaw", "pcm16"]
+    if direction == "agent" and HAS_OPUS:
+        codecs.insert(0, "opus")
+    return codecs
+
+
+def get_codec(name, sample_rate, direction="agent"):
+    """
+    Codec for one direction: 'agent' codecs encode server -> browser audio,
+    'mic' codecs decode browser -> server audio.
+    """
+    if name == "pcm16":
+        return PCM16Codec()
+    if name in ("mulaw", "alaw"):
+        return G711Codec(name)
+    if name == "opus" and direction == "agent":
+        return OpusEncoderCodec(sample_rate)
+    raise ValueError(f"Unknown {direction} transport codec '{name}'")
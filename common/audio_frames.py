@@ -0,0 +1,55 @@
+import struct
+
+# Mic audio frames from the browser: an 8-byte big-endian header followed by the
+# encoded audio. seq counts frames from 0 for each audio pipeline; timestamp_ms is
+# the browser's clock when the frame was sent (both wrap at 2**32). A frame with
+# no audio after the header is the end-of-speech signal.
+FRAME_HEADER = struct.Struct(">II")
+FRAME_HEADER_BYTES = FRAME_HEADER.size
+
+_SEQ_MODULUS = 2 ** 32
+
+
+def pack_frame(seq, timestamp_ms, payload=b""):
+    return FRAME_HEADER.pack(seq % _SEQ_MODULUS, int(timestamp_ms) % _SEQ_MODULUS) + bytes(payload)
+
+
+def unpack_frame(data):
+    """
+    Split a frame into (seq, timestamp_ms, payload). The payload is a memoryview
+    into data, so the audio is not copied. Raises ValueError for short frames.
+    """
+    view = memoryview(data)
+    if len(view) < FRAME_HEADER_BYTES:
+        raise ValueError(f"Audio frame is {len(view)} bytes, shorter than its {FRAME_HEADER_BYTES}-byte header")
+    seq, timestamp_ms = FRAME_HEADER.unpack_from(view)
+    return seq, timestamp_ms, view[FRAME_HEADER_BYTES:]
+
+
+class FrameSequencer:
+    """
+    Tracks frame sequence numbers for one session. Gaps are counted as lost
+    frames; frames that arrive after a later one (or twice) are rejected so
+    audio never reaches Deepgram out of order. seq 0 starts a new stream, as
+    happens when the browser restarts its audio pipeline.
+    """
+
+    def __init__(self):
+        self.expected = None
+        self.received = 0
+        self.lost = 0
+        self.late = 0
+
+    def accept(self, seq):
+        if seq != 0 and self.expected is not None and seq != self.expected:
+            ahead = (seq - self.expected) % _SEQ_MODULUS
+            if ahead >= _SEQ_MODULUS // 2:
+                self.late += 1
+                return False
+            self.lost += ahead
+        self.expected = (seq + 1) % _SEQ_MODULUS
+        self.received += 1
+        return True
+
+    def stats(self):
+        return {"received": self.received, "lost": self.lost, "late": self.late}
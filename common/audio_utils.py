@@ -0,0 +1,42 @@
+import math
+from array import array
+
+# numpy is optional: when it is installed the PCM helpers below are vectorized,
+# otherwise they fall back to the standard library array module.
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+
+def pcm16_samples(chunk):
+    """Return the samples of a little-endian PCM16 chunk without copying when possible."""
+    if HAS_NUMPY:
+        usable = len(chunk) - (len(chunk) % 2)
+        return np.frombuffer(chunk, dtype="<i2", count=usable // 2)
+    samples = array("h")
+    samples.frombytes(bytes(chunk[: len(chunk) - (len(chunk) % 2)]))
+    return samples
+
+
+def pcm16_rms(chunk):
+    """Root-mean-square level of a PCM16 chunk, in raw sample units (0-32768)."""
+    samples = pcm16_samples(chunk)
+    if len(samples) == 0:
+        return 0.0
+    if HAS_NUMPY:
+        as_float = samples.astype(np.float32)
+        return float(np.sqrt(np.dot(as_float, as_float) / len(as_float)))
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+def pcm16_zero_crossing_rate(chunk):
+    """Fraction of adjacent sample pairs in a PCM16 chunk that change sign (0.0-1.0)."""
+    samples = pcm16_samples(chunk)
+    if len(samples) < 2:
+        return 0.0
+    if HAS_NUMPY:
+        return float(np.count_nonzero(np.diff(np.signbit(samples)))) / (len(samples) - 1)
+    crossings = sum(1 for a, b in zip(samples, samples[1:]) if (a < 0) != (b < 0))
+    return crossings / (len(samples) - 1)
@@ -0,0 +1,63 @@
+# Builders for Backendless data API queries. Values are always quoted and
+# escaped here, so callers never interpolate user input into a where clause.
+
+
+def quote(value):
+    """A Backendless string literal: single quotes, embedded quotes doubled."""
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _like_text(value):
+    # '%' and '_' are LIKE wildcards and can't be escaped reliably. Turning each into '_'
+    # (exactly one character) keeps the literal value matching without widening the pattern.
+    return str(value).replace("%", "_").strip()
+
+
+def equals(field, value):
+    return f"{field} = {quote(value)}"
+
+
+def starts_with(field, value):
+    return f"{field} LIKE {quote(_like_text(value) + '%')}"
+
+
+def contains(field, value):
+    return f"{field} LIKE {quote('%' + _like_text(value) + '%')}"
+
+
+def any_of(*clauses):
+    """Joins clauses with OR, parenthesized so they combine safely with AND."""
+    if len(clauses) == 1:
+        return clauses[0]
+    return " OR ".join(f"({clause})" for clause in clauses)
+
+
+def match_strategies(fields, value):
+    """
+    Where clauses from cheapest to broadest: exact match, prefix, then substring.
+    Callers try them in order and stop at the first one that returns rows, so
+    most lookups never need the full-scan '%value%' query. A value that is
+    nothing but wildcards or spaces only gets the exact match; its LIKE would match
+    almost every row.
+    """
+    if isinstance(fields, str):
+        fields = [fields]
+    strategies = [("exact", any_of(*(equals(field, value) for field in fields)))]
+    if not _like_text(value).replace("_", ""):
+        return strategies
+    return strategies + [
+        ("prefix", any_of(*(starts_with(field, value) for field in fields))),
+        ("contains", any_of(*(contains(field, value) for field in fields))),
+    ]
+
+
+def query_params(where, props=None, page_size=None, sort_by=None):
+    """Request parameters for a Backendless data table GET."""
+    params = {"where": where}
+    if props:
+        params["props"] = ",".join(props)
+    if page_size:
+        params["pageSize"] = page_size
+    if sort_by:
+        params["sortBy"] = sort_by
+    return params
@@ -2,10 +2,15 @@ import asyncio
 import json
 from datetime import datetime, timedelta
 import random
-from common.config import ARTIFICIAL_DELAY, MOCK_DATA_SIZE
+from common.config import ARTIFICIAL_DELAY, MOCK_DATA_SIZE, BACKENDLESS_RESILIENCE, QUOTE_PIPELINE
+from common.resilience import CircuitBreaker, CircuitOpenError, HedgePool, SingleFlight, get_breaker, hedged_call
+from common.backendless_query import match_strategies, query_params
+from common.quote_pipeline import QuotePipeline
+from common import json_codec
 import pathlib
 import requests
 import os
+import time
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -292,7 +297,87 @@ async def prepare_farewell_message(websocket, farewell_type):
         "close_message": close_message,
     }
 
+# Shared by every hedged lookup; sized so hedges stay a small share of Backendless traffic
+_hedge_pool = HedgePool(BACKENDLESS_RESILIENCE["hedge_max_in_flight"])
+
+def _backendless_request(table, method="GET", hedge=False, **kwargs):
+    """
+    Send a request to a Backendless data table through that table's circuit breaker.
+    Raises CircuitOpenError without touching the network while the breaker is open.
+    Exceptions, 5xx responses and slow calls count against the breaker. With hedge=True
+    (idempotent lookups only), a second request is sent if the first is slower than usual.
+    """
+    settings = BACKENDLESS_RESILIENCE
+    breaker = get_breaker(
+        f"backendless.{table}",
+        failure_rate=settings["failure_rate"],
+        min_calls=settings["min_calls"],
+        window_seconds=settings["window_seconds"],
+        slow_call_seconds=settings["slow_call_seconds"],
+        open_seconds=settings["open_seconds"],
+    )
+    if not breaker.allow():
+        raise CircuitOpenError(f"Backendless {table} circuit is open")
+
+    api_url = f"{BACKENDLESS_API_URL}/{BACKENDLESS_APP_ID}/{BACKENDLESS_API_KEY}/data/{table}"
+    print(f"Making {method} request to: {api_url}")
+    kwargs.setdefault("timeout", settings["timeout"])
+
+    hedge_delay = None
+    # A half-open breaker is testing Backendless with a single trial call: don't double it
+    if hedge and settings["hedge"] and breaker.state == CircuitBreaker.CLOSED:
+        typical = breaker.latency_percentile(settings["hedge_percentile"])
+        if typical is not None:
+            hedge_delay = max(typical, settings["hedge_min_delay"])
+
+    start = time.monotonic()
+    try:
+        response, hedged = hedged_call(lambda: requests.request(method, api_url, **kwargs), hedge_delay, _hedge_pool)
+    except Exception:
+        breaker.record(False, time.monotonic() - start)
+        raise
+    breaker.record(response.status_code < 500, time.monotonic() - start)
+    if hedged:
+        print(f"Backendless {table} request was hedged after {hedge_delay:.2f}s")
+    return response
+
+def _find_first(table, fields, value, props):
+    """
+    Find the first row in table whose fields match value. Exact, prefix and substring
+    matches are tried in that order, fetching only props and a single row each time.
+    Returns (status_code, row); row is None if nothing matched or a request failed.
+    """
+    for strategy, where_clause in match_strategies(fields, value):
+        print(f"Where clause ({strategy}): {where_clause}")
+        response = _backendless_request(
+            table, params=query_params(where_clause, props=props, page_size=1), hedge=True
+        )
+        print(f"API response status: {response.status_code}")
+        print(f"API response content: {response.text[:500]}...")
+        if response.status_code != 200:
+            return response.status_code, None
+        rows = json_codec.loads(response.content)
+        if rows:
+            return response.status_code, rows[0]
+    return 200, None
+
+# Identical lookups that overlap in time share one Backendless request and its result
+lookup_flight = SingleFlight()
+
+def _normalize_query(value):
+    return " ".join(str(value).lower().split())
+
 def get_customer_backendless(company_name):
+    """Customer lookup; concurrent calls for the same company share one request."""
+    key = ("customer", _normalize_query(company_name))
+    return lookup_flight.do(key, lambda: _get_customer_backendless(company_name))
+
+def get_location_backendless(customer_oid, address_string):
+    """Location lookup; concurrent calls for the same customer and address share one request."""
+    key = ("location", customer_oid, _normalize_query(address_string))
+    return lookup_flight.do(key, lambda: _get_location_backendless(customer_oid, address_string))
+
+def _get_customer_backendless(company_name):
     """
     Look up a customer by company name from Backendless.
     Returns CustomerOid and printCustomerName if found.
@@ -308,30 +393,11 @@ def get_customer_backendless(company_name):
     print(f"Using Backendless API credentials - APP_ID: {BACKENDLESS_APP_ID[:8]}..., API_KEY: {BACKENDLESS_API_KEY[:8]}...")
     
     try:
-        # Build the correct Backendless URL structure
-        api_url = f"{BACKENDLESS_API_URL}/{BACKENDLESS_APP_ID}/{BACKENDLESS_API_KEY}/data/Customers"
-        
-        # Create the where clause for the company name search
-        where_clause = f"Company LIKE '%{company_name}%'"
-        
-        print(f"Making API request to: {api_url}")
-        print(f"Where clause: {where_clause}")
-        
-        # Make the API request to Backendless
-        response = requests.get(
-            api_url,
-            params={'where': where_clause},
-            timeout=30  # Add timeout to prevent hanging
-        )
+        # Search the Customers table by company name, fetching only the fields we use
+        status_code, customer = _find_first("Customers", "Company", company_name, props=["objectId", "Company"])
         
-        print(f"API response status: {response.status_code}")
-        print(f"API response content: {response.text[:500]}...")
-        
-        if response.status_code == 200:
-            customers = response.json()
-            print(f"Found {len(customers)} customers matching company search")
-            if customers and len(customers) > 0:
-                customer = customers[0]  # Take the first match
+        if status_code == 200:
+            if customer:
                 print(f"Using customer: {customer.get('Company')} with ID: {customer.get('objectId')}")
                 return {
                     'CustomerOid': customer.get('objectId'),
@@ -346,9 +412,12 @@ def get_customer_backendless(company_name):
                     'company_searched': company_name
                 }
         else:
-            print(f"Backendless API request failed with status {response.status_code}, falling back to mock data")
+            print(f"Backendless API request failed with status {status_code}, falling back to mock data")
             return get_customer_mock(company_name)
             
+    except CircuitOpenError:
+        print(f"Backendless customer lookups are failing, using mock data without waiting")
+        return get_customer_mock(company_name)
     except requests.exceptions.Timeout:
         print(f"Backendless API timeout, falling back to mock data")
         return get_customer_mock(company_name)
@@ -400,7 +469,7 @@ def get_customer_mock(company_name):
     print(f"No exact match for '{company_name}', using fallback: {fallback['printCustomerName']}")
     return fallback
 
-def get_location_backendless(customer_oid, address_string):
+def _get_location_backendless(customer_oid, address_string):
     """
     Look up a location for a customer by address string from Backendless.
     Searches in the Locations table using AddressOnlyString and FullAddressString fields.
@@ -417,32 +486,16 @@ def get_location_backendless(customer_oid, address_string):
     print(f"Using Backendless API credentials - APP_ID: {BACKENDLESS_APP_ID[:8]}..., API_KEY: {BACKENDLESS_API_KEY[:8]}...")
     
     try:
-        # Build the correct Backendless URL structure - search in Locations table
-        api_url = f"{BACKENDLESS_API_URL}/{BACKENDLESS_APP_ID}/{BACKENDLESS_API_KEY}/data/Locations"
-        
-        # Create the where clause for the location search - search by address fields
-        where_clause = f"AddressOnlyString LIKE '%{address_string}%' OR FullAddressString LIKE '%{address_string}%'"
-        
-        print(f"Making API request to: {api_url}")
-        print(f"Where clause: {where_clause}")
-        
-        # Make the API request to Backendless
-        response = requests.get(
-            api_url,
-            params={
-                'where': where_clause,
-                'props': 'AddressOnlyString,FullAddressString,ParentAccountName,CustomerOid,objectId'
-            }
+        # Search the Locations table by address fields
+        status_code, location = _find_first(
+            "Locations",
+            ["AddressOnlyString", "FullAddressString"],
+            address_string,
+            props=["AddressOnlyString", "FullAddressString", "ParentAccountName", "CustomerOid", "objectId"]
         )
         
-        print(f"API response status: {response.status_code}")
-        print(f"API response content: {response.text[:500]}...")
-        
-        if response.status_code == 200:
-            locations = response.json()
-            print(f"Found {len(locations)} locations matching address search")
-            if locations and len(locations) > 0:
-                location = locations[0]  # Take the first match
+        if status_code == 200:
+            if location:
                 print(f"Using location: {location.get('printAccount')} with address: {location.get('FullAddressString', location.get('AddressOnlyString'))}")
                 return {
                     'ParentLocationOid': location.get('objectId'),
@@ -459,9 +512,12 @@ def get_location_backendless(customer_oid, address_string):
                     'customer_oid': customer_oid
                 }
         else:
-            print(f"Backendless API request failed with status {response.status_code}, falling back to mock data")
+            print(f"Backendless API request failed with status {status_code}, falling back to mock data")
             return get_location_mock(customer_oid, address_string)
             
+    except CircuitOpenError:
+        print(f"Backendless location lookups are failing, using mock data without waiting")
+        return get_location_mock(customer_oid, address_string)
     except Exception as e:
         print(f"Backendless API error, falling back to mock data: {str(e)}")
         return get_location_mock(customer_oid, address_string)
@@ -522,7 +578,7 @@ def post_quote_backendless(quote_data):
     Returns the created quote object if successful.
     Falls back to saving locally if API credentials are not configured.
     """
-    print(f"Creating quote with data: {json.dumps(quote_data, indent=2)}")
+    print(f"Creating quote with data: {json_codec.dumps_pretty(quote_data)}")
     
     # Check if Backendless API credentials are configured
     if not BACKENDLESS_APP_ID or not BACKENDLESS_API_KEY:
@@ -532,22 +588,19 @@ def post_quote_backendless(quote_data):
     print(f"Using Backendless API credentials - APP_ID: {BACKENDLESS_APP_ID[:8]}..., API_KEY: {BACKENDLESS_API_KEY[:8]}...")
     
     try:
-        # Build the correct Backendless URL structure
-        api_url = f"{BACKENDLESS_API_URL}/{BACKENDLESS_APP_ID}/{BACKENDLESS_API_KEY}/data/Requests"
-        
-        print(f"Making POST request to: {api_url}")
-        
-        # Make the API request to Backendless
-        response = requests.post(
-            api_url,
-            json=quote_data
+        # Make the API request to Backendless (never hedged: a duplicate POST creates a duplicate quote)
+        response = _backendless_request(
+            "Requests",
+            method="POST",
+            json=quote_data,
+            timeout=BACKENDLESS_RESILIENCE["post_timeout"]
         )
         
         print(f"API response status: {response.status_code}")
         print(f"API response content: {response.text[:500]}...")
         
         if response.status_code in [200, 201]:
-            created_quote = response.json()
+            created_quote = json_codec.loads(response.content)
             request_number = created_quote.get('InternalRequestNumber', 'N/A')
             object_id = created_quote.get('objectId', 'N/A')
             
@@ -565,10 +618,27 @@ def post_quote_backendless(quote_data):
             print(f"Backendless API request failed with status {response.status_code}, saving locally")
             return save_quote_data(quote_data)
             
+    except CircuitOpenError:
+        print("Backendless quote creation is failing, saving quote locally without waiting")
+        return save_quote_data(quote_data)
     except Exception as e:
         print(f"Backendless API error, saving quote locally: {str(e)}")
         return save_quote_data(quote_data)
 
+# Deduplicates quote submissions so an LLM retry or reconnect can't create a second Request
+quote_pipeline = QuotePipeline(
+    post_quote_backendless,
+    dedupe_window_seconds=QUOTE_PIPELINE["dedupe_window_seconds"],
+    max_entries=QUOTE_PIPELINE["max_entries"],
+)
+
+def submit_quote(payload):
+    """Submit a quote once; repeats within the dedupe window return the original result."""
+    result = quote_pipeline.submit(payload)
+    if result.get("duplicate"):
+        print(f"Duplicate quote submission, returning original result: {result.get('internal_request_number', result.get('quote_id'))}")
+    return result
+
 # Save a copy of the quote data for debugging/backup
 def save_quote_data(quote_data):
     """Save quote data to a timestamped file in quote_data_outputs directory."""
@@ -17,4 +17,119 @@ MOCK_DATA_SIZE = {
 DATABASE_CONFIG = {
     "path": "business_data.db",
     "enable": False  # Set to True to use actual SQLite instead of mock data
-} 
\ No newline at end of file
+} 
+
+# Inbound microphone audio buffering (browser -> Deepgram)
+AUDIO_BACKPRESSURE = {
+    "max_buffer_ms": 2000,  # Upper bound on queued mic audio, in milliseconds
+    "policy": "drop_oldest",  # One of: drop_oldest, drop_silence_first, pause
+    "resume_ratio": 0.5,  # pause policy: resume uploads once the buffer drains below this fraction
+    "silence_rms": 300  # drop_silence_first: frames below this RMS level count as silence
+}
+
+# Server-side voice activity detection: skip forwarding silence to Deepgram
+VAD_SETTINGS = {
+    "enabled": False,
+    "energy_threshold": 500,  # RMS level (0-32768) above which a frame is speech
+    "zcr_threshold": 0.3,  # Zero-crossing rate that marks quieter frames as (unvoiced) speech
+    "hangover_ms": 500,  # Keep forwarding this long after speech so endpointing still works
+    "preroll_ms": 200,  # Audio kept from before speech onset and sent with the first speech frame
+    "keepalive_ms": 5000  # Forward one frame at least this often during long silences
+}
+
+# Deepgram TTS model list served by /tts-models
+MODEL_CATALOGUE = {
+    "ttl_seconds": 3600,  # Refresh in the background once the cached list is this old
+    "snapshot_path": "cache/tts_models.json",  # Last good list, served on cold starts
+    "timeout": 5,  # Seconds allowed for each background fetch
+    "retry_seconds": 30  # Wait after a failed fetch; doubles per further failure, capped at ttl_seconds
+}
+
+# Circuit breakers and hedged requests around the Backendless API
+BACKENDLESS_RESILIENCE = {
+    "timeout": 10,  # Seconds for lookups
+    "post_timeout": 30,  # Seconds for creating quotes (not retried or hedged)
+    "failure_rate": 0.5,  # Open the breaker once this share of recent calls failed or was slow
+    "min_calls": 5,  # ...out of at least this many calls
+    "window_seconds": 60,  # Calls older than this are forgotten
+    "slow_call_seconds": 5.0,  # Calls slower than this count as failures
+    "open_seconds": 30,  # Fail fast for this long before trying Backendless again
+    "hedge": True,  # Send a second lookup if the first is slower than usual
+    "hedge_percentile": 0.95,  # "Slower than usual" = recent latency at this percentile
+    "hedge_min_delay": 0.3,  # Never hedge sooner than this many seconds
+    "hedge_max_in_flight": 4  # Hedges running at once, process-wide; beyond this lookups aren't hedged
+}
+
+# Quote submission: repeats of the same quote within the window return the original result
+QUOTE_PIPELINE = {
+    "dedupe_window_seconds": 600,
+    "max_entries": 1000  # Recently submitted quotes remembered for deduplication
+}
+
+# Which Deepgram agent events reach the browser (as agent_response), and which fields
+AGENT_EVENTS = {
+    "forward": {  # Event type -> fields the UI uses (None forwards the whole message)
+        "Welcome": ["type", "request_id"],
+        "ConversationText": ["type", "role", "content"],
+        "UserStartedSpeaking": ["type"],
+        "AgentAudioDone": ["type"],
+        "Error": ["type", "description", "code"]
+    },
+    "batch": ["History"],  # Chatty events sent together as agent_response_batch
+    "batch_ms": 1000  # Longest a batched event waits before being sent
+}
+
+# Conversation history kept per session and replayed to the agent on resume/reconnect
+CONVERSATION_LOG = {
+    "max_messages": 50,  # Oldest entries are dropped beyond this many
+    "max_chars": 8000,  # ...or once their text exceeds this many characters in total
+    "max_entry_chars": 1000  # Longer messages and function results are truncated
+}
+
+# Pre-opened Deepgram agent WebSockets that new sessions can claim
+CONNECTION_POOL = {
+    "enabled": False,
+    "min_idle": 0,  # Idle sockets kept open even with no recent calls
+    "max_idle": 4,  # Upper bound on idle sockets
+    "rate_window_seconds": 300,  # Call rate is measured over this window to size the pool
+    "max_age_seconds": 60,  # Idle sockets are replaced after this long
+    "health_check_interval": 10  # Seconds between pings of idle sockets
+}
+
+# connection_status pushes to the browser: sent on connect/disconnect/error changes, plus a heartbeat
+CONNECTION_STATUS = {
+    "heartbeat_seconds": 15,  # Current status is re-sent this often while a session is subscribed
+    "tick_seconds": 1.0  # How often the server checks which sessions are due a heartbeat
+}
+
+# Admin sampling profiler (/admin/profile, enabled by setting ADMIN_TOKEN) and asyncio slow-callback logging
+PROFILING = {
+    "interval_ms": 5,  # Default time between stack samples
+    "min_interval_ms": 1,  # Shortest interval one request may ask for; faster sampling slows the calls being profiled
+    "max_seconds": 60,  # Longest profile one request may ask for
+    "profile_slow_callback_ms": 100,  # While profiling, log agent-loop callbacks that block longer than this
+    "slow_callback_ms": None  # Set (e.g. 250) to log slow callbacks all the time; turns on asyncio debug mode
+}
+
+# Event-loop lag and thread health watchdog (reported under "watchdog" in /metrics)
+WATCHDOG = {
+    "interval_seconds": 1.0,  # How often the gevent hub and each agent loop are probed
+    "lag_warn_ms": 200,  # A loop running scheduled work later than this is logged as a warning
+    "alert_every_seconds": 30  # At most one lag warning per loop in this period
+}
+
+# Drain mode on SIGTERM: new calls are refused while active ones finish (see /readyz)
+DRAIN = {
+    "deadline_seconds": 120,  # Calls still running after this are stopped; keep below gunicorn's --graceful-timeout
+    "poll_seconds": 1.0,  # How often the drain checks for remaining calls
+    "quote_flush_seconds": 15  # Extra time for in-flight quote submissions once calls are stopped
+}
+
+# /readyz: when this instance should stop getting new calls (/healthz is liveness only)
+HEALTH = {
+    "max_sessions": 50,  # Capacity: concurrent calls one worker is sized for
+    "max_loop_lag_ms": 1000,  # Worst recent event-loop lag (see WATCHDOG) before the instance is not ready
+    "key_check_ttl_seconds": 300,  # How long a Deepgram API key check is trusted
+    "key_check_timeout": 5,
+    "fail_on_open_breaker": False  # An open Backendless breaker is reported; set True to also fail readiness
+}
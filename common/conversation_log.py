@@ -0,0 +1,72 @@
+import json
+from collections import deque
+
+
+class ConversationLog:
+    """
+    Bounded log of what was said and which functions ran in one session.
+
+    Entries are stored in the Deepgram Settings history format
+    (agent.context.messages), so a reconnect or resume can hand them straight back
+    to the agent. The oldest entries are dropped once there are more than
+    max_messages or their text exceeds max_chars in total; single entries longer
+    than max_entry_chars are truncated.
+    """
+
+    def __init__(self, max_messages=50, max_chars=8000, max_entry_chars=1000):
+        self.max_messages = max_messages
+        self.max_chars = max_chars
+        self.max_entry_chars = max_entry_chars
+        self._entries = deque()
+        self._chars = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add_text(self, role, content):
+        """Records a ConversationText message ('user' or 'assistant')."""
+        if content:
+            self._append({"type": "History", "role": role, "content": self._truncate(content)})
+
+    def add_function_call(self, call_id, name, arguments, response):
+        """Records a function call and the result sent back to the agent."""
+        self._append({
+            "type": "History",
+            "function_calls": [{
+                "id": call_id,
+                "name": name,
+                "client_side": True,
+                "arguments": self._truncate(arguments),
+                "response": self._truncate(response),
+            }],
+        })
+
+    def messages(self):
+        return list(self._entries)
+
+    def to_state(self):
+        return self.messages()
+
+    def load_state(self, entries):
+        self._entries.clear()
+        self._chars = 0
+        for entry in entries or []:
+            self._append(entry)
+
+    def _truncate(self, text):
+        if len(text) <= self.max_entry_chars:
+            return text
+        return text[:self.max_entry_chars] + "…"
+
+    def _append(self, entry):
+        size = self._size(entry)
+        self._entries.append(entry)
+        self._chars += size
+        while len(self._entries) > self.max_messages or (self._chars > self.max_chars and len(self._entries) > 1):
+            self._chars -= self._size(self._entries.popleft())
+
+    @staticmethod
+    def _size(entry):
+        if "content" in entry:
+            return len(entry["content"])
+        return len(json.dumps(entry.get("function_calls", [])))
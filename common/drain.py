@@ -0,0 +1,60 @@
+import time
+
+
+class Drain:
+    """
+    Drain mode for restarts without dropping calls.
+
+    Once begin() is called the server stops taking new calls; wait() then blocks
+    until active_calls() and pending_work() are both zero or deadline_seconds
+    have passed. sleep is passed in so the wait yields to gevent when it runs
+    under the gunicorn gevent worker.
+    """
+
+    def __init__(self, active_calls, pending_work, sleep, deadline_seconds=120, poll_seconds=1.0):
+        self.active_calls = active_calls  # callable() -> number of calls still in progress
+        self.pending_work = pending_work  # callable() -> number of writes (e.g. quotes) still in flight
+        self.sleep = sleep
+        self.deadline_seconds = deadline_seconds
+        self.poll_seconds = poll_seconds
+        self.started_at = None
+
+    @property
+    def draining(self):
+        return self.started_at is not None
+
+    def begin(self):
+        """Enter drain mode; False if it was already draining."""
+        if self.draining:
+            return False
+        self.started_at = time.monotonic()
+        return True
+
+    def remaining_seconds(self):
+        if not self.draining:
+            return None
+        return max(0.0, self.deadline_seconds - (time.monotonic() - self.started_at))
+
+    def wait(self, log=None):
+        """Wait for calls and pending work to finish; True if everything finished before the deadline."""
+        last_logged = None
+        while True:
+            calls, pending = self.active_calls(), self.pending_work()
+            if not calls and not pending:
+                return True
+            if self.remaining_seconds() <= 0:
+                return False
+            if log and (calls, pending) != last_logged:
+                last_logged = (calls, pending)
+                log(f"Draining: waiting for {calls} call(s) and {pending} pending write(s), "
+                    f"{self.remaining_seconds():.0f}s left")
+            self.sleep(min(self.poll_seconds, self.remaining_seconds()))
+
+    def status(self):
+        remaining = self.remaining_seconds()
+        return {
+            "draining": self.draining,
+            "active_calls": self.active_calls(),
+            "pending_writes": self.pending_work(),
+            "deadline_seconds": round(remaining, 1) if remaining is not None else None,
+        }
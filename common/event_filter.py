@@ -0,0 +1,73 @@
+import asyncio
+
+from common import json_codec
+
+
+class EventFilter:
+    """
+    Decides which Deepgram text messages reach one browser session, and in what form.
+
+    Each forwarded event type maps to the fields the UI uses; the message is
+    projected down to those fields, or forwarded as the original text when the
+    field list is None. Batched types (chatty events such as History) are held and
+    sent together as one JSON array at most every batch_ms. Everything else is
+    dropped.
+
+    handle() and flush() must be called from the event loop that owns the
+    Deepgram socket.
+    """
+
+    def __init__(self, emit, emit_batch, forward, batch=(), batch_ms=1000):
+        self.emit = emit  # callable(json_text)
+        self.emit_batch = emit_batch  # callable(json_array_text)
+        self.forward = dict(forward)  # event type -> list of fields, or None for the whole message
+        self.batch = set(batch)
+        self.batch_delay = batch_ms / 1000.0
+        self.forwarded = 0
+        self.batched = 0
+        self.dropped = 0
+        self._pending = []
+        self._timer = None
+
+    @classmethod
+    def for_session(cls, emit, emit_batch, settings, event_types=None):
+        """
+        Build a filter from AGENT_EVENTS settings. A browser may ask for a different
+        set of event_types; known types keep their configured projection and unknown
+        ones are forwarded whole.
+        """
+        if event_types is None:
+            return cls(emit, emit_batch, settings["forward"], settings["batch"], settings["batch_ms"])
+        wanted = set(event_types)
+        batch = wanted & set(settings["batch"])
+        forward = {t: settings["forward"].get(t) for t in wanted - batch}
+        return cls(emit, emit_batch, forward, batch, settings["batch_ms"])
+
+    def handle(self, msg_type, msg_json, raw):
+        if msg_type in self.batch:
+            self._pending.append(raw)
+            self.batched += 1
+            if self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.batch_delay, self.flush)
+            return
+        if msg_type not in self.forward:
+            self.dropped += 1
+            return
+        fields = self.forward[msg_type]
+        if fields is None:
+            self.emit(raw)
+        else:
+            self.emit(json_codec.dumps({field: msg_json[field] for field in fields if field in msg_json}))
+        self.forwarded += 1
+
+    def flush(self):
+        """Send held batched events as one JSON array (joined as text, not re-encoded)."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._pending:
+            self.emit_batch("[" + ",".join(self._pending) + "]")
+            self._pending = []
+
+    def stats(self):
+        return {"forwarded": self.forwarded, "batched": self.batched, "dropped": self.dropped}
@@ -0,0 +1,119 @@
+import hashlib
+import logging
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEEPGRAM_KEY_CHECK_URL = "https://api.deepgram.com/v1/auth/token"
+
+
+def _fingerprint(api_key):
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else None
+
+
+class DeepgramKeyCheck:
+    """
+    Cached answer to "is DEEPGRAM_API_KEY accepted by Deepgram?".
+
+    status() never touches the network: it returns the last known answer and,
+    once that is older than ttl_seconds, starts a single background check.
+    Agent connections report what they see too (a 401 handshake marks the key
+    invalid at once). A changed key discards the cached answer.
+    """
+
+    def __init__(self, api_key_getter, ttl_seconds=300, timeout=5, url=DEEPGRAM_KEY_CHECK_URL):
+        self.api_key_getter = api_key_getter  # callable() -> API key or None
+        self.ttl = ttl_seconds
+        self.timeout = timeout
+        self.url = url
+        self.valid = None  # None until checked
+        self.checked_at = 0.0  # time.time() of the last answer
+        self.error = None
+        self._key = None  # Fingerprint of the key the answer is for
+        self._lock = threading.Lock()
+        self._checking = False
+
+    def status(self):
+        key = _fingerprint(self.api_key_getter())
+        with self._lock:
+            if key != self._key:
+                self._key, self.valid, self.checked_at, self.error = key, None, 0.0, None
+            if key is None:
+                self.valid, self.error = False, "DEEPGRAM_API_KEY not set"
+            status = {"valid": self.valid, "checked_at": self.checked_at or None, "error": self.error}
+            stale = key is not None and time.time() - self.checked_at >= self.ttl
+        if stale:
+            self.check_async()
+        return status
+
+    def report(self, valid, error=None):
+        """Record what a real connection just saw for the current key."""
+        with self._lock:
+            self._key = _fingerprint(self.api_key_getter())
+            self.valid, self.error, self.checked_at = valid, error, time.time()
+
+    def check_async(self):
+        """Starts a background check unless one is already running."""
+        with self._lock:
+            if self._checking:
+                return False
+            self._checking = True
+        threading.Thread(target=self._check_guarded, name="deepgram-key-check", daemon=True).start()
+        return True
+
+    def check(self):
+        """Asks Deepgram about the key, blocking the caller. Returns the validity (None if unknown)."""
+        api_key = self.api_key_getter()
+        if not api_key:
+            return False
+        try:
+            response = requests.get(self.url, headers={"Authorization": f"Token {api_key}"}, timeout=self.timeout)
+        except Exception as e:
+            # Network trouble says nothing about the key; keep the last answer
+            logger.warning(f"Deepgram key check failed: {e}")
+            with self._lock:
+                self.error = str(e)
+            return self.valid
+        if response.status_code in (401, 403):
+            self.report(False, f"HTTP {response.status_code} from Deepgram")
+        elif response.ok:
+            self.report(True)
+        else:
+            with self._lock:
+                self.error = f"HTTP {response.status_code} from Deepgram"
+        return self.valid
+
+    def _check_guarded(self):
+        try:
+            self.check()
+        finally:
+            with self._lock:
+                self._checking = False
+
+
+def readiness(active_sessions, max_sessions, loop_lag_ms, max_loop_lag_ms, breakers, key_status,
+              draining=False, fail_on_open_breaker=False):
+    """
+    Decide whether this instance should get new calls. Returns (ready, checks),
+    where checks holds each input with its own "ok". An unknown value (no lag
+    measured yet, key not checked yet) counts as ok.
+
+    An open Backendless breaker is reported but only fails readiness with
+    fail_on_open_breaker: every instance shares the backend, so routing away
+    from one rarely helps.
+    """
+    open_breakers = [name for name, snapshot in breakers.items() if snapshot["state"] == "open"]
+    checks = {
+        "draining": {"ok": not draining},
+        "capacity": {"ok": active_sessions < max_sessions, "active": active_sessions, "max": max_sessions},
+        "loop_lag": {"ok": loop_lag_ms is None or loop_lag_ms <= max_loop_lag_ms,
+                     "max_lag_ms": loop_lag_ms, "limit_ms": max_loop_lag_ms},
+        "backendless": {"ok": not open_breakers,
+                        "breakers": {name: snapshot["state"] for name, snapshot in breakers.items()}},
+        "deepgram_key": dict(key_status, ok=key_status["valid"] is not False),
+    }
+    critical = [name for name in checks if name != "backendless" or fail_on_open_breaker]
+    return all(checks[name]["ok"] for name in critical), checks
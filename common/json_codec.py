@@ -0,0 +1,33 @@
+# JSON encoding/decoding for the hot paths (Deepgram control messages, function
+# calls, Backendless responses). Uses orjson when it is installed and falls back
+# to the standard library otherwise; both produce the same data, but orjson's
+# output is compact (no spaces after separators).
+import json
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# orjson.JSONDecodeError subclasses this, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+if HAS_ORJSON:
+    def loads(data):
+        return orjson.loads(data)
+
+    def dumps(obj):
+        return orjson.dumps(obj).decode("utf-8")
+
+    def dumps_pretty(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode("utf-8")
+else:
+    def loads(data):
+        return json.loads(data)
+
+    def dumps(obj):
+        return json.dumps(obj, separators=(",", ":"))
+
+    def dumps_pretty(obj):
+        return json.dumps(obj, indent=2)
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEEPGRAM_MODELS_URL = "https://api.deepgram.com/v1/models"
+
+# Served when neither Deepgram nor the on-disk snapshot is available
+DEFAULT_TTS_MODELS = [
+    {"name": "aura-2-thalia-en", "display_name": "thalia", "language": "en"},
+    {"name": "aura-2-cora-en", "display_name": "cora", "language": "en"},
+    {"name": "aura-2-andromeda-en", "display_name": "andromeda", "language": "en"},
+    {"name": "aura-2-helena-en", "display_name": "helena", "language": "en"},
+    {"name": "aura-2-apollo-en", "display_name": "apollo", "language": "en"},
+    {"name": "aura-2-arcas-en", "display_name": "arcas", "language": "en"},
+]
+
+
+def format_tts_models(data):
+    """Reduces a Deepgram /v1/models response to the Aura-2 voices the UI offers."""
+    return [
+        {
+            "name": model.get("canonical_name", model.get("name")),
+            "display_name": model.get("name"),
+            "language": model.get("languages", ["en"])[0],
+        }
+        for model in data.get("tts", [])
+        if model.get("architecture") == "aura-2"
+    ]
+
+
+class ModelCatalogue:
+    """
+    Stale-while-revalidate cache of the Deepgram TTS model list.
+
+    get() never touches the network: it returns the cached list (or the on-disk
+    snapshot, or DEFAULT_TTS_MODELS on a cold start) and, once the list is older
+    than ttl_seconds, starts a single background refresh. Refreshes send the last
+    ETag so an unchanged catalogue costs a 304, and every successful fetch is
+    written to snapshot_path so restarts have something to serve immediately.
+    After a failed refresh the next one waits retry_seconds, doubling with each
+    further failure up to ttl_seconds, so an outage doesn't cost a request per get().
+    """
+
+    def __init__(self, api_key_getter, ttl_seconds=3600, snapshot_path=None, timeout=5, retry_seconds=30,
+                 url=DEEPGRAM_MODELS_URL):
+        self.api_key_getter = api_key_getter  # callable() -> API key or None
+        self.ttl = ttl_seconds
+        self.snapshot_path = snapshot_path
+        self.timeout = timeout
+        self.retry_seconds = retry_seconds
+        self.url = url
+        self.models = None
+        self.etag = None
+        self.fetched_at = 0.0  # time.time() of the last successful fetch or 304
+        self.source = "default"  # default, snapshot or deepgram
+        self.last_error = None
+        self.last_attempt_at = 0.0  # time.time() of the last refresh attempt
+        self.failures = 0  # Consecutive failed refreshes
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self):
+        """Returns (models, info) immediately, scheduling a refresh if the list is stale."""
+        with self._lock:
+            if self.models is None:
+                self._load_snapshot()
+            models = self.models if self.models is not None else DEFAULT_TTS_MODELS
+            stale = self.is_stale()
+            info = {"source": self.source, "stale": stale, "fetched_at": self.fetched_at or None}
+            due = stale and time.time() - self.last_attempt_at >= self.retry_delay()
+        if due:
+            self.refresh_async()
+        return models, info
+
+    def is_stale(self):
+        return time.time() - self.fetched_at >= self.ttl
+
+    def retry_delay(self):
+        """Seconds to wait after the last attempt before trying again: 0 until a refresh fails."""
+        if not self.failures:
+            return 0
+        return min(self.ttl, self.retry_seconds * 2 ** (self.failures - 1))
+
+    def refresh_async(self):
+        """Starts a background refresh unless one is already running (single flight)."""
+        with self._lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+        threading.Thread(target=self._refresh_guarded, name="model-catalogue-refresh", daemon=True).start()
+        return True
+
+    def refresh(self):
+        """Fetches the catalogue from Deepgram, blocking the caller. Returns True on success."""
+        with self._lock:
+            self.last_attempt_at = time.time()
+        api_key = self.api_key_getter()
+        if not api_key:
+            self._record_failure("DEEPGRAM_API_KEY not set")
+            return False
+        headers = {"Authorization": f"Token {api_key}"}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        try:
+            response = requests.get(self.url, headers=headers, timeout=self.timeout)
+            if response.status_code == 304:
+                with self._lock:
+                    self.fetched_at = time.time()
+                    self.last_error = None
+                    self.failures = 0
+                return True
+            response.raise_for_status()
+            models = format_tts_models(response.json())
+        except Exception as e:
+            self._record_failure(str(e))
+            logger.warning(f"Failed to refresh TTS model catalogue: {e}")
+            return False
+
+        with self._lock:
+            self.models = models
+            self.etag = response.headers.get("ETag")
+            self.fetched_at = time.time()
+            self.source = "deepgram"
+            self.last_error = None
+            self.failures = 0
+        self._save_snapshot(models, self.etag)
+        return True
+
+    def _record_failure(self, error):
+        with self._lock:
+            self.last_error = error
+            self.failures += 1
+
+    def _refresh_guarded(self):
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def _load_snapshot(self):
+        # Called with the lock held. The snapshot's age is kept, so an old
+        # snapshot is served once and refreshed in the background.
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path, "r") as f:
+                snapshot = json.load(f)
+            self.models = snapshot["models"]
+            self.etag = snapshot.get("etag")
+            self.fetched_at = snapshot.get("fetched_at", 0.0)
+            self.source = "snapshot"
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable model catalogue snapshot: {e}")
+
+    def _save_snapshot(self, models, etag):
+        if not self.snapshot_path:
+            return
+        try:
+            directory = os.path.dirname(self.snapshot_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"models": models, "etag": etag, "fetched_at": self.fetched_at}, f, indent=2)
+            os.replace(tmp_path, self.snapshot_path)  # atomic, readers never see a partial file
+        except Exception as e:
+            logger.warning(f"Failed to write model catalogue snapshot: {e}")
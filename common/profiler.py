@@ -0,0 +1,128 @@
+import _thread
+import asyncio
+import logging
+import sys
+import threading
+import time
+from collections import Counter
+
+# The sampler must be a real OS thread with a real sleep, even when gevent has
+# monkey-patched threading and time (as the gunicorn gevent worker does).
+try:
+    from gevent import monkey
+    _start_thread = monkey.get_original("_thread", "start_new_thread")
+    _get_ident = monkey.get_original("_thread", "get_ident")
+    _sleep = monkey.get_original("time", "sleep")
+except ImportError:
+    _start_thread = _thread.start_new_thread
+    _get_ident = _thread.get_ident
+    _sleep = time.sleep
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", "?")
+    return f"{module}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for every thread in the process.
+
+    A background OS thread snapshots sys._current_frames() every interval_ms and
+    counts identical stacks. collapsed() returns them in the "collapsed stack"
+    format read by flamegraph.pl, speedscope and similar tools: one line per
+    stack, root first, frames separated by ';', followed by its sample count.
+    Each stack starts with the thread's name. Under gevent, greenlets share the
+    main thread, so only the greenlet running at each sample is seen.
+    """
+
+    def __init__(self, interval_ms=5, max_depth=64):
+        self.interval = interval_ms / 1000.0
+        self.max_depth = max_depth
+        self.samples = 0
+        self.stacks = Counter()
+        self.started_at = None
+        self.finished_at = None
+        self._stop = False
+        self._done = False
+
+    @property
+    def done(self):
+        return self._done
+
+    def start(self, seconds):
+        self.started_at = time.time()
+        _start_thread(self._run, (seconds,))
+
+    def stop(self):
+        self._stop = True
+
+    def _run(self, seconds):
+        me = _get_ident()
+        deadline = time.monotonic() + seconds
+        try:
+            while not self._stop and time.monotonic() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == me:
+                        continue
+                    stack = []
+                    while frame is not None and len(stack) < self.max_depth:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, f"thread-{ident}"))
+                    self.stacks[";".join(reversed(stack))] += 1
+                self.samples += 1
+                _sleep(self.interval)
+        finally:
+            self.finished_at = time.time()
+            self._done = True
+
+    def collapsed(self):
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common()) + "\n"
+
+    def summary(self, top=20):
+        return {
+            "samples": self.samples,
+            "seconds": round((self.finished_at or time.time()) - (self.started_at or time.time()), 2),
+            "interval_ms": self.interval * 1000,
+            "top_stacks": [{"stack": stack, "samples": count} for stack, count in self.stacks.most_common(top)],
+        }
+
+
+class SlowCallbackRecorder(logging.Handler):
+    """Keeps the asyncio debug-mode 'Executing <callback> took N seconds' warnings."""
+
+    def __init__(self, limit=100):
+        super().__init__(logging.WARNING)
+        self.limit = limit
+        self.records = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("Executing") and len(self.records) < self.limit:
+            self.records.append({"time": record.created, "message": message})
+
+
+def set_slow_callback_threshold(loop, threshold_ms):
+    """
+    Turn on asyncio debug mode for loop so any callback that blocks it longer
+    than threshold_ms is logged by the 'asyncio' logger; None turns it off.
+    Safe to call from any thread.
+    """
+    def apply():
+        loop.set_debug(threshold_ms is not None)
+        if threshold_ms is not None:
+            loop.slow_callback_duration = threshold_ms / 1000.0
+
+    if loop.is_closed():
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop or not loop.is_running():
+        apply()
+    else:
+        loop.call_soon_threadsafe(apply)
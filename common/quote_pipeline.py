@@ -0,0 +1,101 @@
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from common.resilience import SingleFlight
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def idempotency_key(payload):
+    """
+    Content hash of a quote payload. Case and whitespace differences are ignored,
+    so an LLM retry that re-types the same details maps to the same key.
+    """
+    canonical = json.dumps(_normalize(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class QuotePipeline:
+    """
+    Submits quotes at most once per dedupe window.
+
+    Each payload gets an idempotency key. Successful results are remembered for
+    dedupe_window_seconds, and a repeat submission of the same quote in that window
+    returns the original result (and Internal Request Number) without calling
+    submit again. Identical submissions that overlap in time share one call.
+    """
+
+    def __init__(self, submit, dedupe_window_seconds=600, max_entries=1000):
+        self.submit_fn = submit  # callable(payload) -> result dict
+        self.window = dedupe_window_seconds
+        self.max_entries = max_entries
+        self.submitted = 0
+        self.duplicates = 0
+        self._recent = OrderedDict()  # key -> (monotonic time, result), oldest first
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def submit(self, payload):
+        key = idempotency_key(payload)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        return self._flight.do(key, lambda: self._submit_once(key, payload))
+
+    def stats(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            stats = {"submitted": self.submitted, "duplicates": self.duplicates, "recent": len(self._recent)}
+        stats["in_flight"] = self.in_flight()
+        return stats
+
+    def in_flight(self):
+        """Submissions still running (a drain waits for these before the process exits)."""
+        return self._flight.stats()["in_flight"]
+
+    def _submit_once(self, key, payload):
+        # Re-check: an identical call may have finished just before this one started
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        result = self.submit_fn(payload)
+        succeeded = isinstance(result, dict) and result.get("success")
+        if succeeded:
+            result["idempotency_key"] = key
+        with self._lock:
+            self.submitted += 1
+            if succeeded:
+                self._recent[key] = (time.monotonic(), copy.deepcopy(result))
+                while len(self._recent) > self.max_entries:
+                    self._recent.popitem(last=False)
+        return result
+
+    def _lookup(self, key):
+        with self._lock:
+            self._expire(time.monotonic())
+            entry = self._recent.get(key)
+            if entry is None:
+                return None
+            self.duplicates += 1
+        result = copy.deepcopy(entry[1])
+        result["duplicate"] = True
+        return result
+
+    def _expire(self, now):
+        while self._recent:
+            key, (submitted_at, _) = next(iter(self._recent.items()))
+            if now - submitted_at < self.window:
+                break
+            self._recent.popitem(last=False)
@@ -0,0 +1,237 @@
+import copy
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an endpoint whose circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker driven by error rate and latency.
+
+    Calls made in the last window_seconds are tracked. Once there are at least
+    min_calls and the share of failed or slow calls (slower than slow_call_seconds)
+    reaches failure_rate, the breaker opens and callers fail fast for open_seconds.
+    It then lets a single trial call through (half-open); success closes it again,
+    failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name, failure_rate=0.5, min_calls=5, window_seconds=60,
+                 slow_call_seconds=5.0, open_seconds=30):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window_seconds
+        self.slow_call_seconds = slow_call_seconds
+        self.open_seconds = open_seconds
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._calls = deque()  # (monotonic time, failed, latency seconds)
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """True if a call may go ahead; counts a rejection otherwise."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success, latency):
+        now = time.monotonic()
+        failed = not success or latency >= self.slow_call_seconds
+        with self._lock:
+            self._calls.append((now, failed, latency))
+            self._prune(now)
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+                if failed:
+                    self._open(now)
+                else:
+                    self.state = self.CLOSED
+                    self._calls.clear()
+                return
+            failures = sum(1 for _, f, _ in self._calls if f)
+            if len(self._calls) >= self.min_calls and failures / len(self._calls) >= self.failure_rate:
+                self._open(now)
+
+    def latency_percentile(self, percentile, min_samples=5):
+        """Latency of recent successful calls at the given percentile (0-1), or None."""
+        with self._lock:
+            self._prune(time.monotonic())
+            latencies = sorted(latency for _, failed, latency in self._calls if not failed)
+        if len(latencies) < min_samples:
+            return None
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+    def snapshot(self):
+        with self._lock:
+            self._prune(time.monotonic())
+            calls = len(self._calls)
+            failures = sum(1 for _, f, _ in self._calls if f)
+            state = self.state
+        return {
+            "state": state,
+            "calls": calls,
+            "failures": failures,
+            "error_rate": round(failures / calls, 3) if calls else 0.0,
+            "p95_seconds": self.latency_percentile(0.95),
+            "rejected": self.rejected,
+        }
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self.opened_at = now
+
+    def _prune(self, now):
+        while self._calls and now - self._calls[0][0] > self.window:
+            self._calls.popleft()
+
+
+class HedgePool:
+    """
+    Threads for hedge requests only; primaries never wait for it. A call must
+    reserve() a slot before it may hedge, and reserve() fails instead of
+    queueing when every slot is busy, so no hedges are added while the pool
+    (and most likely the backend) is saturated.
+    """
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self.skipped = 0  # Hedges not sent because every slot was busy
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._slots = threading.BoundedSemaphore(max_workers)
+
+    def reserve(self):
+        if self._slots.acquire(blocking=False):
+            return True
+        self.skipped += 1
+        return False
+
+    def release(self):
+        self._slots.release()
+
+    def submit(self, fn):
+        """Run fn on a reserved slot; the slot is released when it finishes."""
+        future = self._executor.submit(fn)
+        future.add_done_callback(lambda _: self.release())
+        return future
+
+
+def _run_in_thread(fn):
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="hedged-primary", daemon=True).start()
+    return future
+
+
+def hedged_call(fn, hedge_delay, pool):
+    """
+    Calls fn() and, if it hasn't returned after hedge_delay seconds, starts a
+    second identical call on pool and returns whichever finishes first. Only use
+    this for idempotent requests. Returns (result, hedged). If every attempt
+    raises, the first exception is re-raised.
+
+    Without a hedge_delay or a free pool slot, fn() simply runs on the caller's
+    thread. With a slot reserved, the primary gets its own short-lived thread so
+    the caller can take the hedge's answer without waiting for the primary.
+    """
+    if hedge_delay is None or not pool.reserve():
+        return fn(), False
+    hedge = None
+    try:
+        first = _run_in_thread(fn)
+        done, _ = wait([first], timeout=hedge_delay)
+        if done:
+            return first.result(), False
+        hedge = pool.submit(fn)
+    finally:
+        if hedge is None:
+            pool.release()
+    pending = {first, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result(), True
+            error = error or future.exception()
+    raise error
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent calls: while a call for a key is in flight,
+    other callers with the same key wait for it and get (a copy of) its result
+    instead of starting their own. Nothing is cached once the call finishes.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.shared = 0
+        self._in_flight = {}  # key -> concurrent.futures.Future
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            self.calls += 1
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return copy.deepcopy(future.result())
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self):
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._in_flight)}
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, **settings):
+    """Returns the process-wide breaker for name, creating it with settings on first use."""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, **settings)
+        return _breakers[name]
+
+
+def breaker_metrics():
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
@@ -0,0 +1,34 @@
+import hashlib
+import re
+import secrets
+import uuid
+
+# New IDs are session_<32 hex>; older session_<unix time> directories still match
+SESSION_ID_PATTERN = re.compile(r"^session_[A-Za-z0-9_-]{1,64}$")
+
+
+def new_session_id():
+    """A random, unguessable session ID (also the session's directory name)."""
+    return f"session_{uuid.uuid4().hex}"
+
+
+def new_resume_token():
+    """Secret handed to the browser that started a session; needed to resume it later."""
+    return secrets.token_urlsafe(32)
+
+
+def hash_token(token):
+    """Only the hash is written to the session state, so a leaked state file can't resume a session."""
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def is_valid_session_id(session_id):
+    return isinstance(session_id, str) and bool(SESSION_ID_PATTERN.match(session_id))
+
+
+def verify_resume_token(state, token):
+    """True if token matches the hash stored in a session's state. Sessions saved without one can't be resumed."""
+    expected = (state or {}).get("resume_token_hash")
+    if not expected or not isinstance(token, str) or not token:
+        return False
+    return secrets.compare_digest(expected, hash_token(token))
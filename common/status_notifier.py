@@ -0,0 +1,70 @@
+import threading
+import time
+
+
+class ConnectionStatusNotifier:
+    """
+    Pushes connection_status to one browser session when the agent's connection
+    state changes, instead of on every audio frame.
+
+    snapshot() returns the status payload; only its "connected" and "last_error"
+    fields decide whether something changed. While the session is subscribed,
+    heartbeat() (called periodically for all sessions) re-sends the current status
+    once every heartbeat_seconds, so a browser that missed a transition catches up.
+    update() and heartbeat() may be called from any thread.
+    """
+
+    def __init__(self, emit, snapshot, heartbeat_seconds=15, subscribed=True):
+        self.emit = emit  # callable(status dict)
+        self.snapshot = snapshot  # callable() -> status dict
+        self.heartbeat_seconds = heartbeat_seconds
+        self.subscribed = subscribed
+        self.transitions = 0
+        self.heartbeats = 0
+        self._lock = threading.Lock()
+        self._last_key = self._key(snapshot())  # Starting state is not a transition
+        self._last_sent = time.monotonic()
+
+    @staticmethod
+    def _key(status):
+        return status.get("connected"), status.get("last_error")
+
+    def subscribe(self, enabled=True, heartbeat_seconds=None):
+        """Turn pushes on or off for this session, optionally changing the heartbeat."""
+        with self._lock:
+            self.subscribed = enabled
+            if heartbeat_seconds:
+                self.heartbeat_seconds = heartbeat_seconds
+        if enabled:
+            self._send(self.snapshot(), "subscribed")
+
+    def update(self):
+        """Emit the current status if it differs from the last one seen."""
+        status = self.snapshot()
+        key = self._key(status)
+        with self._lock:
+            if key == self._last_key:
+                return False
+            self._last_key = key
+            self.transitions += 1
+            if not self.subscribed:
+                return False
+        self._send(status, "transition")
+        return True
+
+    def heartbeat(self, now=None):
+        """Re-send the current status if subscribed and nothing was sent for heartbeat_seconds."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if not self.subscribed or now - self._last_sent < self.heartbeat_seconds:
+                return False
+            self.heartbeats += 1
+        self._send(self.snapshot(), "heartbeat")
+        return True
+
+    def _send(self, status, event):
+        self._last_sent = time.monotonic()
+        self.emit(dict(status, event=event))
+
+    def stats(self):
+        return {"transitions": self.transitions, "heartbeats": self.heartbeats, "subscribed": self.subscribed}
@@ -0,0 +1,86 @@
+import asyncio
+
+from common.audio_codec import PCM16Codec
+
+
+class TTSRelay:
+    """
+    Coalesces Deepgram TTS audio frames into larger binary packets for one browser session.
+
+    The first frame of each agent turn is sent immediately to keep time-to-first-audio
+    low. After that, frames are batched into packets of about packet_ms of audio; a
+    packet is also flushed once its oldest byte has waited max_delay_ms, so a slow
+    upstream never starves the browser. Each packet carries a sequence number so the
+    browser can detect gaps, and its audio is encoded with the negotiated transport
+    codec (see common.audio_codec). The first packet of a turn is marked turn_start,
+    so the browser can tell it from a late tail of the previous turn.
+
+    All methods must be called from the event loop that owns the Deepgram socket.
+    """
+
+    def __init__(self, emit, bytes_per_sec, packet_ms=100, max_delay_ms=50, codec=None):
+        self.emit = emit  # callable(packet_dict)
+        self.codec = codec or PCM16Codec()
+        self.packet_bytes = int(bytes_per_sec * packet_ms / 1000) & ~1  # whole PCM16 samples
+        self.max_delay = max_delay_ms / 1000.0
+        self.seq = 0
+        self.packets_sent = 0
+        self.frames_received = 0
+        self._pending = bytearray()
+        self._timer = None
+        self._in_turn = False
+        self._turn_start = False  # Next packet sent opens a turn
+
+    def push(self, frame):
+        """Add one TTS frame from Deepgram."""
+        self.frames_received += 1
+        self._pending += frame
+        if not self._in_turn:
+            self._in_turn = True
+            self._turn_start = True
+            self.flush()
+        elif len(self._pending) >= self.packet_bytes:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_delay, self.flush)
+
+    def flush(self):
+        """Send whatever is pending, keeping any odd trailing byte for the next packet."""
+        self._cancel_timer()
+        size = len(self._pending) & ~1
+        if size == 0:
+            return
+        audio = bytes(self._pending[:size])
+        del self._pending[:size]
+        self._send(self.codec.encode(audio))
+
+    def end_turn(self):
+        """The agent finished speaking: flush the tail and send the next turn's first frame immediately."""
+        self.flush()
+        self._send(self.codec.flush())
+        self._in_turn = False
+
+    def reset(self):
+        """Drop pending audio (e.g. on barge-in) and start a fresh turn."""
+        self._cancel_timer()
+        self._pending.clear()
+        self.codec.reset()
+        self._in_turn = False
+        self._turn_start = False
+
+    def _send(self, payload):
+        # Stateful codecs (Opus) may hold back audio that doesn't fill a frame yet
+        if not payload:
+            return
+        packet = {"seq": self.seq, "codec": self.codec.name, "audio": payload}
+        if self._turn_start:
+            packet["turn_start"] = True
+            self._turn_start = False
+        self.emit(packet)
+        self.seq += 1
+        self.packets_sent += 1
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
@@ -0,0 +1,105 @@
+from collections import deque
+
+from common.audio_utils import pcm16_rms, pcm16_zero_crossing_rate
+
+
+class VoiceActivityDetector:
+    """
+    Lightweight energy / zero-crossing voice activity detector for linear16 mic audio.
+
+    process() takes one inbound chunk and returns the chunks that should be
+    forwarded upstream: speech, a hangover tail after speech so Deepgram still
+    sees the silence it uses for endpointing, the pre-roll captured just before
+    speech started, and an occasional keepalive frame during long silences.
+    Empty chunks (end-of-speech markers) are always forwarded.
+    """
+
+    def __init__(self, bytes_per_sec, energy_threshold=500, zcr_threshold=0.3,
+                 hangover_ms=500, preroll_ms=200, keepalive_ms=5000):
+        self.bytes_per_sec = bytes_per_sec
+        self.energy_threshold = energy_threshold
+        self.zcr_threshold = zcr_threshold
+        self.hangover_ms = hangover_ms
+        self.preroll_ms = preroll_ms
+        self.keepalive_ms = keepalive_ms
+
+        self._preroll = deque()
+        self._preroll_bytes = 0
+        self._hangover_left_ms = 0.0
+        self._since_forward_ms = 0.0
+        self.in_speech = False
+
+        self.frames_in = 0
+        self.frames_forwarded = 0
+        self.keepalive_frames = 0
+        self.bytes_in = 0
+        self.bytes_forwarded = 0
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_in - self.bytes_forwarded
+
+    def stats(self):
+        return {
+            "frames_in": self.frames_in,
+            "frames_forwarded": self.frames_forwarded,
+            "keepalive_frames": self.keepalive_frames,
+            "bytes_in": self.bytes_in,
+            "bytes_forwarded": self.bytes_forwarded,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    def is_speech(self, chunk):
+        """Loud frames are speech; quieter frames count if they are noisy enough to be fricatives."""
+        rms = pcm16_rms(chunk)
+        if rms >= self.energy_threshold:
+            return True
+        return rms >= self.energy_threshold / 2 and pcm16_zero_crossing_rate(chunk) >= self.zcr_threshold
+
+    def process(self, chunk):
+        if len(chunk) == 0:
+            # End-of-speech marker: flush state so the next utterance starts clean
+            self._reset_preroll()
+            self._hangover_left_ms = 0.0
+            self.in_speech = False
+            return self._forward([chunk])
+
+        self.frames_in += 1
+        self.bytes_in += len(chunk)
+        duration_ms = len(chunk) * 1000.0 / self.bytes_per_sec
+
+        if self.is_speech(chunk):
+            out = list(self._preroll) + [chunk]
+            self._reset_preroll()
+            self.in_speech = True
+            self._hangover_left_ms = self.hangover_ms
+            return self._forward(out)
+
+        if self._hangover_left_ms > 0:
+            self._hangover_left_ms -= duration_ms
+            return self._forward([chunk])
+
+        self.in_speech = False
+        self._since_forward_ms += duration_ms
+        if self._since_forward_ms >= self.keepalive_ms:
+            self.keepalive_frames += 1
+            return self._forward([chunk])
+
+        self._preroll.append(chunk)
+        self._preroll_bytes += len(chunk)
+        max_preroll_bytes = self.bytes_per_sec * self.preroll_ms / 1000.0
+        while self._preroll and self._preroll_bytes > max_preroll_bytes:
+            self._preroll_bytes -= len(self._preroll.popleft())
+        return []
+
+    def _forward(self, chunks):
+        for chunk in chunks:
+            if len(chunk):
+                self.frames_forwarded += 1
+                self.bytes_forwarded += len(chunk)
+        self._since_forward_ms = 0.0
+        return chunks
+
+    def _reset_preroll(self):
+        self._preroll.clear()
+        self._preroll_bytes = 0
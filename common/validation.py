@@ -0,0 +1,123 @@
+# Validation of function-call arguments against the JSON schemas in
+# FUNCTION_DEFINITIONS. Schemas are compiled once into plain closures so each
+# call only runs the checks, and every problem is reported with its field path
+# so the agent can tell the user exactly what to correct.
+
+import threading
+import time
+
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+}
+
+
+def _error(path, message):
+    return {"field": path or "(arguments)", "message": message}
+
+
+def compile_schema(schema, path=""):
+    """
+    Compile a (subset of) JSON schema into validate(value) -> list of errors.
+    Supports type, properties, required and items. Required string fields must
+    also be non-blank, since an empty value is never useful to the backend.
+    """
+    type_check = _TYPE_CHECKS.get(schema.get("type"))
+    checks = []
+
+    if schema.get("type") == "object" or "properties" in schema:
+        required = list(schema.get("required", []))
+        properties = {
+            name: (compile_schema(sub, f"{path}.{name}" if path else name), sub.get("type"))
+            for name, sub in schema.get("properties", {}).items()
+        }
+
+        def check_object(value):
+            if not isinstance(value, dict):
+                return []
+            errors = []
+            for name in required:
+                field_path = f"{path}.{name}" if path else name
+                if value.get(name) is None:
+                    errors.append(_error(field_path, "is required"))
+                elif properties.get(name, (None, None))[1] == "string" and isinstance(value[name], str) \
+                        and not value[name].strip():
+                    errors.append(_error(field_path, "must not be empty"))
+            for name, (validate_property, _) in properties.items():
+                if value.get(name) is not None:
+                    errors.extend(validate_property(value[name]))
+            return errors
+        checks.append(check_object)
+
+    if "items" in schema:
+        validate_item = compile_schema(schema["items"], f"{path}[]")
+        checks.append(lambda value: [e for item in value for e in validate_item(item)] if isinstance(value, list) else [])
+
+    def validate(value):
+        if type_check and not type_check(value):
+            # A wrong type makes the remaining checks meaningless
+            return [_error(path, f"must be of type {schema['type']}")]
+        return [error for check in checks for error in check(value)]
+
+    return validate
+
+
+def compile_function_validators(function_definitions):
+    """Validators for each function definition's parameters, keyed by function name."""
+    return {
+        definition["name"]: compile_schema(definition.get("parameters", {"type": "object"}))
+        for definition in function_definitions
+    }
+
+
+class FunctionValidators:
+    """
+    Compiled validators for every function in FUNCTION_DEFINITIONS, plus per-function
+    counts of calls, rejections and time spent validating.
+    """
+
+    def __init__(self, function_definitions):
+        self._validators = compile_function_validators(function_definitions)
+        self._stats = {name: {"calls": 0, "rejected": 0, "total_us": 0.0, "max_us": 0.0}
+                       for name in self._validators}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._validators
+
+    def validate(self, name, arguments):
+        """Errors for a call to name (empty if valid or if name has no schema)."""
+        validator = self._validators.get(name)
+        if validator is None:
+            return []
+        start = time.perf_counter()
+        errors = validator(arguments)
+        elapsed_us = (time.perf_counter() - start) * 1e6
+        with self._lock:
+            stats = self._stats[name]
+            stats["calls"] += 1
+            stats["rejected"] += bool(errors)
+            stats["total_us"] += elapsed_us
+            stats["max_us"] = max(stats["max_us"], elapsed_us)
+        return errors
+
+    def metrics(self):
+        with self._lock:
+            return {
+                name: {
+                    "calls": s["calls"],
+                    "rejected": s["rejected"],
+                    "avg_us": round(s["total_us"] / s["calls"], 1) if s["calls"] else 0.0,
+                    "max_us": round(s["max_us"], 1),
+                }
+                for name, s in self._stats.items()
+            }
+
+
+def format_errors(errors):
+    """One human-readable sentence listing every validation problem."""
+    return "Invalid arguments: " + "; ".join(f"{e['field']} {e['message']}" for e in errors)
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class LagStats:
+    """Recent scheduling-lag samples (ms) for one loop, plus how often it crossed the warning threshold."""
+
+    def __init__(self, window=60):
+        self.samples = deque(maxlen=window)
+        self.tasks = None
+        self.alerts = 0
+        self.last_alert = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, lag_ms, tasks=None):
+        with self._lock:
+            self.samples.append(lag_ms)
+            if tasks is not None:
+                self.tasks = tasks
+
+    def snapshot(self):
+        with self._lock:
+            samples = list(self.samples)
+            tasks = self.tasks
+        return {
+            "lag_ms": round(samples[-1], 1) if samples else None,
+            "max_lag_ms": round(max(samples), 1) if samples else None,
+            "avg_lag_ms": round(sum(samples) / len(samples), 1) if samples else None,
+            "tasks": tasks,
+            "alerts": self.alerts,
+        }
+
+
+class Watchdog:
+    """
+    Measures how late each event loop runs scheduled work.
+
+    tick() is called every interval_seconds by one background task (a greenlet
+    under gevent). How late that task wakes up is the gevent hub lag. For each
+    asyncio loop in loops() (name -> loop), tick() posts a probe callback with
+    call_soon_threadsafe; the delay before it runs is that loop's lag, and the
+    callback also counts the loop's tasks. A probe still pending at the next
+    tick means the loop is blocked, and its age is reported as the lag.
+    Lag above lag_warn_ms is logged, at most once per alert_every_seconds per loop.
+    """
+
+    def __init__(self, loops, thread_counts, interval_seconds=1.0, lag_warn_ms=200, alert_every_seconds=30):
+        self.loops = loops  # callable() -> {name: asyncio loop}
+        self.thread_counts = thread_counts  # callable() -> dict of thread/agent counts
+        self.interval = interval_seconds
+        self.lag_warn_ms = lag_warn_ms
+        self.alert_every = alert_every_seconds
+        self.hub = LagStats()
+        self.loop_stats = {}  # name -> LagStats
+        self._pending = {}  # name -> monotonic time the outstanding probe was posted
+        self._last_tick = None
+
+    def run(self, sleep, should_stop):
+        """Tick forever using sleep (socketio.sleep) until should_stop() is true."""
+        while not should_stop():
+            self._last_tick = time.monotonic()
+            sleep(self.interval)
+            self.hub.record((time.monotonic() - self._last_tick - self.interval) * 1000)
+            self._check("gevent hub", self.hub)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.warning(f"Watchdog tick failed: {e}")
+
+    def tick(self):
+        now = time.monotonic()
+        loops = self.loops()
+        for name in list(self.loop_stats):
+            if name not in loops:
+                del self.loop_stats[name]
+                self._pending.pop(name, None)
+
+        for name, loop in loops.items():
+            stats = self.loop_stats.setdefault(name, LagStats())
+            posted = self._pending.get(name)
+            if posted is not None:
+                # Previous probe hasn't run: the loop is blocked (or very busy)
+                stats.record((now - posted) * 1000)
+                self._check(name, stats)
+                continue
+            if loop.is_closed():
+                continue
+            self._pending[name] = now
+            try:
+                loop.call_soon_threadsafe(self._probe, name, loop, stats, now)
+            except RuntimeError:  # Loop closed in the meantime
+                self._pending.pop(name, None)
+
+    def _probe(self, name, loop, stats, posted):
+        # Runs on the probed loop
+        if self._pending.get(name) == posted:
+            del self._pending[name]
+        stats.record((time.monotonic() - posted) * 1000, tasks=len(asyncio.all_tasks(loop)))
+        self._check(name, stats)
+
+    def _check(self, name, stats):
+        lag_ms = stats.samples[-1] if stats.samples else 0
+        if lag_ms < self.lag_warn_ms:
+            return
+        stats.alerts += 1
+        now = time.monotonic()
+        if now - stats.last_alert >= self.alert_every:
+            stats.last_alert = now
+            logger.warning(f"Event loop lag: {name} ran {lag_ms:.0f} ms late (threshold {self.lag_warn_ms} ms, "
+                           f"{stats.alerts} time(s) so far)")
+
+    def metrics(self):
+        return {
+            "hub": self.hub.snapshot(),
+            "loops": {name: stats.snapshot() for name, stats in list(self.loop_stats.items())},
+            "threads": self.thread_counts(),
+        }
+
+    def max_loop_lag_ms(self):
+        """Worst recent lag over the hub and all agent loops, or None before the first tick."""
+        lags = [stats.snapshot()["max_lag_ms"] for stats in [self.hub, *list(self.loop_stats.values())]]
+        lags = [lag for lag in lags if lag is not None]
+        return max(lags) if lags else None
@@ -6,7 +6,10 @@ echo "🔄 Restarting Flask Agent Function Calling Demo..."
 
 # Stop if running
 if [ -f "/tmp/flask-agent.pid" ]; then
-    echo "⏹️  Stopping existing instance..."
+    # Active calls are allowed to finish first (see DRAIN_TIMEOUT in stop_production.sh).
+    # Behind a load balancer, restart instances one at a time: a draining instance
+    # reports 503 on /readyz so new calls are routed elsewhere.
+    echo "⏹️  Draining and stopping existing instance..."
     ./stop_production.sh
     sleep 2  # Brief pause to ensure clean shutdown
 fi
@@ -43,6 +43,7 @@ if command -v gunicorn &> /dev/null; then
     echo "🐍 Starting with Gunicorn (recommended for production)..."
     echo "   Workers: 1 (single worker for WebSocket compatibility)"
     echo "   Worker Class: GeventWebSocketWorker"
+    echo "   Graceful timeout: 150s (active calls drain on stop)"
     echo ""
 
     # Start with gunicorn
@@ -50,6 +51,7 @@ if command -v gunicorn &> /dev/null; then
         --worker-class geventwebsocket.gunicorn.workers.GeventWebSocketWorker \
         -w 1 \
         -b 0.0.0.0:5000 \
+        --graceful-timeout 150 \
         --access-logfile - \
         --error-logfile - \
         --log-level info \
@@ -15,6 +15,9 @@ document.addEventListener("DOMContentLoaded", () => {
         isAgentProcessing: false,
         isConnecting: false,
         currentSessionId: null,
+        lastAudioSeq: null,
+        lastUnderruns: 0,
+        lastConnected: null,
         availableSessions: []
     };
 
@@ -30,8 +33,22 @@ document.addEventListener("DOMContentLoaded", () => {
         updateSpeakButtonState(session, logMessage);
     }
 
-    // Register the callback with the audio module
+    /**
+     * Forwards playback stats to the server whenever the underrun count changes.
+     * @param {object} stats - { underruns, overflow_samples, buffered_ms, target_ms }
+     */
+    function onPlaybackStats(stats) {
+        if (stats.underruns === session.lastUnderruns || !session.socket || !session.socket.connected) {
+            return;
+        }
+        session.lastUnderruns = stats.underruns;
+        logMessage(`⚠️ Playback underrun (total ${stats.underruns}, jitter target ${stats.target_ms}ms)`, 'warn');
+        session.socket.emit('playback_stats', stats);
+    }
+
+    // Register the callbacks with the audio module
     setOnPlaybackFinished(onPlaybackFinished);
+    setOnPlaybackStats(onPlaybackStats);
 
     // --- Socket.IO Connection ---
     
@@ -66,10 +83,15 @@ document.addEventListener("DOMContentLoaded", () => {
 
             if (resumeSessionId) {
                 startData.session_id = resumeSessionId;
+                startData.resume_token = loadResumeTokens()[resumeSessionId];
                 logMessage(`🔄 Resuming session: ${resumeSessionId}`);
             }
 
-            session.socket.emit('start_voice_agent', startData);
+            // Advertise our transport codecs; the server picks the ones to use
+            getSupportedCodecs().then((codecs) => {
+                startData.codecs = codecs;
+                session.socket.emit('start_voice_agent', startData);
+            });
         });
 
         session.socket.on('disconnect', (reason) => {
@@ -88,8 +110,10 @@ document.addEventListener("DOMContentLoaded", () => {
             }
         });
 
-        session.socket.on('agent_response', (data) => {
-            logMessage(`Agent Response: ${JSON.stringify(data)}`);
+        session.socket.on('agent_response', (raw) => {
+            // The server forwards Deepgram's JSON text as-is; parse it once here
+            const data = typeof raw === 'string' ? JSON.parse(raw) : raw;
+            logMessage(`Agent Response: ${typeof raw === 'string' ? raw : JSON.stringify(raw)}`);
             switch (data.type) {
                 case 'Welcome':
                     logMessage('🎉 Agent connected and ready.');
@@ -103,6 +127,11 @@ document.addEventListener("DOMContentLoaded", () => {
                     break;
                 case 'AgentAudioDone':
                     logMessage('✅ AgentAudioDone received (playback is managed by the audio queue).');
+                    endPlaybackTurn();
+                    break;
+                case 'UserStartedSpeaking':
+                    // Barge-in: stop the agent's voice right away
+                    flushPlayback(logMessage);
                     break;
                 case 'Error':
                     logMessage(`Agent Error: ${data.description}`, 'error');
@@ -113,7 +142,18 @@ document.addEventListener("DOMContentLoaded", () => {
             }
         });
 
-        session.socket.on('agent_audio', (chunk) => {
+        session.socket.on('agent_response_batch', (raw) => {
+            // Chatty events (e.g. History) arrive together as one JSON array
+            const events = typeof raw === 'string' ? JSON.parse(raw) : raw;
+            logMessage(`Agent events (${events.length}): ${events.map((e) => e.type).join(', ')}`);
+        });
+
+        session.socket.on('agent_audio', (packet) => {
+            // Packets are batched server-side: { seq, codec, audio } with ~100ms of audio each
+            if (session.lastAudioSeq !== null && packet.seq !== session.lastAudioSeq + 1) {
+                logMessage(`⚠️ Agent audio packet gap: expected ${session.lastAudioSeq + 1}, got ${packet.seq}`, 'warn');
+            }
+            session.lastAudioSeq = packet.seq;
             if (!session.isAgentSpeaking) {
                 session.isAgentSpeaking = true;
                 session.isAgentProcessing = false;
@@ -122,15 +162,28 @@ document.addEventListener("DOMContentLoaded", () => {
                 updateSpeakButtonState(session, logMessage);
             }
             // The audio module handles the queuing and playback
-            addAudioToQueue(new Uint8Array(chunk), logMessage);
+            playAgentAudioPacket(packet, logMessage);
+        });
+
+        session.socket.on('audio_backpressure', (data) => {
+            setUploadPaused(data.paused, data.headroom_ms, logMessage);
         });
 
         session.socket.on('session_started', (data) => {
             session.currentSessionId = data.session_id;
+            saveResumeToken(data.session_id, data.resume_token);
+            // Mic audio only flows after Welcome, so the codecs are set before the first frame
+            configureTransport(data.transport, logMessage);
+            openAudioChannel(data.audio_token, logMessage);
             logMessage(`📝 Session started: ${data.session_id} (messages: ${data.message_count})`);
         });
 
         session.socket.on('connection_status', (data) => {
+            // Heartbeats only matter if they show a change we missed
+            if (data.event === 'heartbeat' && data.connected === session.lastConnected) {
+                return;
+            }
+            session.lastConnected = data.connected;
             const status = data.connected ? '🟢 Connected' : '🔴 Disconnected';
             logMessage(`📊 ${status} - Session: ${data.session_id || 'None'} (${data.message_count || 0} messages)`);
             if (data.last_error) {
@@ -141,11 +194,41 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // --- Session Management Functions ---
 
+    // Resume tokens for this browser's sessions; the server only lists and resumes sessions we hold a token for
+    const RESUME_TOKENS_KEY = 'voiceAgentResumeTokens';
+
+    function loadResumeTokens() {
+        try {
+            return JSON.parse(localStorage.getItem(RESUME_TOKENS_KEY)) || {};
+        } catch (error) {
+            return {};
+        }
+    }
+
+    function saveResumeToken(sessionId, token) {
+        if (!sessionId || !token) return;
+        const tokens = loadResumeTokens();
+        tokens[sessionId] = token;
+        localStorage.setItem(RESUME_TOKENS_KEY, JSON.stringify(tokens));
+    }
+
     async function loadAvailableSessions() {
         try {
-            const response = await fetch('/sessions');
+            const tokens = loadResumeTokens();
+            const response = await fetch('/sessions', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ sessions: tokens })
+            });
             const data = await response.json();
+            if (!response.ok) {
+                throw new Error(data.error || `HTTP ${response.status}`);
+            }
             session.availableSessions = data.sessions || [];
+            // Forget tokens for sessions the server has cleaned up
+            const known = new Set(session.availableSessions.map((s) => s.session_id));
+            localStorage.setItem(RESUME_TOKENS_KEY, JSON.stringify(
+                Object.fromEntries(Object.entries(tokens).filter(([id]) => known.has(id)))));
             return session.availableSessions;
         } catch (error) {
             logMessage(`Failed to load sessions: ${error}`, 'error');
@@ -217,7 +300,7 @@ document.addEventListener("DOMContentLoaded", () => {
             
             // Send an empty buffer to signal the end of speech
             if (session.socket && session.socket.connected) {
-                session.socket.emit('user_audio', new ArrayBuffer(0));
+                sendEndOfSpeech(session.socket);
                 logMessage("Sent end-of-speech signal.");
             }
         }
@@ -280,7 +363,10 @@ document.addEventListener("DOMContentLoaded", () => {
             isMuted: true, 
             isAgentSpeaking: false, 
             isAgentProcessing: false, 
-            isConnecting: false 
+            isConnecting: false,
+            lastAudioSeq: null,
+            lastUnderruns: 0,
+            lastConnected: null
         };
 
         setStatus('Inactive');
@@ -1,6 +1,93 @@
-// This script provides a WebAssembly-based processor for converting audio streams 
+// This script provides an AudioWorklet processor for converting audio streams 
 // from the browser's default format into the raw PCM format required by Deepgram.
-// It uses a separate worker thread to avoid blocking the main UI thread.
+// It uses a separate worker thread to avoid blocking the main UI thread, resamples
+// with a streaming polyphase filter and posts fixed 20ms frames.
+
+// --- G.711 transport encoding (mirrors common/audio_codec.py) ---
+const SEG_UEND = [0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF];
+const SEG_AEND = [0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF];
+
+function segment(value, table) {
+    for (let i = 0; i < table.length; i++) {
+        if (value <= table[i]) return i;
+    }
+    return table.length;
+}
+
+function linearToUlaw(sample) {
+    let mask = 0xFF;
+    sample >>= 2;
+    if (sample < 0) {
+        sample = -sample;
+        mask = 0x7F;
+    }
+    sample = Math.min(sample, 8159) + (0x84 >> 2);
+    const seg = segment(sample, SEG_UEND);
+    if (seg >= 8) return 0x7F ^ mask;
+    return ((seg << 4) | ((sample >> (seg + 1)) & 0x0F)) ^ mask;
+}
+
+function linearToAlaw(sample) {
+    let mask = 0xD5;
+    sample >>= 3;
+    if (sample < 0) {
+        mask = 0x55;
+        sample = -sample - 1;
+    }
+    const seg = segment(sample, SEG_AEND);
+    if (seg >= 8) return 0x7F ^ mask;
+    const aval = (seg << 4) | ((seg < 2 ? sample >> 1 : sample >> seg) & 0x0F);
+    return aval ^ mask;
+}
+
+/**
+ * Builds a 64K lookup table indexed by the uint16 view of a PCM16 sample.
+ */
+function buildG711EncodeTable(law) {
+    const encode = law === 'mulaw' ? linearToUlaw : linearToAlaw;
+    const table = new Uint8Array(65536);
+    for (let u = 0; u < 65536; u++) {
+        table[u] = encode(u & 0x8000 ? u - 0x10000 : u);
+    }
+    return table;
+}
+
+// --- Streaming polyphase resampler settings ---
+const FRAME_MS = 20; // Fixed frame size posted to the main thread
+const FRAME_HEADER_BYTES = 8; // Left empty for the (seq, timestamp) header the main thread writes
+const FILTER_TAPS = 32; // FIR taps per polyphase branch
+const FILTER_PHASES = 128; // Fractional-delay resolution of the filter bank
+const RING_SIZE = 4096; // Input history (power of two, > FILTER_TAPS + one render quantum)
+
+/**
+ * Builds a windowed-sinc (Blackman) low-pass filter bank with one branch per
+ * fractional phase. The cutoff sits just below the output Nyquist frequency so
+ * downsampling does not alias.
+ * @param {number} cutoff - Cutoff in cycles per input sample (0-0.5).
+ * @returns {Float32Array} FILTER_PHASES x FILTER_TAPS coefficients, row-major.
+ */
+function buildFilterBank(cutoff) {
+    const bank = new Float32Array(FILTER_PHASES * FILTER_TAPS);
+    const half = FILTER_TAPS / 2;
+    for (let p = 0; p < FILTER_PHASES; p++) {
+        const frac = p / FILTER_PHASES;
+        let sum = 0;
+        for (let k = 0; k < FILTER_TAPS; k++) {
+            const d = k - half + 1 - frac; // distance from the output instant, in input samples
+            const x = 2 * cutoff * d;
+            const sinc = x === 0 ? 1 : Math.sin(Math.PI * x) / (Math.PI * x);
+            const w = 0.42 + 0.5 * Math.cos(Math.PI * d / half) + 0.08 * Math.cos(2 * Math.PI * d / half);
+            const h = Math.abs(d) >= half ? 0 : 2 * cutoff * sinc * w;
+            bank[p * FILTER_TAPS + k] = h;
+            sum += h;
+        }
+        // Unity gain at DC for every phase
+        for (let k = 0; k < FILTER_TAPS; k++) {
+            bank[p * FILTER_TAPS + k] /= sum;
+        }
+    }
+    return bank;
+}
 
 class AudioProcessor extends AudioWorkletProcessor {
     constructor() {
@@ -9,6 +96,33 @@ class AudioProcessor extends AudioWorkletProcessor {
         // Actual sample rate of the AudioContext driving this worklet
         this.inputSampleRate = sampleRate; // Provided by AudioWorkletGlobalScope
         this.targetSampleRate = 16000; // Must match server/agent SETTINGS input sample rate
+        // Transport codec negotiated by the server ('pcm16', 'mulaw' or 'alaw')
+        this.codec = 'pcm16';
+        this.encodeTable = null;
+        this.port.onmessage = (event) => {
+            if (event.data && event.data.type === 'config') {
+                this.setCodec(event.data.codec);
+            }
+        };
+
+        // Resampler state, preallocated once and carried across process() calls
+        this.passthrough = this.inputSampleRate === this.targetSampleRate;
+        this.step = this.inputSampleRate / this.targetSampleRate; // input samples per output sample
+        this.ring = new Float32Array(RING_SIZE);
+        this.written = 0; // Total input samples written to the ring
+        this.position = 0; // Fractional input position of the next output sample
+        this.filterBank = this.passthrough
+            ? null
+            : buildFilterBank(0.5 * 0.9 * Math.min(1, this.targetSampleRate / this.inputSampleRate));
+
+        // Output framing: fixed 20ms PCM16 frames
+        this.frame = new Int16Array(Math.round(this.targetSampleRate * FRAME_MS / 1000));
+        this.frameFill = 0;
+    }
+
+    setCodec(codec) {
+        this.codec = codec === 'mulaw' || codec === 'alaw' ? codec : 'pcm16';
+        this.encodeTable = this.codec === 'pcm16' ? null : buildG711EncodeTable(this.codec);
     }
 
     process(inputs, outputs, parameters) {
@@ -23,48 +137,73 @@ class AudioProcessor extends AudioWorkletProcessor {
                 this.sampleCount = 0;
             }
 
-            const pcmData = this.resampleAndConvertToPcm(channelData, this.inputSampleRate, this.targetSampleRate);
-            this.port.postMessage(pcmData, [pcmData]);
+            if (this.passthrough) {
+                for (let i = 0; i < channelData.length; i++) {
+                    this.appendSample(channelData[i]);
+                }
+            } else {
+                this.resample(channelData);
+            }
         }
         return true;
     }
 
-    resampleAndConvertToPcm(channelData, inputRate, targetRate) {
-        if (inputRate === targetRate) {
-            return this.convertToPcm(channelData);
+    /**
+     * Writes input into the history ring and emits every output sample whose
+     * filter window is now complete. The fractional position survives between
+     * calls, so render-quantum boundaries never produce clicks.
+     */
+    resample(channelData) {
+        const mask = RING_SIZE - 1;
+        for (let i = 0; i < channelData.length; i++) {
+            this.ring[(this.written + i) & mask] = channelData[i];
         }
+        this.written += channelData.length;
 
-        const sampleRatio = inputRate / targetRate;
-        const outLength = Math.max(1, Math.round(channelData.length / sampleRatio));
-
-        // First resample to Float32 using linear interpolation
-        const resampled = new Float32Array(outLength);
-        for (let i = 0; i < outLength; i++) {
-            const inPos = i * sampleRatio;
-            const idx = Math.floor(inPos);
-            const frac = inPos - idx;
-            const s1 = channelData[idx] || 0;
-            const s2 = channelData[idx + 1] || s1;
-            resampled[i] = s1 + (s2 - s1) * frac;
+        const half = FILTER_TAPS / 2;
+        while (Math.floor(this.position) + half < this.written) {
+            const base = Math.floor(this.position);
+            const phase = Math.min(FILTER_PHASES - 1, Math.round((this.position - base) * FILTER_PHASES));
+            const offset = phase * FILTER_TAPS;
+            const start = base - half + 1;
+            let acc = 0;
+            for (let k = 0; k < FILTER_TAPS; k++) {
+                acc += this.filterBank[offset + k] * this.ring[(start + k) & mask];
+            }
+            this.appendSample(acc);
+            this.position += this.step;
         }
+    }
 
-        // Then convert to PCM16
-        const output = new Int16Array(resampled.length);
-        for (let i = 0; i < resampled.length; i++) {
-            const s = Math.max(-1, Math.min(1, resampled[i]));
-            output[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+    appendSample(value) {
+        const s = value < -1 ? -1 : value > 1 ? 1 : value;
+        this.frame[this.frameFill++] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+        if (this.frameFill === this.frame.length) {
+            this.postFrame();
+            this.frameFill = 0;
         }
-        return output.buffer;
     }
 
-    convertToPcm(channelData) {
-        const output = new Int16Array(channelData.length);
-        for (let i = 0; i < channelData.length; i++) {
-            const s = Math.max(-1, Math.min(1, channelData[i]));
-            output[i] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+    /**
+     * Posts one complete 20ms frame. The transferable buffer is the only
+     * allocation on the audio thread, once per frame rather than per quantum,
+     * and starts with room for the transport header so it is sent as-is.
+     */
+    postFrame() {
+        let payload;
+        if (this.encodeTable) {
+            const samples = new Uint16Array(this.frame.buffer);
+            payload = new ArrayBuffer(FRAME_HEADER_BYTES + samples.length);
+            const encoded = new Uint8Array(payload, FRAME_HEADER_BYTES);
+            for (let i = 0; i < samples.length; i++) {
+                encoded[i] = this.encodeTable[samples[i]];
+            }
+        } else {
+            payload = new ArrayBuffer(FRAME_HEADER_BYTES + this.frame.byteLength);
+            new Int16Array(payload, FRAME_HEADER_BYTES).set(this.frame);
         }
-        return output.buffer;
+        this.port.postMessage(payload, [payload]);
     }
 }
 
-registerProcessor('audio-processor', AudioProcessor); 
\ No newline at end of file
+registerProcessor('audio-processor', AudioProcessor);
@@ -4,10 +4,136 @@
 let audioContext = null;
 let audioWorkletNode = null;
 let microphoneStream = null;
-let audioQueue = [];
-let isAudioPlaying = false;
+let playbackContext = null; // Separate 24kHz context so agent audio is never resampled
+let playbackNode = null; // 'playback-processor' worklet holding the jitter buffer
 let onPlaybackFinishedCallback = null;
-let nextPlayTime = 0; // Time tracker for scheduling audio chunks
+let onPlaybackStatsCallback = null;
+let isUploadPaused = false; // Set by server backpressure ('audio_backpressure' event)
+let pausedUploadFrames = []; // Mic frames held back while uploads are paused
+const MAX_PAUSED_UPLOAD_FRAMES = 100; // ~2s of 20ms worklet frames
+const MIC_FRAME_MS = 20; // Duration of each worklet frame
+const HELD_FRAMES_PER_TICK = 1; // Held frames sent alongside each live frame after a resume
+const AGENT_SAMPLE_RATE = 24000; // Deepgram Aura TTS output rate
+let agentCodec = 'pcm16'; // Negotiated with the server in 'session_started'
+let opusDecoder = null;
+let opusTimestamp = 0; // Microseconds, required by EncodedAudioChunk
+const opusTurnStarts = new Set(); // Timestamps of Opus frames that open an agent turn
+const FRAME_HEADER_BYTES = 8; // Mic frame header: uint32 seq, uint32 timestamp ms (big-endian)
+let micSeq = 0; // Sequence number of the next mic frame, restarted with each pipeline
+let audioChannel = null; // Raw '/audio-ws' WebSocket; Socket.IO 'user_audio' is the fallback
+
+// --- Transport Codecs ---
+
+/**
+ * Builds the 256-entry G.711 decode table (mu-law or A-law byte -> PCM16 sample).
+ * @param {string} law - 'mulaw' or 'alaw'.
+ * @returns {Int16Array}
+ */
+function buildG711DecodeTable(law) {
+    const table = new Int16Array(256);
+    for (let i = 0; i < 256; i++) {
+        if (law === 'mulaw') {
+            const u = ~i & 0xFF;
+            const t = (((u & 0x0F) << 3) + 0x84) << ((u & 0x70) >> 4);
+            table[i] = (u & 0x80) ? (0x84 - t) : (t - 0x84);
+        } else {
+            const a = i ^ 0x55;
+            let t = (a & 0x0F) << 4;
+            const seg = (a & 0x70) >> 4;
+            if (seg === 0) t += 8;
+            else if (seg === 1) t += 0x108;
+            else t = (t + 0x108) << (seg - 1);
+            table[i] = (a & 0x80) ? t : -t;
+        }
+    }
+    return table;
+}
+
+const G711_DECODE_TABLES = {
+    mulaw: buildG711DecodeTable('mulaw'),
+    alaw: buildG711DecodeTable('alaw')
+};
+
+/**
+ * Lists the transport codecs this browser can handle, in no particular order.
+ * The server picks from these according to its own preference.
+ * @returns {Promise<string[]>}
+ */
+async function getSupportedCodecs() {
+    const codecs = ['mulaw', 'alaw', 'pcm16'];
+    if (typeof AudioDecoder !== 'undefined') {
+        try {
+            const { supported } = await AudioDecoder.isConfigSupported({
+                codec: 'opus', sampleRate: AGENT_SAMPLE_RATE, numberOfChannels: 1
+            });
+            if (supported) codecs.push('opus');
+        } catch (error) {
+            // WebCodecs present but Opus unsupported; stay with G.711/PCM
+        }
+    }
+    return codecs;
+}
+
+/**
+ * Applies the codecs negotiated by the server for this session.
+ * @param {{agent_codec: string, mic_codec: string}} transport - From 'session_started'.
+ * @param {Function} logMessage - The logging function.
+ */
+function configureTransport(transport, logMessage) {
+    agentCodec = (transport && transport.agent_codec) || 'pcm16';
+    const micCodec = (transport && transport.mic_codec) || 'pcm16';
+    if (audioWorkletNode) {
+        audioWorkletNode.port.postMessage({ type: 'config', codec: micCodec });
+    }
+    if (agentCodec === 'opus' && !opusDecoder) {
+        opusDecoder = new AudioDecoder({
+            output: (audioData) => {
+                const pcm = new Float32Array(audioData.numberOfFrames);
+                audioData.copyTo(pcm, { planeIndex: 0, format: 'f32-planar' });
+                const turnStart = opusTurnStarts.delete(audioData.timestamp);
+                audioData.close();
+                queuePlaybackAudio('f32', pcm.buffer, logMessage, turnStart);
+            },
+            error: (error) => logMessage(`Opus decode error: ${error}`, 'error')
+        });
+        opusDecoder.configure({ codec: 'opus', sampleRate: AGENT_SAMPLE_RATE, numberOfChannels: 1 });
+    }
+    logMessage(`🎚️ Audio transport: agent=${agentCodec}, mic=${micCodec}`);
+}
+
+/**
+ * Decodes one agent audio packet from the server and queues it for playback.
+ * @param {{seq: number, codec: string, audio: ArrayBuffer|ArrayBuffer[], turn_start?: boolean}} packet - The packet.
+ * @param {Function} logMessage - The logging function.
+ */
+function playAgentAudioPacket(packet, logMessage) {
+    const codec = packet.codec || agentCodec;
+    if (codec === 'opus') {
+        if (!opusDecoder) {
+            logMessage('Received Opus audio before the decoder was configured.', 'warn');
+            return;
+        }
+        if (packet.turn_start) {
+            opusTurnStarts.add(opusTimestamp);
+        }
+        packet.audio.forEach(frame => {
+            opusDecoder.decode(new EncodedAudioChunk({ type: 'key', timestamp: opusTimestamp, data: frame }));
+            opusTimestamp += 20000; // 20ms frames
+        });
+        return;
+    }
+    if (codec === 'mulaw' || codec === 'alaw') {
+        const table = G711_DECODE_TABLES[codec];
+        const encoded = new Uint8Array(packet.audio);
+        const samples = new Int16Array(encoded.length);
+        for (let i = 0; i < encoded.length; i++) {
+            samples[i] = table[encoded[i]];
+        }
+        queuePlaybackAudio('pcm16', samples.buffer, logMessage, packet.turn_start);
+        return;
+    }
+    queuePlaybackAudio('pcm16', packet.audio, logMessage, packet.turn_start);
+}
 
 /**
  * Sets the callback function to be invoked when the audio playback queue is empty.
@@ -18,91 +144,194 @@ function setOnPlaybackFinished(callback) {
 }
 
 /**
- * Processes the audio queue, playing the next available audio buffer with precise scheduling.
+ * Sets the callback that receives periodic playback stats (underruns, buffer depth).
+ * @param {Function} callback - Called with the stats object from the playback worklet.
+ */
+function setOnPlaybackStats(callback) {
+    onPlaybackStatsCallback = callback;
+}
+
+/**
+ * Hands decoded agent audio to the playback worklet. The buffer is transferred,
+ * not copied, so it must not be used by the caller afterwards.
+ * @param {string} kind - 'pcm16' (Int16 samples) or 'f32' (Float32 samples).
+ * @param {ArrayBuffer} buffer - The samples at 24kHz.
  * @param {Function} logMessage - The logging function from the main app.
+ * @param {boolean} [turnStart] - True for the first audio of an agent turn.
  */
-function playFromQueue(logMessage) {
-    if (audioQueue.length === 0) {
-        isAudioPlaying = false;
-        if (onPlaybackFinishedCallback) {
-            // Add a small delay to ensure the last chunk has finished
-            setTimeout(() => {
-                if (audioQueue.length === 0) { // Double-check queue is still empty
-                    logMessage('🏁 Audio playback queue finished.');
-                    onPlaybackFinishedCallback();
-                }
-            }, 200); // 200ms delay
-        }
+function queuePlaybackAudio(kind, buffer, logMessage, turnStart = false) {
+    if (!playbackNode) {
+        logMessage('Playback engine not ready, cannot queue audio.', 'warn');
         return;
     }
+    if (playbackContext.state === 'suspended') {
+        playbackContext.resume();
+    }
+    playbackNode.port.postMessage({ type: kind, buffer, turnStart }, [buffer]);
+}
 
-    isAudioPlaying = true;
-    const audioData = audioQueue.shift();
+/**
+ * Tells the playback engine the agent finished this turn, so a short tail plays
+ * without waiting for the jitter target.
+ */
+function endPlaybackTurn() {
+    if (!playbackNode) {
+        return;
+    }
+    if (agentCodec === 'opus' && opusDecoder) {
+        // Decoding is asynchronous: let the turn's last frames reach the worklet first
+        opusDecoder.flush().catch(() => {}).then(() => playbackNode.port.postMessage({ type: 'end' }));
+        return;
+    }
+    playbackNode.port.postMessage({ type: 'end' });
+}
 
-    try {
-        if (!audioContext || audioContext.state === 'closed') {
-            logMessage('Audio context is not available for playback.', 'error');
-            isAudioPlaying = false; 
-            return;
+/**
+ * Drops all buffered agent audio immediately (barge-in).
+ * @param {Function} logMessage - The logging function from the main app.
+ */
+function flushPlayback(logMessage) {
+    if (playbackNode) {
+        playbackNode.port.postMessage({ type: 'flush' });
+        logMessage('⏹️ Agent playback flushed.');
+    }
+}
+
+/**
+ * Creates the 24kHz playback context and jitter-buffer worklet.
+ * @param {Function} logMessage - The logging function.
+ */
+async function startPlayback(logMessage) {
+    playbackContext = new (window.AudioContext || window.webkitAudioContext)({ sampleRate: AGENT_SAMPLE_RATE });
+    if (playbackContext.state === 'suspended') {
+        await playbackContext.resume();
+    }
+    await playbackContext.audioWorklet.addModule('/playback-processor.js');
+    playbackNode = new AudioWorkletNode(playbackContext, 'playback-processor', { outputChannelCount: [1] });
+    playbackNode.connect(playbackContext.destination);
+    playbackNode.port.onmessage = (event) => {
+        const message = event.data;
+        if (message.type === 'drained') {
+            logMessage('🏁 Audio playback queue finished.');
+            if (onPlaybackFinishedCallback) {
+                onPlaybackFinishedCallback();
+            }
+        } else if (message.type === 'stats' && onPlaybackStatsCallback) {
+            onPlaybackStatsCallback(message);
         }
+    };
+}
 
-        // Decode the raw PCM data into an AudioBuffer
-        const numSamples = audioData.length / 2; // 2 bytes per sample (16-bit)
-        const audioBuffer = audioContext.createBuffer(1, numSamples, 24000); // Agent audio is 24kHz
-        const channelData = audioBuffer.getChannelData(0);
-        const pcmData = new Int16Array(audioData.buffer);
+// --- Mic Transport ---
 
-        for (let i = 0; i < numSamples; i++) {
-            channelData[i] = pcmData[i] / 32768.0; // Convert to Float32 range [-1, 1]
-        }
-        
-        const source = audioContext.createBufferSource();
-        source.buffer = audioBuffer;
-        source.connect(audioContext.destination);
-
-        // --- Precise Scheduling ---
-        const now = audioContext.currentTime;
-        if (now > nextPlayTime) {
-            nextPlayTime = now;
+/**
+ * Opens the raw audio WebSocket for this session. Until it is open, or if the
+ * server can't upgrade it, frames go over Socket.IO instead.
+ * @param {string} token - 'audio_token' from 'session_started'.
+ * @param {Function} logMessage - The logging function.
+ */
+function openAudioChannel(token, logMessage) {
+    closeAudioChannel();
+    if (!token || !window.WebSocket) {
+        return;
+    }
+    const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const channel = new WebSocket(`${scheme}://${window.location.host}/audio-ws?token=${encodeURIComponent(token)}`);
+    channel.binaryType = 'arraybuffer';
+    channel.onopen = () => logMessage('🎙️ Mic audio using raw WebSocket transport.');
+    channel.onclose = () => {
+        if (audioChannel === channel) {
+            audioChannel = null;
+            logMessage('Mic audio using Socket.IO transport.');
         }
+    };
+    audioChannel = channel;
+}
 
-        source.start(nextPlayTime);
-        // Schedule the next chunk to start right after this one ends
-        nextPlayTime += audioBuffer.duration;
-        
-        source.onended = () => {
-            playFromQueue(logMessage);
-        };
+function closeAudioChannel() {
+    if (audioChannel) {
+        const channel = audioChannel;
+        audioChannel = null;
+        channel.close();
+    }
+}
 
-    } catch (error) {
-        logMessage(`Error playing raw PCM: ${error}`, 'error');
-        console.error('Raw PCM playback error:', error);
-        // Try to continue with the next item even if one fails
-        playFromQueue(logMessage); 
+/**
+ * Writes the header into a frame's reserved first bytes and sends it,
+ * preferring the raw WebSocket. The buffer is sent as-is, without copying.
+ * @param {Object} socket - The current Socket.IO client instance.
+ * @param {ArrayBuffer} frame - FRAME_HEADER_BYTES of headroom followed by encoded audio.
+ */
+function sendMicFrame(socket, frame) {
+    const header = new DataView(frame, 0, FRAME_HEADER_BYTES);
+    header.setUint32(0, micSeq);
+    header.setUint32(4, Math.floor(performance.now()) >>> 0);
+    micSeq = (micSeq + 1) >>> 0;
+    if (audioChannel && audioChannel.readyState === WebSocket.OPEN) {
+        audioChannel.send(frame);
+    } else if (socket && socket.connected) {
+        socket.emit('user_audio', frame);
     }
 }
 
+/**
+ * Sends the end-of-speech signal: a frame with a header and no audio.
+ * Speech still held from a pause goes first so the signal doesn't overtake it.
+ * @param {Object} socket - The current Socket.IO client instance.
+ */
+function sendEndOfSpeech(socket) {
+    if (!isUploadPaused) {
+        pausedUploadFrames.forEach(buf => sendMicFrame(socket, buf));
+        pausedUploadFrames = [];
+    }
+    sendMicFrame(socket, new ArrayBuffer(FRAME_HEADER_BYTES));
+}
 
 /**
- * Adds a new audio chunk to the playback queue.
- * @param {Uint8Array} audioData - The raw PCM audio data chunk.
- * @param {Function} logMessage - The logging function from the main app.
+ * Pauses or resumes mic uploads in response to server-side backpressure.
+ * While paused, frames are held locally (bounded). On resume the oldest are
+ * dropped to fit the server's headroom, and the rest go out a frame at a time
+ * alongside live audio (see sendLiveFrame) rather than in one burst.
+ * @param {boolean} paused - Whether the server asked us to pause.
+ * @param {?number} headroomMs - Audio the server can take before pausing again.
+ * @param {Function} logMessage - The logging function.
  */
-function addAudioToQueue(audioData, logMessage) {
-    if (!audioContext) {
-        logMessage('Audio context not ready, cannot queue audio.', 'warn');
+function setUploadPaused(paused, headroomMs, logMessage) {
+    isUploadPaused = paused;
+    if (paused) {
+        logMessage('⏸️ Server audio buffer full, pausing mic uploads.', 'warn');
         return;
     }
-    if (audioContext.state === 'suspended') {
-        audioContext.resume();
+    if (typeof headroomMs === 'number') {
+        const keep = Math.max(0, Math.floor(headroomMs / MIC_FRAME_MS));
+        if (pausedUploadFrames.length > keep) {
+            pausedUploadFrames = pausedUploadFrames.slice(pausedUploadFrames.length - keep);
+        }
     }
+    logMessage(`▶️ Resuming mic uploads (${pausedUploadFrames.length} held frames).`);
+}
 
-    audioQueue.push(audioData);
-
-    if (!isAudioPlaying) {
-        // Reset scheduling time and start the playback loop
-        nextPlayTime = audioContext.currentTime;
-        playFromQueue(logMessage);
+/**
+ * Sends a live mic frame, or holds it while uploads are paused. Frames held
+ * from a pause go first, HELD_FRAMES_PER_TICK extra per live frame, so the
+ * backlog drains at a bounded rate and frames stay in order.
+ * @param {Object} socket - The current Socket.IO client instance.
+ * @param {ArrayBuffer} buf - The worklet frame.
+ */
+function sendLiveFrame(socket, buf) {
+    if (!isUploadPaused && pausedUploadFrames.length === 0) {
+        sendMicFrame(socket, buf);
+        return;
+    }
+    if (pausedUploadFrames.length >= MAX_PAUSED_UPLOAD_FRAMES) {
+        pausedUploadFrames.shift();
+    }
+    pausedUploadFrames.push(buf);
+    if (isUploadPaused) {
+        return;
+    }
+    for (let i = 0; i <= HELD_FRAMES_PER_TICK && pausedUploadFrames.length; i++) {
+        sendMicFrame(socket, pausedUploadFrames.shift());
     }
 }
 
@@ -128,6 +357,8 @@ async function startAudio(getSocket, logMessage, getIsMuted, getIsAgentSpeaking)
             await audioContext.resume();
         }
 
+        await startPlayback(logMessage);
+
         await audioContext.audioWorklet.addModule('/audio-processor.js');
         audioWorkletNode = new AudioWorkletNode(audioContext, 'audio-processor');
 
@@ -142,7 +373,7 @@ async function startAudio(getSocket, logMessage, getIsMuted, getIsAgentSpeaking)
             // Send audio only when not muted and the agent isn't speaking
             if (socket && socket.connected && !getIsMuted() && !getIsAgentSpeaking()) {
                 const buf = event.data instanceof ArrayBuffer ? event.data : event.data.buffer;
-                socket.emit('user_audio', buf);
+                sendLiveFrame(socket, buf);
             }
         };
 
@@ -162,6 +393,11 @@ async function startAudio(getSocket, logMessage, getIsMuted, getIsAgentSpeaking)
             audioContext.close();
             audioContext = null;
         }
+        if (playbackContext) {
+            playbackContext.close();
+            playbackContext = null;
+            playbackNode = null;
+        }
         return false;
     }
 }
@@ -187,11 +423,26 @@ function stopAudio(logMessage) {
     } else {
         audioContext = null;
     }
+    if (playbackNode) {
+        playbackNode.disconnect();
+        playbackNode = null;
+    }
+    if (playbackContext && playbackContext.state !== 'closed') {
+        playbackContext.close();
+    }
+    playbackContext = null;
     
     // Clear any pending audio and reset state
-    audioQueue = [];
-    isAudioPlaying = false;
-    nextPlayTime = 0;
+    closeAudioChannel();
+    micSeq = 0;
+    isUploadPaused = false;
+    pausedUploadFrames = [];
+    if (opusDecoder && opusDecoder.state !== 'closed') {
+        opusDecoder.close();
+    }
+    opusDecoder = null;
+    opusTimestamp = 0;
+    agentCodec = 'pcm16';
     onPlaybackFinishedCallback = null;
     logMessage('Audio pipeline stopped.');
 }
@@ -207,6 +458,8 @@ window.checkAudio = function(logMessage) {
     logMessage(`  - audioContext: ${audioContext ? 'EXISTS' : 'NULL'}`);
     logMessage(`  - audioContext.state: ${audioContext?.state}`);
     logMessage(`  - audioWorkletNode: ${audioWorkletNode ? 'EXISTS' : 'NULL'}`);
+    logMessage(`  - playbackContext.state: ${playbackContext?.state}`);
+    logMessage(`  - playbackNode: ${playbackNode ? 'EXISTS' : 'NULL'}`);
     logMessage(`  - microphoneStream: ${microphoneStream ? 'EXISTS' : 'NULL'}`);
     logMessage(`  - microphoneStream.active: ${microphoneStream?.active}`);
     if (microphoneStream) {
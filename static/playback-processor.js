@@ -0,0 +1,157 @@
+// This script provides the AudioWorklet processor that plays the agent's voice.
+// PCM arrives from the main thread as transferable buffers and is written into a
+// preallocated ring buffer. Playback starts once an adaptive jitter target is
+// buffered, so late packets stretch the buffer instead of causing gaps, and a
+// 'flush' message silences the output immediately for barge-in. Audio flagged
+// turnStart opens a new agent turn; anything else after 'end' is that turn's tail.
+
+const RING_SECONDS = 30; // Capacity of the playback ring buffer
+const MIN_TARGET_MS = 60; // Jitter target bounds
+const MAX_TARGET_MS = 500;
+const INITIAL_TARGET_MS = 100;
+const TARGET_DECAY_MS = 10; // Shrink the target by this much...
+const STABLE_SECONDS = 5; // ...after this long without an underrun
+const IDLE_START_MS = 150; // Start playing a short tail if no more audio arrives
+const DRAIN_IDLE_MS = 500; // Treat an empty buffer as end-of-speech after this long
+const STATS_INTERVAL_SECONDS = 1;
+
+class PlaybackProcessor extends AudioWorkletProcessor {
+    constructor() {
+        super();
+        this.ring = new Float32Array(Math.round(sampleRate * RING_SECONDS));
+        this.readIndex = 0;
+        this.writeIndex = 0;
+        this.buffered = 0; // Samples currently in the ring
+        this.playing = false;
+        this.turnEnded = false; // Server said the agent finished speaking
+        this.hasAudio = false; // Anything played or queued since the last drain
+        this.targetSamples = this.msToSamples(INITIAL_TARGET_MS);
+        this.underruns = 0;
+        this.overflowSamples = 0;
+        this.lastPushFrame = 0; // currentFrame when audio last arrived
+        this.lastAdaptFrame = 0; // currentFrame of the last jitter target change
+        this.lastStatsFrame = 0;
+        this.port.onmessage = (event) => this.handleMessage(event.data);
+    }
+
+    msToSamples(ms) {
+        return Math.round(sampleRate * ms / 1000);
+    }
+
+    handleMessage(message) {
+        if (message.turnStart) {
+            this.turnEnded = false; // Only a new turn clears 'end'; a late tail must not
+        }
+        switch (message.type) {
+            case 'pcm16':
+                this.pushPcm16(new Int16Array(message.buffer));
+                break;
+            case 'f32':
+                this.pushFloat(new Float32Array(message.buffer));
+                break;
+            case 'end':
+                this.turnEnded = true;
+                break;
+            case 'flush':
+                this.readIndex = this.writeIndex = this.buffered = 0;
+                this.playing = false;
+                this.turnEnded = false;
+                this.hasAudio = false;
+                break;
+        }
+    }
+
+    pushPcm16(samples) {
+        const capacity = this.ring.length;
+        for (let i = 0; i < samples.length; i++) {
+            if (this.buffered === capacity) {
+                this.overflowSamples += samples.length - i;
+                break;
+            }
+            this.ring[this.writeIndex] = samples[i] / 32768;
+            this.writeIndex = (this.writeIndex + 1) % capacity;
+            this.buffered++;
+        }
+        this.onPush();
+    }
+
+    pushFloat(samples) {
+        const capacity = this.ring.length;
+        for (let i = 0; i < samples.length; i++) {
+            if (this.buffered === capacity) {
+                this.overflowSamples += samples.length - i;
+                break;
+            }
+            this.ring[this.writeIndex] = samples[i];
+            this.writeIndex = (this.writeIndex + 1) % capacity;
+            this.buffered++;
+        }
+        this.onPush();
+    }
+
+    onPush() {
+        this.hasAudio = true;
+        this.lastPushFrame = currentFrame;
+    }
+
+    process(inputs, outputs) {
+        const output = outputs[0][0];
+        const idleSamples = currentFrame - this.lastPushFrame;
+
+        if (!this.playing && this.buffered > 0) {
+            // Wait for the jitter target unless the turn is over or the stream went quiet
+            if (this.buffered >= this.targetSamples || this.turnEnded
+                || idleSamples >= this.msToSamples(IDLE_START_MS)) {
+                this.playing = true;
+            }
+        }
+
+        let i = 0;
+        if (this.playing) {
+            const capacity = this.ring.length;
+            for (; i < output.length && this.buffered > 0; i++) {
+                output[i] = this.ring[this.readIndex];
+                this.readIndex = (this.readIndex + 1) % capacity;
+                this.buffered--;
+            }
+            if (this.buffered === 0) {
+                this.playing = false;
+                if (!this.turnEnded) {
+                    // Ran dry mid-turn: count it and buffer more before resuming
+                    this.underruns++;
+                    this.lastAdaptFrame = currentFrame;
+                    this.targetSamples = Math.min(this.msToSamples(MAX_TARGET_MS), Math.round(this.targetSamples * 1.5));
+                }
+            }
+        }
+        output.fill(0, i);
+
+        // Slowly shrink the jitter target while playback is stable
+        if (currentFrame - this.lastAdaptFrame >= sampleRate * STABLE_SECONDS) {
+            this.targetSamples = Math.max(this.msToSamples(MIN_TARGET_MS), this.targetSamples - this.msToSamples(TARGET_DECAY_MS));
+            this.lastAdaptFrame = currentFrame;
+        }
+
+        // Report end of speech once the buffer is empty and nothing more is coming
+        if (this.hasAudio && this.buffered === 0
+            && (this.turnEnded || idleSamples >= this.msToSamples(DRAIN_IDLE_MS))) {
+            this.hasAudio = false;
+            this.turnEnded = false;
+            this.port.postMessage({ type: 'drained' });
+        }
+
+        if (currentFrame - this.lastStatsFrame >= sampleRate * STATS_INTERVAL_SECONDS) {
+            this.lastStatsFrame = currentFrame;
+            this.port.postMessage({
+                type: 'stats',
+                underruns: this.underruns,
+                overflow_samples: this.overflowSamples,
+                buffered_ms: Math.round(this.buffered * 1000 / sampleRate),
+                target_ms: Math.round(this.targetSamples * 1000 / sampleRate)
+            });
+        }
+        return true;
+    }
+}
+
+registerProcessor('playback-processor', PlaybackProcessor);
@@ -3,22 +3,29 @@
 # Stop production Flask Agent Function Calling Demo
 
 PID_FILE="/tmp/flask-agent.pid"
+PORT=5000
+# SIGTERM starts a drain: new calls are refused and active ones may finish.
+# Keep this above DRAIN["deadline_seconds"] + DRAIN["quote_flush_seconds"] in common/config.py.
+DRAIN_TIMEOUT=${DRAIN_TIMEOUT:-150}
 
 if [ -f "$PID_FILE" ]; then
     PID=$(cat "$PID_FILE")
     echo "🛑 Stopping Flask Agent (PID: $PID)..."
 
-    # Try graceful shutdown first
+    # Try graceful shutdown first (drains active calls)
     kill -TERM "$PID" 2>/dev/null
 
-    # Wait for up to 10 seconds for graceful shutdown
-    for i in {1..10}; do
+    # Wait for active calls to finish, up to DRAIN_TIMEOUT seconds
+    for ((i = 1; i <= DRAIN_TIMEOUT; i++)); do
         if ! kill -0 "$PID" 2>/dev/null; then
             echo "✅ Application stopped gracefully"
             rm -f "$PID_FILE"
             exit 0
         fi
-        echo "⏳ Waiting for graceful shutdown... ($i/10)"
+        if (( i % 5 == 1 )); then
+            CALLS=$(curl -s "http://localhost:$PORT/readyz" 2>/dev/null | python3 -c "import sys, json; print(json.load(sys.stdin)['active_calls'])" 2>/dev/null)
+            echo "⏳ Draining... ${CALLS:-?} active call(s) ($i/$DRAIN_TIMEOUT)"
+        fi
         sleep 1
     done
 
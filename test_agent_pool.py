@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for the warm Deepgram connection pool, against a local WebSocket server.
+"""
+
+import sys
+import os
+import time
+
+import websockets
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.agent_pool import AgentConnectionPool
+
+
+def start_server(pool):
+    """Runs a WebSocket server on the pool's loop that greets like the agent API."""
+    connections = []
+
+    async def handler(ws):
+        connections.append(ws.request_headers.get("Authorization"))
+        await ws.send('{"type": "Welcome"}')
+        await ws.wait_closed()
+
+    async def serve():
+        return await websockets.serve(handler, "127.0.0.1", 0)
+
+    server = pool.run(serve()).result(5)
+    port = server.sockets[0].getsockname()[1]
+    return server, f"ws://127.0.0.1:{port}", connections
+
+
+def stop_server(pool, server):
+    async def close():
+        server.close()
+        await server.wait_closed()
+
+    pool.run(close()).result(5)
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+def test_claim_uses_warm_socket():
+    """A claimed socket is already open and still has the greeting queued."""
+    print("\n=== Testing warm socket claim ===")
+    pool = AgentConnectionPool(None, lambda: "test-key", min_idle=0, max_idle=2, health_check_interval=0.1)
+    pool.start()
+    server, url, connections = start_server(pool)
+    pool.url = url
+    pool.min_idle = 1
+    try:
+        assert wait_for(lambda: pool.stats()["idle"] == 1)
+        ws = pool.run(pool.claim()).result(5)
+        assert ws is not None and ws.open
+        assert pool.run(ws.recv()).result(5) == '{"type": "Welcome"}'
+        assert connections[0] == "Token test-key"
+
+        # The pool refills behind the claim
+        assert wait_for(lambda: pool.stats()["idle"] == 1)
+        stats = pool.stats()
+        assert stats["hits"] == 1 and stats["opened"] == 2
+        pool.run(ws.close()).result(5)
+    finally:
+        stop_server(pool, server)
+        pool.stop()
+    print(f"✅ Pool stats: {stats}")
+
+
+def test_expired_sockets_are_recycled():
+    """Sockets past max_age are closed instead of being handed out."""
+    print("\n=== Testing socket recycling ===")
+    pool = AgentConnectionPool(None, lambda: "test-key", min_idle=0, max_idle=1,
+                               max_age_seconds=0.2, health_check_interval=0.05)
+    pool.start()
+    server, url, connections = start_server(pool)
+    pool.url = url
+    try:
+        # A claim with nothing idle is a miss, but it raises the target to one socket
+        assert pool.run(pool.claim()).result(5) is None
+        # The expired socket is discarded before its replacement opens, so wait for both
+        assert wait_for(lambda: pool.stats()["recycled"] >= 1 and pool.stats()["opened"] >= 2)
+    finally:
+        stop_server(pool, server)
+        pool.stop()
+    print(f"✅ Recycled {pool.recycled} expired socket(s)")
+
+
+def test_target_follows_call_rate():
+    """The pool grows with recent claims and stays within its bounds."""
+    print("\n=== Testing pool sizing ===")
+    pool = AgentConnectionPool(None, lambda: None, min_idle=0, max_idle=3,
+                               rate_window_seconds=60, max_age_seconds=60)
+    assert pool.target_size() == 0
+    pool._claim_times.extend([time.monotonic()] * 2)
+    assert pool.target_size() == 2
+    pool._claim_times.extend([time.monotonic()] * 10)
+    assert pool.target_size() == 3
+    print("✅ Target size tracks call rate")
+
+
+def main():
+    """Run all connection pool tests."""
+    print("Agent Connection Pool Test")
+    print("=" * 50)
+
+    test_claim_uses_warm_socket()
+    test_expired_sockets_are_recycled()
+    test_target_follows_call_rate()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
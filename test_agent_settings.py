@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Test script for Deepgram agent messages: building Settings, filtering events and pushing connection status to the browser (no network needed).
+"""
+
+import asyncio
+import json
+import sys
+import os
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.agent_templates import AgentTemplates, SETTINGS, PROMPT_TEMPLATE
+from common.conversation_log import ConversationLog
+from common.config import AGENT_EVENTS
+from common.event_filter import EventFilter
+from common.status_notifier import ConnectionStatusNotifier
+from common.session_auth import hash_token, is_valid_session_id, new_resume_token, new_session_id, verify_resume_token
+
+
+def test_sessions_do_not_share_settings():
+    """Two sessions with different voices each get their own settings; SETTINGS is untouched."""
+    print("\n=== Testing per-session settings ===")
+    base = json.dumps(SETTINGS)
+    cora = AgentTemplates(voiceModel="aura-2-cora-en")
+    thalia = AgentTemplates(voiceModel="aura-2-thalia-en")
+
+    assert cora.settings["agent"]["speak"]["provider"]["model"] == "aura-2-cora-en"
+    assert thalia.settings["agent"]["speak"]["provider"]["model"] == "aura-2-thalia-en"
+    assert json.dumps(SETTINGS) == base
+    assert SETTINGS["agent"]["think"]["prompt"] == PROMPT_TEMPLATE
+    assert cora.current_date in cora.settings["agent"]["think"]["prompt"]
+    print("✅ Voice models are isolated per session")
+
+
+def test_settings_json_is_cached():
+    """Sessions with the same (voice, industry, date) reuse one serialized message."""
+    print("\n=== Testing settings cache ===")
+    first = AgentTemplates(voiceModel="aura-2-cora-en")
+    second = AgentTemplates(voiceModel="aura-2-cora-en")
+    if first.current_date != second.current_date:
+        print("⚠️ Date rolled over between sessions, skipping")
+        return
+    assert first.settings_json is second.settings_json
+
+    # Callers get a copy they can modify without affecting other sessions
+    copy = first.settings
+    copy["agent"]["greeting"] = "changed"
+    assert second.settings["agent"]["greeting"] != "changed"
+    print("✅ Settings JSON is shared and copies are private")
+
+
+def test_conversation_log_is_bounded():
+    """The log keeps the newest entries within its message and character limits."""
+    print("\n=== Testing conversation log bounds ===")
+    log = ConversationLog(max_messages=3, max_chars=50, max_entry_chars=20)
+    log.add_text("user", "The customer is Acme Corp")
+    assert log.messages()[0]["content"] == "The customer is Acme…"
+    for i in range(5):
+        log.add_text("assistant", f"reply {i}")
+    assert len(log) == 3
+    assert [m["content"] for m in log.messages()] == ["reply 2", "reply 3", "reply 4"]
+
+    log.add_function_call("call_1", "get_customer", '{"name": "Acme"}', '{"success": true}')
+    assert log.messages()[-1]["function_calls"][0]["name"] == "get_customer"
+    assert sum(len(m.get("content", "")) for m in log.messages()) <= 50
+
+    restored = ConversationLog(max_messages=3, max_chars=50, max_entry_chars=20)
+    restored.load_state(json.loads(json.dumps(log.to_state())))
+    assert restored.messages() == log.messages()
+    print(f"✅ Kept {len(log)} entries")
+
+
+def test_resume_settings_include_context():
+    """Resumed sessions send the history and skip the greeting."""
+    print("\n=== Testing resume settings ===")
+    templates = AgentTemplates(voiceModel="aura-2-cora-en")
+    assert templates.settings_json_with_context([]) is templates.settings_json
+
+    log = ConversationLog()
+    log.add_text("user", "Acme Corp")
+    log.add_text("assistant", "Found Acme Corp. Where is the job?")
+    settings = json.loads(templates.settings_json_with_context(log.messages()))
+    assert settings["agent"]["context"]["messages"] == log.messages()
+    assert "greeting" not in settings["agent"]
+    assert "greeting" in templates.settings["agent"]
+    print("✅ Settings carry the conversation so far")
+
+
+def test_event_filter_projects_and_batches():
+    """Only UI events reach the browser, trimmed to their fields; History is batched."""
+    print("\n=== Testing agent event filter ===")
+
+    async def run():
+        sent, batches = [], []
+        events = EventFilter.for_session(sent.append, batches.append, dict(AGENT_EVENTS, batch_ms=20))
+        for message in (
+            {"type": "Welcome", "request_id": "r1"},
+            {"type": "ConversationText", "role": "assistant", "content": "Hello", "extra": "x" * 100},
+            {"type": "FunctionCallRequest", "functions": []},
+            {"type": "History", "role": "assistant", "content": "Hello"},
+            {"type": "History", "role": "user", "content": "Acme"},
+        ):
+            raw = json.dumps(message)
+            events.handle(message["type"], message, raw)
+        assert [json.loads(text)["type"] for text in sent] == ["Welcome", "ConversationText"]
+        assert json.loads(sent[1]) == {"type": "ConversationText", "role": "assistant", "content": "Hello"}
+        assert batches == []
+        await asyncio.sleep(0.05)
+        assert [e["content"] for e in json.loads(batches[0])] == ["Hello", "Acme"]
+        assert events.stats() == {"forwarded": 2, "batched": 2, "dropped": 1}
+
+        # A browser can ask for other events; unknown types are forwarded whole
+        custom = EventFilter.for_session(sent.append, batches.append, AGENT_EVENTS, ["FunctionCallRequest"])
+        raw = '{"type": "FunctionCallRequest", "functions": []}'
+        custom.handle("FunctionCallRequest", json.loads(raw), raw)
+        custom.handle("Welcome", {"type": "Welcome"}, '{"type": "Welcome"}')
+        assert sent[-1] is raw and custom.stats()["dropped"] == 1
+
+    asyncio.run(run())
+    print("✅ Events projected, dropped and batched as configured")
+
+
+def test_status_notifier_emits_on_transitions():
+    """connection_status goes out on state changes and heartbeats, not on every call."""
+    print("\n=== Testing connection status notifier ===")
+    state = {"connected": False, "last_error": None, "message_count": 0}
+    sent = []
+    notifier = ConnectionStatusNotifier(sent.append, lambda: dict(state), heartbeat_seconds=10)
+
+    for _ in range(50):  # e.g. one call per audio frame
+        notifier.update()
+    assert sent == []
+    state["connected"] = True
+    state["message_count"] = 3
+    for _ in range(50):
+        notifier.update()
+    assert [s["event"] for s in sent] == ["transition"] and sent[0]["message_count"] == 3
+
+    state["message_count"] = 9  # Counters alone are not a transition
+    notifier.update()
+    assert len(sent) == 1
+    assert not notifier.heartbeat()
+    assert notifier.heartbeat(now=notifier._last_sent + 11)
+    assert sent[-1]["event"] == "heartbeat" and sent[-1]["message_count"] == 9
+
+    notifier.subscribe(False)
+    state["connected"] = False
+    assert not notifier.update() and not notifier.heartbeat(now=1e12)
+    assert len(sent) == 2 and notifier.stats()["transitions"] == 2
+    print(f"✅ Notifier stats: {notifier.stats()}")
+
+
+def test_resume_needs_the_sessions_token():
+    """Session IDs are unique and unguessable, and a conversation is only resumed with its token."""
+    print("\n=== Testing session resume tokens ===")
+    ids = {new_session_id() for _ in range(1000)}  # Same second, no collisions
+    assert len(ids) == 1000 and all(is_valid_session_id(session_id) for session_id in ids)
+    assert is_valid_session_id("session_1753174814")  # Sessions saved before random IDs
+    for bad in ("../etc", "session_../../x", "session_a/b", "", None, "other_123"):
+        assert not is_valid_session_id(bad), bad
+
+    token = new_resume_token()
+    state = {"session_id": new_session_id(), "resume_token_hash": hash_token(token)}
+    assert token not in json.dumps(state)  # Only the hash is stored
+    assert verify_resume_token(state, token)
+    assert not verify_resume_token(state, new_resume_token())
+    assert not verify_resume_token(state, None) and not verify_resume_token(state, "")
+    assert not verify_resume_token({"session_id": "session_1753174814"}, token)  # Saved without a token
+    assert not verify_resume_token(None, token)
+    print(f"✅ {len(ids)} unique IDs, resume refused without the matching token")
+
+
+def main():
+    """Run all settings tests."""
+    print("Agent Settings Test")
+    print("=" * 50)
+
+    test_sessions_do_not_share_settings()
+    test_settings_json_is_cached()
+    test_conversation_log_is_bounded()
+    test_resume_settings_include_context()
+    test_event_filter_projects_and_batches()
+    test_status_notifier_emits_on_transitions()
+    test_resume_needs_the_sessions_token()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for the Backendless query builder (no network needed).
+"""
+
+import re
+import sys
+import os
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.backendless_query import quote, match_strategies, query_params
+
+
+def like_matches(clause, text):
+    """Evaluates a single 'Field LIKE '...'' clause against text, as the database would."""
+    pattern = re.search(r"LIKE '(.*)'$", clause).group(1).replace("''", "'")
+    regex = "".join(".*" if c == "%" else "." if c == "_" else re.escape(c) for c in pattern)
+    return re.fullmatch(regex, text, re.DOTALL) is not None
+
+
+def test_values_are_escaped():
+    """Quotes in user input can't break out of the string literal."""
+    print("\n=== Testing value escaping ===")
+    assert quote("O'Brien Plumbing") == "'O''Brien Plumbing'"
+    assert quote("x' OR '1'='1") == "'x'' OR ''1''=''1'"
+    strategies = dict(match_strategies("Company", "100% Pure' OR 1=1"))
+    assert strategies["exact"] == "Company = '100% Pure'' OR 1=1'"
+    assert strategies["prefix"] == "Company LIKE '100_ Pure'' OR 1=1%'"
+    assert strategies["contains"] == "Company LIKE '%100_ Pure'' OR 1=1%'"
+    print(f"✅ {strategies['contains']}")
+
+
+def test_like_wildcards_match_one_character():
+    """'%' and '_' in user input match exactly one character, so the literal value still matches."""
+    print("\n=== Testing LIKE wildcards ===")
+    strategies = dict(match_strategies("Email", "j_doe%"))
+    assert strategies["exact"] == "Email = 'j_doe%'"
+    assert strategies["prefix"] == "Email LIKE 'j_doe_%'"
+    assert strategies["contains"] == "Email LIKE '%j_doe_%'"
+    assert like_matches(strategies["prefix"], "j_doe%40example.com")
+
+    strategies = dict(match_strategies("Company", "100% Pure Water"))
+    assert like_matches(strategies["prefix"], "100% Pure Water Inc")
+    assert like_matches(strategies["contains"], "The 100% Pure Water Co")
+    assert not like_matches(strategies["prefix"], "100 Pure Water Inc")
+
+    assert [name for name, _ in match_strategies("Company", "_%_ ")] == ["exact"]
+    print(f"✅ {strategies['contains']}")
+
+
+def test_strategies_go_from_narrow_to_broad():
+    """Exact match is tried first and each field is parenthesized."""
+    print("\n=== Testing match strategies ===")
+    strategies = match_strategies(["AddressOnlyString", "FullAddressString"], "123 Main")
+    assert [name for name, _ in strategies] == ["exact", "prefix", "contains"]
+    assert strategies[0][1] == "(AddressOnlyString = '123 Main') OR (FullAddressString = '123 Main')"
+    print(f"✅ {len(strategies)} strategies")
+
+
+def test_query_params():
+    """Only requested props and page size are sent."""
+    print("\n=== Testing query parameters ===")
+    params = query_params("Company = 'Acme'", props=["objectId", "Company"], page_size=1)
+    assert params == {"where": "Company = 'Acme'", "props": "objectId,Company", "pageSize": 1}
+    assert query_params("x = 1") == {"where": "x = 1"}
+    print(f"✅ {params}")
+
+
+def main():
+    """Run all query builder tests."""
+    print("Backendless Query Test")
+    print("=" * 50)
+
+    test_values_are_escaped()
+    test_like_wildcards_match_one_character()
+    test_strategies_go_from_narrow_to_broad()
+    test_query_params()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for drain mode (no network needed).
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.drain import Drain
+from common.quote_pipeline import QuotePipeline
+
+
+def test_drain_waits_for_calls_and_writes():
+    """wait() returns once both the calls and the pending writes reach zero."""
+    print("\n=== Testing drain completion ===")
+    state = {"calls": 2, "writes": 1}
+    logged = []
+
+    def sleep(seconds):
+        # Each poll, one call hangs up; the write lands after the last call
+        if state["calls"]:
+            state["calls"] -= 1
+        else:
+            state["writes"] = 0
+
+    drain = Drain(lambda: state["calls"], lambda: state["writes"], sleep, deadline_seconds=10, poll_seconds=0.01)
+    assert not drain.draining and drain.status()["deadline_seconds"] is None
+    assert drain.begin() and not drain.begin()
+    assert drain.status()["draining"] and drain.status()["active_calls"] == 2
+    assert drain.wait(log=logged.append)
+    assert state == {"calls": 0, "writes": 0}
+    assert logged and "2 call(s)" in logged[0]
+    print(f"✅ {logged[0]}")
+
+
+def test_drain_deadline():
+    """A call that never ends is given up on at the deadline."""
+    print("\n=== Testing drain deadline ===")
+    drain = Drain(lambda: 1, lambda: 0, time.sleep, deadline_seconds=0.1, poll_seconds=0.02)
+    drain.begin()
+    started = time.monotonic()
+    assert not drain.wait()
+    elapsed = time.monotonic() - started
+    assert 0.08 <= elapsed < 1, elapsed
+    assert drain.remaining_seconds() == 0
+    print(f"✅ Gave up after {elapsed:.2f}s")
+
+
+def test_quote_pipeline_in_flight():
+    """Quote submissions still running are counted, so a drain can wait for them."""
+    print("\n=== Testing in-flight quote count ===")
+    release = threading.Event()
+
+    def slow_submit(payload):
+        release.wait(2)
+        return {"success": True}
+
+    pipeline = QuotePipeline(slow_submit)
+    worker = threading.Thread(target=pipeline.submit, args=({"customer": "a"},))
+    worker.start()
+    deadline = time.monotonic() + 2
+    while not pipeline.in_flight() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pipeline.in_flight() == 1 and pipeline.stats()["in_flight"] == 1
+    release.set()
+    worker.join(2)
+    assert pipeline.in_flight() == 0
+    print("✅ In-flight submission counted until it finished")
+
+
+def main():
+    """Run all drain tests."""
+    print("Drain Test")
+    print("=" * 50)
+
+    test_drain_waits_for_calls_and_writes()
+    test_drain_deadline()
+    test_quote_pipeline_in_flight()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
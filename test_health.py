@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the readiness checks and the cached Deepgram key check (no network needed).
+"""
+
+import sys
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.health import DeepgramKeyCheck, readiness
+
+VALID_KEY = "good-key-0123456789"
+
+
+class FakeDeepgramAuth(BaseHTTPRequestHandler):
+    """Accepts VALID_KEY, rejects anything else with 401."""
+    requests = 0
+
+    def do_GET(self):
+        FakeDeepgramAuth.requests += 1
+        ok = self.headers.get("Authorization") == f"Token {VALID_KEY}"
+        self.send_response(200 if ok else 401)
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, *args):
+        pass
+
+
+def healthy_inputs(**overrides):
+    inputs = dict(
+        active_sessions=3,
+        max_sessions=10,
+        loop_lag_ms=12.0,
+        max_loop_lag_ms=1000,
+        breakers={"backendless_quote": {"state": "closed"}},
+        key_status={"valid": True, "checked_at": 1.0, "error": None},
+    )
+    inputs.update(overrides)
+    return inputs
+
+
+def test_readiness_checks():
+    """Each check can fail readiness on its own; unknowns and open breakers don't by default."""
+    print("\n=== Testing readiness decisions ===")
+    ready, checks = readiness(**healthy_inputs())
+    assert ready and all(check["ok"] for check in checks.values()), checks
+
+    assert not readiness(**healthy_inputs(active_sessions=10))[0]
+    assert not readiness(**healthy_inputs(loop_lag_ms=1500))[0]
+    assert not readiness(**healthy_inputs(key_status={"valid": False, "checked_at": 1.0, "error": "HTTP 401"}))[0]
+    assert not readiness(**healthy_inputs(), draining=True)[0]
+
+    # Not measured / not checked yet
+    assert readiness(**healthy_inputs(loop_lag_ms=None, key_status={"valid": None, "checked_at": None, "error": None}))[0]
+
+    open_breaker = healthy_inputs(breakers={"backendless_quote": {"state": "open"}})
+    ready, checks = readiness(**open_breaker)
+    assert ready and not checks["backendless"]["ok"]
+    assert not readiness(**open_breaker, fail_on_open_breaker=True)[0]
+    print(f"✅ Checks: {sorted(checks)}")
+
+
+def test_key_check_is_cached():
+    """The key is checked in the background, the answer is cached, and a new key is re-checked."""
+    print("\n=== Testing cached Deepgram key check ===")
+    server = HTTPServer(("127.0.0.1", 0), FakeDeepgramAuth)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    key = {"value": VALID_KEY}
+    try:
+        check = DeepgramKeyCheck(lambda: key["value"], ttl_seconds=60,
+                                 url=f"http://127.0.0.1:{server.server_port}/v1/auth/token")
+        assert check.status()["valid"] is None  # Unknown at first; a check starts in the background
+        deadline = time.monotonic() + 2
+        while check.status()["valid"] is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert check.status()["valid"] is True
+        requests_made = FakeDeepgramAuth.requests
+        for _ in range(5):
+            check.status()
+        assert FakeDeepgramAuth.requests == requests_made  # Served from cache
+
+        key["value"] = "revoked-key-0123456789"
+        assert check.status()["valid"] is None
+        assert check.check() is False and "401" in check.status()["error"]
+        deadline = time.monotonic() + 2
+        while check._checking and time.monotonic() < deadline:  # Let the background re-check land first
+            time.sleep(0.01)
+
+        check.report(True)  # A real connection succeeded with the current key
+        assert check.status()["valid"] is True
+
+        key["value"] = None
+        assert check.status()["valid"] is False
+    finally:
+        server.shutdown()
+    print(f"✅ {FakeDeepgramAuth.requests} request(s) to the auth endpoint")
+
+
+def main():
+    """Run all health tests."""
+    print("Health Test")
+    print("=" * 50)
+
+    test_readiness_checks()
+    test_key_check_is_cached()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
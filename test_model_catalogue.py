@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached TTS model catalogue, against a local stand-in for the Deepgram models API.
+"""
+
+import json
+import sys
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.model_catalogue import ModelCatalogue, DEFAULT_TTS_MODELS
+
+MODELS_RESPONSE = {
+    "tts": [
+        {"name": "cora", "canonical_name": "aura-2-cora-en", "architecture": "aura-2", "languages": ["en"]},
+        {"name": "asteria", "canonical_name": "aura-asteria-en", "architecture": "aura", "languages": ["en"]},
+    ]
+}
+
+
+class ModelsHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(dict(self.headers))
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = json.dumps(MODELS_RESPONSE).encode()
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = HTTPServer(("127.0.0.1", 0), ModelsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/v1/models"
+
+
+def test_cold_start_and_refresh():
+    """A cold cache serves the defaults, refreshes, then writes a snapshot with the ETag."""
+    print("\n=== Testing catalogue cold start and refresh ===")
+    server, url = start_server()
+    ModelsHandler.requests_seen = []
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = os.path.join(tmp, "tts_models.json")
+        catalogue = ModelCatalogue(lambda: "test-key", ttl_seconds=3600, snapshot_path=snapshot, url=url)
+
+        models, info = catalogue.get()
+        assert models == DEFAULT_TTS_MODELS
+        assert info["stale"] and info["source"] == "default"
+        # Wait for the background refresh that get() started
+        for thread in threading.enumerate():
+            if thread.name == "model-catalogue-refresh":
+                thread.join(timeout=5)
+
+        models, info = catalogue.get()
+        assert models == [{"name": "aura-2-cora-en", "display_name": "cora", "language": "en"}]
+        assert info == {"source": "deepgram", "stale": False, "fetched_at": catalogue.fetched_at}
+        assert ModelsHandler.requests_seen[0]["Authorization"] == "Token test-key"
+
+        # A second process starts from the snapshot and revalidates with the ETag
+        restarted = ModelCatalogue(lambda: "test-key", ttl_seconds=0, snapshot_path=snapshot, url=url)
+        restarted._load_snapshot()
+        assert restarted.models == models and restarted.source == "snapshot"
+        assert restarted.refresh()
+        assert ModelsHandler.requests_seen[-1]["If-None-Match"] == '"v1"'
+        assert restarted.models == models
+    server.shutdown()
+    print(f"✅ Served {len(models)} model(s) after {len(ModelsHandler.requests_seen)} upstream request(s)")
+
+
+def test_refresh_failure_keeps_cache():
+    """Upstream failures and a missing API key never drop what is already cached."""
+    print("\n=== Testing catalogue failure handling ===")
+    catalogue = ModelCatalogue(lambda: None)
+    assert not catalogue.refresh()
+    assert catalogue.last_error == "DEEPGRAM_API_KEY not set"
+
+    catalogue = ModelCatalogue(lambda: "test-key", timeout=1, url="http://127.0.0.1:9/v1/models")
+    catalogue.models = [{"name": "aura-2-thalia-en", "display_name": "thalia", "language": "en"}]
+    assert not catalogue.refresh()
+    assert catalogue.models[0]["name"] == "aura-2-thalia-en"
+    print(f"✅ Kept cached models after error: {catalogue.last_error[:60]}...")
+
+
+def test_failed_refresh_backs_off():
+    """While Deepgram is down, get() retries after a growing delay instead of on every call."""
+    print("\n=== Testing catalogue retry backoff ===")
+    catalogue = ModelCatalogue(lambda: "test-key", ttl_seconds=600, timeout=1, retry_seconds=30,
+                               url="http://127.0.0.1:9/v1/models")
+    started = []
+    catalogue.refresh_async = lambda: started.append(True)
+
+    catalogue.get()
+    assert len(started) == 1  # Stale and never attempted
+    assert not catalogue.refresh() and catalogue.failures == 1
+    for _ in range(5):
+        assert catalogue.get()[1]["stale"]
+    assert len(started) == 1  # Backing off
+
+    catalogue.last_attempt_at -= 30
+    catalogue.get()
+    assert len(started) == 2  # Retry delay elapsed
+
+    delays = []
+    for _ in range(6):
+        catalogue.refresh()
+        delays.append(catalogue.retry_delay())
+    assert delays == [60, 120, 240, 480, 600, 600]
+    print(f"✅ Retry delays after repeated failures: {delays}")
+
+
+def main():
+    """Run all model catalogue tests."""
+    print("Model Catalogue Test")
+    print("=" * 50)
+
+    test_cold_start_and_refresh()
+    test_refresh_failure_keeps_cache()
+    test_failed_refresh_backs_off()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
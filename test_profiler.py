@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Test script for the sampling profiler and asyncio slow-callback logging (no network needed).
+"""
+
+import asyncio
+import logging
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.profiler import SamplingProfiler, SlowCallbackRecorder, set_slow_callback_threshold
+
+
+def busy_work(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+
+def test_profiler_collapsed_stacks():
+    """A busy thread shows up in the collapsed output under its name and function."""
+    print("\n=== Testing sampling profiler ===")
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_work, args=(stop,), name="busy-worker", daemon=True)
+    worker.start()
+    profiler = SamplingProfiler(interval_ms=2)
+    profiler.start(0.3)
+    deadline = time.monotonic() + 5
+    while not profiler.done and time.monotonic() < deadline:
+        time.sleep(0.05)
+    stop.set()
+    worker.join(2)
+
+    assert profiler.done and profiler.samples > 10
+    lines = profiler.collapsed().strip().splitlines()
+    busy = [line for line in lines if line.startswith("busy-worker;") and "busy_work" in line]
+    assert busy, lines[:5]
+    stack, count = busy[0].rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
+    print(f"✅ {profiler.samples} samples, {len(lines)} distinct stacks")
+
+
+def test_slow_callbacks_are_logged():
+    """With a threshold set, a callback that blocks the loop is reported by asyncio."""
+    print("\n=== Testing slow callback detection ===")
+    recorder = SlowCallbackRecorder()
+    asyncio_logger = logging.getLogger("asyncio")
+    asyncio_logger.addHandler(recorder)
+    loop = asyncio.new_event_loop()
+    try:
+        set_slow_callback_threshold(loop, 20)
+
+        async def blocking():
+            time.sleep(0.05)  # Blocks the loop, as a synchronous backend call would
+
+        loop.run_until_complete(blocking())
+        assert any("took" in r["message"] for r in recorder.records), recorder.records
+
+        set_slow_callback_threshold(loop, None)
+        count = len(recorder.records)
+        loop.run_until_complete(blocking())
+        assert len(recorder.records) == count and not loop.get_debug()
+    finally:
+        asyncio_logger.removeHandler(recorder)
+        loop.close()
+    print(f"✅ {recorder.records[0]['message'][:80]}...")
+
+
+def main():
+    """Run all profiler tests."""
+    print("Profiler Test")
+    print("=" * 50)
+
+    test_profiler_collapsed_stacks()
+    test_slow_callbacks_are_logged()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for function argument validation and quote duplicate suppression (no network needed).
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.quote_pipeline import QuotePipeline, idempotency_key
+from common.agent_functions import post_quote, FUNCTION_VALIDATORS
+
+QUOTE = {
+    "printCustomerName": "Epic Construction",
+    "CustomerOid": "9493B230-DDA6-4EE0-816E-4DEEE9CE012C",
+    "JobName": "Patio power wash",
+}
+
+
+def make_backend(delay=0.0, succeed=True):
+    calls = []
+
+    def submit(payload):
+        calls.append(payload)
+        time.sleep(delay)
+        if not succeed:
+            return {"error": "backend unavailable", "success": False}
+        return {"internal_request_number": f"IRN-{len(calls)}", "success": True}
+    return submit, calls
+
+
+def test_idempotency_key_ignores_formatting():
+    """Case and whitespace changes don't change the key; content changes do."""
+    print("\n=== Testing idempotency keys ===")
+    retyped = dict(QUOTE, JobName="  patio   Power wash ")
+    assert idempotency_key(QUOTE) == idempotency_key(retyped)
+    assert idempotency_key(QUOTE) != idempotency_key(dict(QUOTE, JobName="Roof repair"))
+    print(f"✅ Key: {idempotency_key(QUOTE)[:16]}...")
+
+
+def test_retry_returns_original_request_number():
+    """A repeat within the window returns the first result without re-submitting."""
+    print("\n=== Testing dedupe window ===")
+    submit, calls = make_backend()
+    pipeline = QuotePipeline(submit, dedupe_window_seconds=0.2)
+    first = pipeline.submit(QUOTE)
+    retry = pipeline.submit(dict(QUOTE))
+    assert len(calls) == 1
+    assert retry["internal_request_number"] == first["internal_request_number"] == "IRN-1"
+    assert retry["duplicate"] and "duplicate" not in first
+
+    time.sleep(0.25)
+    assert pipeline.submit(QUOTE)["internal_request_number"] == "IRN-2"
+    assert pipeline.stats()["duplicates"] == 1
+    print(f"✅ Pipeline stats: {pipeline.stats()}")
+
+
+def test_concurrent_and_failed_submissions():
+    """Overlapping identical submissions share one call; failures are not remembered."""
+    print("\n=== Testing concurrent and failed submissions ===")
+    submit, calls = make_backend(delay=0.1)
+    pipeline = QuotePipeline(submit)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(pipeline.submit(QUOTE))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(calls) == 1
+    assert {r["internal_request_number"] for r in results} == {"IRN-1"}
+
+    submit, calls = make_backend(succeed=False)
+    pipeline = QuotePipeline(submit)
+    pipeline.submit(QUOTE)
+    pipeline.submit(QUOTE)
+    assert len(calls) == 2
+    print("✅ One call for concurrent retries, failures retried")
+
+
+def test_post_quote_validation():
+    """post_quote reports every schema problem before anything is submitted, and counts the check."""
+    print("\n=== Testing post_quote validation ===")
+    before = FUNCTION_VALIDATORS.metrics()["post_quote"]
+    result = post_quote({"quote_data": {"customer_oid": 42, "requestor": "  "}})
+    assert result["success"] is False
+    fields = {e["field"] for e in result["validation_errors"]}
+    assert {"quote_data.customer_oid", "quote_data.requestor", "quote_data.job_name"} <= fields
+    assert post_quote({})["validation_errors"] == [{"field": "quote_data", "message": "is required"}]
+    after = FUNCTION_VALIDATORS.metrics()["post_quote"]
+    assert after["calls"] == before["calls"] + 2 and after["rejected"] == before["rejected"] + 2
+    print(f"✅ {result['error']}")
+
+
+def test_validators_cover_all_functions():
+    """Every FUNCTION_MAP entry is validated and timed before it runs."""
+    print("\n=== Testing function validators ===")
+    assert FUNCTION_VALIDATORS.validate("get_customer", {"company_name": "Acme"}) == []
+    assert FUNCTION_VALIDATORS.validate("get_location", {"customer_oid": "abc"}) == [
+        {"field": "address_string", "message": "is required"}
+    ]
+    assert FUNCTION_VALIDATORS.validate("get_customer", "Acme")[0]["message"] == "must be of type object"
+    assert FUNCTION_VALIDATORS.validate("unknown_function", {}) == []
+    metrics = FUNCTION_VALIDATORS.metrics()
+    assert metrics["get_location"]["rejected"] >= 1 and metrics["get_customer"]["calls"] >= 2
+    print(f"✅ Validation cost: {metrics['get_customer']['avg_us']}us avg for get_customer")
+
+
+def main():
+    """Run all quote pipeline tests."""
+    print("Quote Pipeline Test")
+    print("=" * 50)
+
+    test_idempotency_key_ignores_formatting()
+    test_retry_returns_original_request_number()
+    test_concurrent_and_failed_submissions()
+    test_post_quote_validation()
+    test_validators_cover_all_functions()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test script for the Backendless circuit breakers, hedged requests and request coalescing (no external network needed).
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.resilience import CircuitBreaker, HedgePool, SingleFlight, hedged_call, breaker_metrics
+from common import business_logic
+
+
+def test_breaker_opens_and_recovers():
+    """Enough failures open the breaker; after open_seconds one trial call decides."""
+    print("\n=== Testing circuit breaker transitions ===")
+    breaker = CircuitBreaker("test", failure_rate=0.5, min_calls=4, open_seconds=0.1)
+    for success in (True, False, True, False):
+        assert breaker.allow()
+        breaker.record(success, 0.01)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.snapshot()["rejected"] == 1
+
+    time.sleep(0.15)
+    assert breaker.allow()  # The half-open trial
+    assert not breaker.allow()  # Only one at a time
+    breaker.record(True, 0.01)
+    assert breaker.state == CircuitBreaker.CLOSED
+    print(f"✅ Breaker snapshot: {breaker.snapshot()}")
+
+
+def test_slow_calls_count_as_failures():
+    """A breaker also opens when calls succeed but are too slow."""
+    print("\n=== Testing slow call detection ===")
+    breaker = CircuitBreaker("slow", failure_rate=0.5, min_calls=3, slow_call_seconds=1.0)
+    for _ in range(3):
+        breaker.record(True, 2.0)
+    assert breaker.state == CircuitBreaker.OPEN
+    print("✅ Slow calls opened the breaker")
+
+
+def test_hedged_call_cuts_tail_latency():
+    """A hedge is sent after the delay and the faster attempt wins."""
+    print("\n=== Testing hedged calls ===")
+    delays = [0.5, 0.01]
+
+    def call():
+        delay = delays.pop(0)
+        time.sleep(delay)
+        return delay
+
+    pool = HedgePool(2)
+    start = time.monotonic()
+    result, hedged = hedged_call(call, hedge_delay=0.05, pool=pool)
+    elapsed = time.monotonic() - start
+    assert hedged and result == 0.01
+    assert elapsed < 0.3
+    assert hedged_call(lambda: "fast", hedge_delay=0.5, pool=pool) == ("fast", False)
+    assert hedged_call(lambda: "no hedge", hedge_delay=None, pool=pool) == ("no hedge", False)
+    print(f"✅ Hedged call returned in {elapsed:.2f}s")
+
+
+def test_no_hedge_when_pool_is_busy():
+    """With every hedge slot taken, the call runs on the caller's thread and isn't hedged."""
+    print("\n=== Testing hedge pool saturation ===")
+    pool = HedgePool(1)
+    assert pool.reserve()  # Another call holds the only slot
+    callers = []
+
+    def call():
+        callers.append(threading.current_thread())
+        time.sleep(0.05)
+        return "slow"
+
+    assert hedged_call(call, hedge_delay=0.01, pool=pool) == ("slow", False)
+    assert callers == [threading.current_thread()] and pool.skipped == 1
+    pool.release()
+
+    # Once the hedge finishes, its slot is free again
+    delays = [0.3, 0.01]
+    assert hedged_call(lambda: time.sleep(delays.pop(0)) or "ok", hedge_delay=0.02, pool=pool) == ("ok", True)
+    time.sleep(0.05)
+    assert pool.reserve()
+    pool.release()
+    print(f"✅ Skipped {pool.skipped} hedge while the pool was full")
+
+
+def test_lookup_fails_fast_when_open():
+    """Once Backendless keeps failing, lookups go straight to mock data."""
+    print("\n=== Testing fast fallback ===")
+    original_url = business_logic.BACKENDLESS_API_URL
+    business_logic.BACKENDLESS_API_URL = "http://127.0.0.1:9"  # Nothing listens here
+    try:
+        for _ in range(business_logic.BACKENDLESS_RESILIENCE["min_calls"]):
+            assert business_logic.get_customer_backendless("Acme")["success"]
+        assert breaker_metrics()["backendless.Customers"]["state"] == "open"
+        start = time.monotonic()
+        result = business_logic.get_customer_backendless("Acme")
+        assert result["printCustomerName"] == "Acme Corporation"
+        assert time.monotonic() - start < 0.1
+    finally:
+        business_logic.BACKENDLESS_API_URL = original_url
+    print("✅ Open breaker served mock data immediately")
+
+
+def test_single_flight_coalesces_threads():
+    """Overlapping identical calls from several threads run the function once."""
+    print("\n=== Testing single-flight coalescing ===")
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    def lookup():
+        runs.append(1)
+        started.set()
+        release.wait(5)
+        return {"CustomerOid": "abc", "success": True}
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("acme", lookup)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("acme", lookup))) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+
+    time.sleep(0.1)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(5)
+
+    assert len(runs) == 1
+    assert len(results) == 4 and all(r == {"CustomerOid": "abc", "success": True} for r in results)
+    # Followers get copies, so one caller can't change another's result
+    assert len({id(r) for r in results}) == 4
+    assert flight.stats() == {"calls": 4, "shared": 3, "in_flight": 0}
+
+    # Once finished, nothing is cached
+    flight.do("acme", lookup)
+    assert len(runs) == 2
+    print(f"✅ {flight.stats()['shared']} of {flight.stats()['calls']} calls shared a request")
+
+
+def test_single_flight_shares_errors():
+    """Waiters see the leader's exception instead of retrying on their own."""
+    print("\n=== Testing single-flight errors ===")
+    flight = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise TimeoutError("backend timeout")
+
+    def call():
+        try:
+            flight.do("key", failing)
+        except TimeoutError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait(5)
+    threads += [threading.Thread(target=call) for _ in range(2)]
+    for thread in threads[1:]:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(errors) == 3
+    print("✅ All callers saw the shared error")
+
+
+def main():
+    """Run all resilience tests."""
+    print("Resilience Test")
+    print("=" * 50)
+
+    test_breaker_opens_and_recovers()
+    test_slow_calls_count_as_failures()
+    test_hedged_call_cuts_tail_latency()
+    test_no_hedge_when_pool_is_busy()
+    test_lookup_fails_fast_when_open()
+    test_single_flight_coalesces_threads()
+    test_single_flight_shares_errors()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Test script for the event-loop lag watchdog (no network needed).
+"""
+
+import asyncio
+import logging
+import sys
+import os
+import threading
+import time
+
+# Add the current directory to Python path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from common.watchdog import Watchdog
+
+
+class WarningRecorder(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def start_loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    return loop, thread
+
+
+def stop_loop(loop, thread):
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(2)
+    loop.close()
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_idle_loop_has_low_lag():
+    """A probe on an idle loop runs almost at once and counts the loop's tasks."""
+    print("\n=== Testing idle loop probe ===")
+    loop, thread = start_loop()
+    try:
+        sleeper = asyncio.run_coroutine_threadsafe(asyncio.sleep(10), loop)
+        watchdog = Watchdog(lambda: {"session_a": loop}, lambda: {"threads": 1})
+        watchdog.tick()
+        assert wait_for(lambda: watchdog.loop_stats["session_a"].samples)
+        snapshot = watchdog.metrics()["loops"]["session_a"]
+        assert snapshot["lag_ms"] < 100 and snapshot["tasks"] == 1 and snapshot["alerts"] == 0, snapshot
+        assert watchdog.metrics()["threads"] == {"threads": 1}
+        sleeper.cancel()
+        time.sleep(0.05)
+    finally:
+        stop_loop(loop, thread)
+    print(f"✅ lag {snapshot['lag_ms']} ms, {snapshot['tasks']} task")
+
+
+def test_blocked_loop_is_reported():
+    """A loop blocked by synchronous work is reported by the pending probe's age and logged once."""
+    print("\n=== Testing blocked loop detection ===")
+    recorder = WarningRecorder()
+    logging.getLogger("common.watchdog").addHandler(recorder)
+    loop, thread = start_loop()
+    try:
+        watchdog = Watchdog(lambda: {"session_b": loop}, dict, lag_warn_ms=50, alert_every_seconds=60)
+        loop.call_soon_threadsafe(time.sleep, 0.3)  # Blocks the loop, as a synchronous backend call would
+        time.sleep(0.02)
+        watchdog.tick()
+        time.sleep(0.1)
+        watchdog.tick()  # Probe still pending: lag is its age
+        stats = watchdog.loop_stats["session_b"]
+        assert stats.samples[-1] >= 50
+        assert wait_for(lambda: len(stats.samples) == 2)  # The probe finally ran, late
+        assert stats.samples[-1] >= 200 and stats.alerts == 2
+        assert len(recorder.messages) == 1 and "session_b" in recorder.messages[0], recorder.messages
+        assert watchdog.max_loop_lag_ms() >= 200
+    finally:
+        logging.getLogger("common.watchdog").removeHandler(recorder)
+        stop_loop(loop, thread)
+    print(f"✅ {recorder.messages[0]}")
+
+
+def test_hub_lag_and_removed_loops():
+    """run() measures its own oversleep as hub lag; loops that go away are dropped."""
+    print("\n=== Testing hub lag and loop removal ===")
+    loops = {}
+    ticks = []
+
+    def sleep(seconds):
+        time.sleep(seconds + 0.03)  # Oversleeps, like a busy hub
+        ticks.append(seconds)
+
+    watchdog = Watchdog(lambda: dict(loops), dict, interval_seconds=0.01)
+    watchdog.run(sleep, lambda: len(ticks) >= 3)
+    hub = watchdog.metrics()["hub"]
+    assert hub["lag_ms"] >= 25 and hub["max_lag_ms"] >= hub["avg_lag_ms"] > 0, hub
+
+    loop, thread = start_loop()
+    try:
+        loops["session_c"] = loop
+        watchdog.tick()
+        assert "session_c" in watchdog.loop_stats
+        del loops["session_c"]
+        watchdog.tick()
+        assert watchdog.metrics()["loops"] == {}
+    finally:
+        stop_loop(loop, thread)
+    print(f"✅ hub lag {hub['lag_ms']} ms")
+
+
+def main():
+    """Run all watchdog tests."""
+    print("Watchdog Test")
+    print("=" * 50)
+
+    test_idle_loop_has_low_lag()
+    test_blocked_loop_is_reported()
+    test_hub_lag_and_removed_loops()
+
+    print("\n" + "=" * 50)
+    print("Test completed.")
+
+
+if __name__ == "__main__":
+    main()